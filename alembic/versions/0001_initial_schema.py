@@ -0,0 +1,110 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 09:00:00.000000
+
+Databases created by earlier releases through ``create_all`` already have
+these tables; mark them with ``alembic stamp 0001`` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+approval_status = sa.Enum('SUBMITTED', 'APPROVED', 'REJECTED', name='approvalstatus')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('email', sa.String(256), nullable=False),
+        sa.Column('normalized_email', sa.String(256), nullable=False),
+        sa.Column('password_hash', sa.String(256), nullable=False),
+        sa.Column('email_confirmed', sa.Boolean(), nullable=True),
+        sa.Column('lockout_end', sa.DateTime(), nullable=True),
+        sa.Column('lockout_enabled', sa.Boolean(), nullable=True),
+        sa.Column('access_failed_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_normalized_email', 'users', ['normalized_email'], unique=True)
+
+    op.create_table(
+        'user_files',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('type', sa.String(50), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=True),
+        sa.Column('owner_id', sa.String(36), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_user_files_id', 'user_files', ['id'])
+
+    op.create_table(
+        'approval_requests',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('submitted', sa.DateTime(), nullable=True),
+        sa.Column('author', sa.String(256), nullable=False),
+        sa.Column('author_id', sa.String(36), nullable=False),
+        sa.Column('status', approval_status, nullable=True),
+        sa.Column('approve_by', sa.DateTime(), nullable=True),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_approval_requests_id', 'approval_requests', ['id'])
+
+    op.create_table(
+        'approval_request_files',
+        sa.Column('approval_request_id', sa.BigInteger(), nullable=True),
+        sa.Column('user_file_id', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['approval_request_id'], ['approval_requests.id']),
+        sa.ForeignKeyConstraint(['user_file_id'], ['user_files.id']),
+    )
+
+    op.create_table(
+        'approval_request_tasks',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('approval_request_id', sa.BigInteger(), nullable=False),
+        sa.Column('approver', sa.String(256), nullable=False),
+        sa.Column('approver_id', sa.String(36), nullable=True),
+        sa.Column('status', approval_status, nullable=True),
+        sa.Column('completed', sa.DateTime(), nullable=True),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['approval_request_id'], ['approval_requests.id']),
+        sa.ForeignKeyConstraint(['approver_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_approval_request_tasks_id', 'approval_request_tasks', ['id'])
+
+    op.create_table(
+        'audit_log_entries',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('who', sa.String(256), nullable=False),
+        sa.Column('when', sa.DateTime(), nullable=True),
+        sa.Column('what', sa.String(500), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_audit_log_entries_id', 'audit_log_entries', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('audit_log_entries')
+    op.drop_table('approval_request_tasks')
+    op.drop_table('approval_request_files')
+    op.drop_table('approval_requests')
+    op.drop_table('user_files')
+    op.drop_table('users')
+    approval_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,68 @@
+"""Email outbox, file blobs and per-user counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+outbox_status = sa.Enum('PENDING', 'DEAD', name='outboxstatus')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('recipients', sa.Text(), nullable=False),
+        sa.Column('subject', sa.String(500), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', outbox_status, nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at'])
+
+    op.add_column('user_files', sa.Column('sha256', sa.String(64), nullable=True))
+    op.create_index('ix_user_files_sha256', 'user_files', ['sha256'])
+
+    op.create_table(
+        'file_blobs',
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+
+    op.create_table(
+        'user_stats',
+        sa.Column('normalized_email', sa.String(256), nullable=False),
+        sa.Column('pending_tasks', sa.Integer(), nullable=False),
+        sa.Column('request_count', sa.Integer(), nullable=False),
+        sa.Column('file_count', sa.Integer(), nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('updated', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('normalized_email'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
+    op.drop_table('file_blobs')
+    op.drop_index('ix_user_files_sha256', table_name='user_files')
+    with op.batch_alter_table('user_files') as batch_op:
+        batch_op.drop_column('sha256')
+    op.drop_table('email_outbox')
+    outbox_status.drop(op.get_bind(), checkfirst=True)
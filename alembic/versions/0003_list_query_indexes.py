@@ -0,0 +1,62 @@
+"""Composite indexes for the list and permission queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 09:20:00.000000
+
+Adds indexes matching the filter and keyset order of each list query, gives
+``approval_request_files`` a primary key plus a reverse index, indexes the
+task foreign key used to load a request's tasks, and drops the secondary
+indexes that duplicated primary keys.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+REDUNDANT_PK_INDEXES = [
+    ('ix_users_id', 'users'),
+    ('ix_user_files_id', 'user_files'),
+    ('ix_approval_requests_id', 'approval_requests'),
+    ('ix_approval_request_tasks_id', 'approval_request_tasks'),
+    ('ix_audit_log_entries_id', 'audit_log_entries'),
+]
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_files_owner_created_id', 'user_files', ['owner_id', 'created', 'id'])
+    op.create_index('ix_approval_requests_author_id', 'approval_requests', ['author', 'id'])
+    op.create_index(
+        'ix_approval_request_tasks_approver_status_id', 'approval_request_tasks', ['approver', 'status', 'id']
+    )
+    op.create_index('ix_approval_request_tasks_approval_request_id', 'approval_request_tasks', ['approval_request_id'])
+
+    with op.batch_alter_table('approval_request_files') as batch_op:
+        batch_op.alter_column('approval_request_id', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.alter_column('user_file_id', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.create_primary_key('pk_approval_request_files', ['approval_request_id', 'user_file_id'])
+    op.create_index('ix_approval_request_files_user_file_id', 'approval_request_files', ['user_file_id'])
+
+    for index_name, table_name in REDUNDANT_PK_INDEXES:
+        op.drop_index(index_name, table_name=table_name)
+
+
+def downgrade() -> None:
+    for index_name, table_name in REDUNDANT_PK_INDEXES:
+        op.create_index(index_name, table_name, ['id'])
+
+    op.drop_index('ix_approval_request_files_user_file_id', table_name='approval_request_files')
+    with op.batch_alter_table('approval_request_files') as batch_op:
+        batch_op.drop_constraint('pk_approval_request_files', type_='primary')
+        batch_op.alter_column('approval_request_id', existing_type=sa.BigInteger(), nullable=True)
+        batch_op.alter_column('user_file_id', existing_type=sa.BigInteger(), nullable=True)
+
+    op.drop_index('ix_approval_request_tasks_approval_request_id', table_name='approval_request_tasks')
+    op.drop_index('ix_approval_request_tasks_approver_status_id', table_name='approval_request_tasks')
+    op.drop_index('ix_approval_requests_author_id', table_name='approval_requests')
+    op.drop_index('ix_user_files_owner_created_id', table_name='user_files')
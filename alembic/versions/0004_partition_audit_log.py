@@ -0,0 +1,66 @@
+"""Index the audit log and partition it by month on MySQL
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 09:30:00.000000
+
+MySQL requires the partitioning column in every unique key, so the primary
+key becomes ``(id, when)``. Monthly partitions are created from the oldest
+entry up to next month, followed by a ``p_future`` catch-all that the archive
+job splits as months roll over.
+"""
+from datetime import date, datetime
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _add_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('audit_log_entries') as batch_op:
+        batch_op.alter_column('when', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_audit_log_entries_who_when_id', 'audit_log_entries', ['who', 'when', 'id'])
+    op.create_index('ix_audit_log_entries_when', 'audit_log_entries', ['when'])
+
+    if op.get_context().dialect.name != 'mysql':
+        return
+
+    today = datetime.utcnow().date()
+    first = today.replace(day=1)
+    if not context.is_offline_mode():
+        oldest = op.get_bind().execute(sa.text("SELECT MIN(`when`) FROM audit_log_entries")).scalar()
+        if oldest is not None:
+            first = min(first, oldest.date().replace(day=1))
+
+    partitions = []
+    month = first
+    while month <= _add_month(today.replace(day=1)):
+        partitions.append(
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_add_month(month):%Y-%m-%d}'))"
+        )
+        month = _add_month(month)
+    partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+
+    op.execute("ALTER TABLE audit_log_entries DROP PRIMARY KEY, ADD PRIMARY KEY (id, `when`)")
+    op.execute(f"ALTER TABLE audit_log_entries PARTITION BY RANGE (TO_DAYS(`when`)) ({', '.join(partitions)})")
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == 'mysql':
+        op.execute("ALTER TABLE audit_log_entries REMOVE PARTITIONING")
+        op.execute("ALTER TABLE audit_log_entries DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+
+    op.drop_index('ix_audit_log_entries_when', table_name='audit_log_entries')
+    op.drop_index('ix_audit_log_entries_who_when_id', table_name='audit_log_entries')
+    with op.batch_alter_table('audit_log_entries') as batch_op:
+        batch_op.alter_column('when', existing_type=sa.DateTime(), nullable=True)
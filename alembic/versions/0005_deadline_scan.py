@@ -0,0 +1,40 @@
+"""Index pending requests by deadline and record reminders
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 10:00:00.000000
+
+The deadline scheduler expires requests along ``(status, approve_by, id)``
+and claims requests to remind along ``(status, reminded, approve_by, id)``.
+``reminded`` is set once a request's approvers got their overdue digest, so
+reminded requests leave the second range.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_approval_requests_status_approve_by_id', 'approval_requests', ['status', 'approve_by', 'id']
+    )
+    with op.batch_alter_table('approval_requests') as batch_op:
+        batch_op.add_column(sa.Column('reminded', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_approval_requests_status_reminded_approve_by_id',
+        'approval_requests',
+        ['status', 'reminded', 'approve_by', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_approval_requests_status_reminded_approve_by_id', table_name='approval_requests')
+    with op.batch_alter_table('approval_requests') as batch_op:
+        batch_op.drop_column('reminded')
+    op.drop_index('ix_approval_requests_status_approve_by_id', table_name='approval_requests')
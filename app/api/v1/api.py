@@ -1,10 +1,13 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, user_files, approval_requests, approval_tasks
+from app.api.v1.endpoints import auth, user_files, approval_requests, approval_tasks, audit_log, events, metrics
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/account", tags=["authentication"])
 api_router.include_router(user_files.router, prefix="/file", tags=["files"])
 api_router.include_router(approval_requests.router, prefix="/request", tags=["approval-requests"])
-api_router.include_router(approval_tasks.router, prefix="/task", tags=["approval-tasks"])
\ No newline at end of file
+api_router.include_router(approval_tasks.router, prefix="/task", tags=["approval-tasks"])
+api_router.include_router(audit_log.router, prefix="/audit", tags=["audit-log"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
\ No newline at end of file
@@ -1,12 +1,20 @@
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional, Union
+from datetime import datetime
 
 from app.core.database import get_db
+from app.core.pagination import parse_statuses, requested_page_size
+from app.core.replicas import get_read_db
 from app.core.security import get_current_user
 from app.models.user import User
+from app.models.approval_request import ApprovalStatus
 from app.schemas.approval_request import ApprovalRequestSubmit, ApprovalRequestResponse
+from app.schemas.pagination import Page
 from app.services.approval_request_service import ApprovalRequestService
+from app.services.approval_request_read_model import ApprovalRequestReadModel
+from app.services.user_file_service import UserFileService
 
 router = APIRouter()
 
@@ -33,27 +41,43 @@ async def delete_approval_request(
     return {"message": "Approval request deleted successfully"}
 
 
-@router.get("/list", response_model=List[ApprovalRequestResponse])
+@router.get("/list", response_model=Union[Page[ApprovalRequestResponse], List[ApprovalRequestResponse]])
 async def list_approval_requests(
+    status: Optional[List[int]] = Query(None),
+    submitted_from: Optional[datetime] = Query(None),
+    submitted_to: Optional[datetime] = Query(None),
+    file_name: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    service = ApprovalRequestService(db)
-    requests = await service.list_approval_requests(current_user)
-    
-    # Convert to response format
-    response_data = []
-    for req in requests:
-        response_data.append(ApprovalRequestResponse(
-            id=req.id,
-            submitted=req.submitted,
-            author=req.author,
-            status=req.status,
-            user_files=req.user_files,
-            approvers=[task.approver for task in req.tasks],
-            approve_by=req.approve_by,
-            comment=req.comment,
-            tasks=req.tasks
-        ))
-    
-    return response_data
\ No newline at end of file
+    read_model = ApprovalRequestReadModel(db)
+    size = requested_page_size(cursor, limit)
+    requests, next_cursor = await read_model.list_approval_requests(
+        current_user,
+        statuses=parse_statuses(status, list(ApprovalStatus)),
+        submitted_from=submitted_from,
+        submitted_to=submitted_to,
+        file_name=file_name,
+        cursor=cursor,
+        limit=size
+    )
+    if size is None:
+        return requests
+    return Page[ApprovalRequestResponse](items=requests, next_cursor=next_cursor)
+
+
+@router.get("/downloadZip")
+async def download_request_files(
+    id: int = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    file_service = UserFileService(db)
+    bundle = await file_service.get_bundle(current_user, id)
+    return StreamingResponse(
+        file_service.iter_zip(bundle),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="request-{id}.zip"'}
+    )
\ No newline at end of file
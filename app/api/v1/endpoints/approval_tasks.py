@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional, Union
+from datetime import datetime
 
 from app.core.database import get_db
+from app.core.pagination import parse_statuses, requested_page_size
+from app.core.replicas import get_read_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.approval_request import ApprovalStatus
-from app.schemas.approval_request import ApprovalRequestTaskComplete, ApprovalRequestTaskResponse
+from app.schemas.approval_request import (
+    ApprovalRequestTaskComplete, ApprovalRequestTaskBulkComplete, ApprovalRequestTaskResponse
+)
+from app.schemas.pagination import Page
 from app.services.approval_request_service import ApprovalRequestService
+from app.services.approval_request_read_model import ApprovalRequestReadModel
 
 router = APIRouter()
 
@@ -23,31 +30,78 @@ async def complete_task(
     return {"message": "Task completed successfully"}
 
 
-@router.get("/listUncompleted", response_model=List[ApprovalRequestTaskResponse])
-async def list_uncompleted_tasks(
+@router.post("/completeBulk")
+async def complete_tasks(
+    task_data: ApprovalRequestTaskBulkComplete,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     service = ApprovalRequestService(db)
-    tasks = await service.list_tasks(current_user, [ApprovalStatus.SUBMITTED])
-    return tasks
+    await service.complete_tasks(current_user, task_data.tasks)
+    return {"message": f"{len(task_data.tasks)} tasks completed successfully"}
+
+
+@router.get("/listUncompleted", response_model=Union[Page[ApprovalRequestTaskResponse], List[ApprovalRequestTaskResponse]])
+async def list_uncompleted_tasks(
+    author: Optional[str] = Query(None),
+    submitted_from: Optional[datetime] = Query(None),
+    submitted_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    read_model = ApprovalRequestReadModel(db)
+    size = requested_page_size(cursor, limit)
+    tasks, next_cursor = await read_model.list_tasks(
+        current_user,
+        [ApprovalStatus.SUBMITTED],
+        author=author,
+        date_from=submitted_from,
+        date_to=submitted_to,
+        cursor=cursor,
+        limit=size
+    )
+    if size is None:
+        return tasks
+    return Page[ApprovalRequestTaskResponse](items=tasks, next_cursor=next_cursor)
 
 
-@router.get("/listCompleted", response_model=List[ApprovalRequestTaskResponse])
+@router.get("/listCompleted", response_model=Union[Page[ApprovalRequestTaskResponse], List[ApprovalRequestTaskResponse]])
 async def list_completed_tasks(
+    status: Optional[List[int]] = Query(None),
+    author: Optional[str] = Query(None),
+    completed_from: Optional[datetime] = Query(None),
+    completed_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    service = ApprovalRequestService(db)
-    tasks = await service.list_tasks(current_user, [ApprovalStatus.APPROVED, ApprovalStatus.REJECTED])
-    return tasks
+    read_model = ApprovalRequestReadModel(db)
+    size = requested_page_size(cursor, limit)
+    tasks, next_cursor = await read_model.list_tasks(
+        current_user,
+        parse_statuses(status, [ApprovalStatus.APPROVED, ApprovalStatus.REJECTED]),
+        author=author,
+        date_from=completed_from,
+        date_to=completed_to,
+        cursor=cursor,
+        limit=size
+    )
+    if size is None:
+        return tasks
+    return Page[ApprovalRequestTaskResponse](items=tasks, next_cursor=next_cursor)
 
 
 @router.get("/countUncompleted")
 async def count_uncompleted_tasks(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
-    service = ApprovalRequestService(db)
-    count = await service.count_uncompleted_tasks(current_user)
+    count = await ApprovalRequestReadModel(read_db).count_uncompleted_tasks(current_user)
+    if count is None:
+        # Seeding the counter row is a write
+        count = await ApprovalRequestService(db).count_uncompleted_tasks(current_user)
     return count
\ No newline at end of file
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.exceptions import AuthorizationException
+from app.core.pagination import page_size
+from app.core.replicas import get_read_db
+from app.core.security import get_current_user
+from app.models.user import User
+from app.schemas.audit_log import AuditLogEntryResponse
+from app.schemas.pagination import Page
+from app.services.audit_log_archive import AuditLogArchiveService
+
+router = APIRouter()
+
+
+@router.get("/list", response_model=Page[AuditLogEntryResponse])
+async def list_audit_log(
+    who: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    actor = who.upper() if who else current_user.normalized_email
+    admins = [email.upper() for email in settings.AUDIT_LOG_ADMINS]
+    if actor != current_user.normalized_email and current_user.normalized_email not in admins:
+        raise AuthorizationException("Only audit log administrators may read other users' entries")
+
+    service = AuditLogArchiveService(db)
+    entries, next_cursor = await service.query(actor, since, until, cursor, page_size(limit))
+    return Page[AuditLogEntryResponse](items=entries, next_cursor=next_cursor)
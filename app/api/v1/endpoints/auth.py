@@ -27,10 +27,11 @@ async def register(
     await user_service.create_user(user_data.email, user_data.password)
     
     if settings.EMAIL_SERVICE_ENABLED:
-        email_service = EmailService()
+        email_service = EmailService(db)
         # In a real implementation, you'd generate a proper confirmation token
         confirmation_link = f"{settings.UI_BASE_URL}/confirmEmail?userId=placeholder&code=placeholder"
         await email_service.send_confirmation_email(user_data.email, confirmation_link)
+        await db.commit()
     
     return {"message": "User created successfully"}
 
@@ -123,9 +124,10 @@ async def resend_confirmation_email(
     user = await user_service.get_by_email(request.email)
     
     if user and not user.email_confirmed:
-        email_service = EmailService()
+        email_service = EmailService(db)
         confirmation_link = f"{settings.UI_BASE_URL}/confirmEmail?userId={user.id}&code=placeholder"
         await email_service.send_confirmation_email(request.email, confirmation_link)
+        await db.commit()
     
     # Always return success to prevent email enumeration
     return {"message": "If the email exists, a confirmation link has been sent"}
@@ -140,9 +142,10 @@ async def forgot_password(
     user = await user_service.get_by_email(request.email)
     
     if user:
-        email_service = EmailService()
+        email_service = EmailService(db)
         reset_link = f"{settings.UI_BASE_URL}/resetPassword?email={request.email}&code=placeholder"
         await email_service.send_password_reset_email(request.email, reset_link)
+        await db.commit()
     
     # Always return success to prevent email enumeration
     return {"message": "If the email exists, a password reset link has been sent"}
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import time
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import authenticate_token, decode_token
+from app.models.user import User
+from app.services.approval_request_service import ApprovalRequestService
+from app.services.event_broker import event_broker, user_channel
+
+router = APIRouter()
+
+optional_security = HTTPBearer(auto_error=False)
+
+HEARTBEAT = {"type": "heartbeat"}
+
+
+async def _authenticate(token: Optional[str]) -> Tuple[User, float]:
+    """Resolve the user in a short-lived session so an open stream holds no connection."""
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_token(token, db)
+    return user, decode_token(token)["exp"]
+
+
+async def _events(user: User, expires: float) -> AsyncIterator[Optional[dict]]:
+    """A snapshot of the pending task count followed by the user's events, with
+    None for each idle heartbeat interval. Ends when the token expires."""
+    subscription = event_broker.subscribe(user_channel(user.normalized_email))
+    try:
+        async with AsyncSessionLocal() as db:
+            pending_tasks = await ApprovalRequestService(db).count_uncompleted_tasks(user)
+        yield {"type": "snapshot", "pending_tasks": pending_tasks}
+        while True:
+            remaining = expires - time.time()
+            if remaining <= 0:
+                return
+            yield await subscription.get(min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+    finally:
+        subscription.close()
+
+
+async def _server_sent_events(user: User, expires: float) -> AsyncIterator[str]:
+    async for event in _events(user, expires):
+        if event is None:
+            yield ": heartbeat\n\n"
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    access_token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    # EventSource cannot set headers, so the token may also come as a query parameter
+    user, expires = await _authenticate(credentials.credentials if credentials else access_token)
+    return StreamingResponse(
+        _server_sent_events(user, expires),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket, access_token: Optional[str] = Query(None)):
+    try:
+        user, expires = await _authenticate(access_token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def send():
+        async for event in _events(user, expires):
+            await websocket.send_json(event or HEARTBEAT)
+
+    async def receive():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(send())
+    receiver = asyncio.create_task(receive())
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if sender in done:
+        # Token expired or sending failed; the client reconnects with a fresh token
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+import secrets
+
+from app.core.config import settings
+from app.core.exceptions import AuthenticationException, AuthorizationException
+from app.core.file_access_cache import file_access_cache
+from app.core.instrumentation import render_metrics
+from app.core.preview_cache import preview_cache
+from app.core.principal_cache import principal_cache
+from app.core.response_cache import response_cache
+from app.core.security import get_current_user
+from app.models.user import User
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+async def prometheus_metrics(request: Request):
+    if settings.METRICS_SCRAPE_TOKEN:
+        expected = f"Bearer {settings.METRICS_SCRAPE_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            raise AuthenticationException("Invalid metrics scrape token")
+    elif not settings.METRICS_PUBLIC:
+        # Route names, latencies and user counts are not for anonymous callers
+        raise AuthorizationException("Set METRICS_SCRAPE_TOKEN, or METRICS_PUBLIC=true, to enable scraping")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/cache")
+async def cache_metrics(current_user: User = Depends(get_current_user)):
+    return {
+        "responses": response_cache.stats(),
+        "previews": preview_cache.stats(),
+        "principals": principal_cache.stats(),
+        "file_access": file_access_cache.stats(),
+    }
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, UploadFile, File, Query, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-import base64
-import io
+from typing import AsyncIterator, List, Optional, Union
+from datetime import datetime
 import mimetypes
+import os
 
 from app.core.database import get_db
+from app.core.pagination import requested_page_size
+from app.core.preview_cache import preview_cache
+from app.core.replicas import get_read_db
+from app.core.responses import RangeFileResponse
 from app.core.security import get_current_user
 from app.models.user import User
-from app.schemas.user_file import UserFileResponse
+from app.schemas.pagination import Page
+from app.schemas.user_file import FileAccessResponse, UserFileResponse
+from app.services.file_access_service import FileAccessService
 from app.services.user_file_service import UserFileService
 
 router = APIRouter()
@@ -26,50 +32,117 @@ async def upload_files(
     return uploaded_files
 
 
-@router.get("/list", response_model=List[UserFileResponse])
+@router.get("/list", response_model=Union[Page[UserFileResponse], List[UserFileResponse]])
 async def list_files(
+    name: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     file_service = UserFileService(db)
-    files = await file_service.list_files(current_user)
-    return files
+    size = requested_page_size(cursor, limit)
+    files, next_cursor = await file_service.list_files(
+        current_user,
+        name=name,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+        limit=size
+    )
+    if size is None:
+        return files
+    return Page[UserFileResponse](items=files, next_cursor=next_cursor)
 
 
 @router.get("/download")
 async def download_file(
+    request: Request,
     id: int = Query(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     file_service = UserFileService(db)
-    filename, content = await file_service.download_file(current_user, id)
+    user_file, file_path, stat_result = await file_service.get_download(current_user, id)
     
     # Determine content type
-    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    content_type = mimetypes.guess_type(user_file.name)[0] or 'application/octet-stream'
     
-    return StreamingResponse(
-        io.BytesIO(content),
+    return RangeFileResponse(
+        file_path,
+        request.headers,
+        etag=_file_etag(user_file.id, user_file.sha256, stat_result),
+        stat_result=stat_result,
+        filename=user_file.name,
         media_type=content_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        method=request.method
     )
 
 
 @router.get("/downloadBase64")
 async def download_file_base64(
     id: int = Query(...),
+    raw: bool = Query(False),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     file_service = UserFileService(db)
-    filename, content = await file_service.download_file(current_user, id)
+    user_file, file_path, stat_result = await file_service.get_download(current_user, id)
     
     # Determine content type
-    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    content_type = mimetypes.guess_type(user_file.name)[0] or 'application/octet-stream'
+    etag = _file_etag(user_file.id, user_file.sha256, stat_result)
     
-    # Encode to base64
-    base64_content = base64.b64encode(content).decode('utf-8')
-    return f"data:{content_type};base64,{base64_content}"
+    # The base64 alphabet needs no JSON escaping, so the JSON string is streamed as-is
+    quote = b"" if raw else b'"'
+    prefix = quote + f"data:{content_type};base64,".encode("latin-1")
+    media_type = "text/plain" if raw else "application/json"
+    
+    cached = preview_cache.get(etag) if preview_cache.enabled else None
+    if cached is not None:
+        return Response(prefix + cached + quote, media_type=media_type, headers={"ETag": etag})
+    
+    encoded_size = 4 * ((stat_result.st_size + 2) // 3)
+    return StreamingResponse(
+        _stream_data_uri(
+            file_service.iter_base64(file_path),
+            prefix,
+            quote,
+            etag if preview_cache.admits(encoded_size) else None
+        ),
+        media_type=media_type,
+        headers={"ETag": etag, "Content-Length": str(len(prefix) + encoded_size + len(quote))}
+    )
+
+
+async def _stream_data_uri(chunks: AsyncIterator[bytes], prefix: bytes, suffix: bytes, cache_key: Optional[str]):
+    yield prefix
+    parts = [] if cache_key else None
+    async for chunk in chunks:
+        if parts is not None:
+            parts.append(chunk)
+        yield chunk
+    yield suffix
+    if parts is not None:
+        preview_cache.set(cache_key, b"".join(parts))
+
+
+def _file_etag(file_id: int, sha256: Optional[str], stat_result: os.stat_result) -> str:
+    # Files uploaded before content hashing fall back to size and mtime
+    version = sha256 or f"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"
+    return f'"{file_id}-{version}"'
+
+
+@router.get("/checkAccess", response_model=List[FileAccessResponse])
+async def check_file_access(
+    ids: List[int] = Query(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    access = await FileAccessService(db).check_access(current_user, ids)
+    return [FileAccessResponse(id=file_id, allowed=allowed) for file_id, allowed in access.items()]
 
 
 @router.delete("/")
@@ -1,8 +1,54 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from typing import Callable, List
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long every checkout took to ``checkout_observers``.
+
+    Observers are called with the pool's name (``primary`` or ``replica``),
+    the seconds spent waiting, including pre-ping and connecting, and
+    whether the checkout gave up after ``DB_POOL_TIMEOUT_SECONDS``.
+    """
+
+    checkout_observers: List[Callable[[str, float, bool], None]] = []
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            for observer in self.checkout_observers:
+                observer(self._orig_logging_name, time.perf_counter() - started, timed_out)
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    options = {}
+    # SQLite keeps its driver's default: no pooling for files, one shared connection in memory
+    if make_url(url).get_backend_name() != "sqlite":
+        options = dict(
+            poolclass=MeasuredQueuePool,
+            pool_logging_name=name,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    return create_async_engine(url, echo=False, **options)
+
+
+engine = create_engine(settings.DATABASE_URL, "primary")
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -11,8 +57,12 @@ class Base(DeclarativeBase):
 
 
 async def get_db():
+    """Session on the primary. Sessions are lazy: a connection is only checked
+    out for the first statement, so routes answered from the principal cache
+    never touch the pool."""
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+import time
+
+from app.core.config import settings
+from app.models.user_file import UserFile
+
+
+class FileAccessCache:
+    """In-process cache of granted file access, keyed by (normalized email, file id).
+
+    Only grants are cached, together with a detached snapshot of the file
+    row, so a repeated download needs no query at all. Denials are not
+    cached, so new approvers get access right away. Services call
+    ``invalidate_users`` when a change can take access away from users and
+    ``invalidate_file`` when a file is deleted. Other workers only notice
+    once their entries expire, so the TTL bounds how long a revoked
+    approver keeps access.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[UserFile, float]]" = OrderedDict()
+        self._by_user: Dict[str, Set[int]] = {}
+        self._by_file: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, normalized_email: str, file_id: int) -> Optional[UserFile]:
+        if not self.enabled:
+            return None
+        key = (normalized_email, file_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, normalized_email: str, user_file: UserFile):
+        if not self.enabled:
+            return
+        key = (normalized_email, user_file.id)
+        self._entries[key] = (_detached_copy(user_file), time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(normalized_email, set()).add(user_file.id)
+        self._by_file.setdefault(user_file.id, set()).add(normalized_email)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_users(self, normalized_emails: Iterable[str]):
+        for email in set(normalized_emails):
+            for file_id in list(self._by_user.get(email, ())):
+                self._drop((email, file_id))
+
+    def invalidate_file(self, file_id: int):
+        for email in list(self._by_file.get(file_id, ())):
+            self._drop((email, file_id))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _drop(self, key: Tuple[str, int]):
+        email, file_id = key
+        self._entries.pop(key, None)
+        for index, index_key, member in ((self._by_user, email, file_id), (self._by_file, file_id, email)):
+            members = index.get(index_key)
+            if members is not None:
+                members.discard(member)
+                if not members:
+                    del index[index_key]
+
+
+def _detached_copy(user_file: UserFile) -> UserFile:
+    return UserFile(**{column.key: getattr(user_file, column.key) for column in UserFile.__table__.columns})
+
+
+file_access_cache = FileAccessCache(
+    max_entries=settings.FILE_ACCESS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.FILE_ACCESS_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,344 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import bisect
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import MeasuredQueuePool, engine
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+BYTE_BUCKETS = (0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+LAG_BUCKETS = (1, 10, 30, 60, 300, 600, 1800, 3600, 7200, 21600, 86400)
+
+
+class RequestMetrics:
+    """What one request spent, filled in by the SQL events and ``file_io``."""
+
+    __slots__ = (
+        "started", "sql_seconds", "pool_wait_seconds", "queries", "rows", "bytes_in", "bytes_out", "file_io_seconds",
+        "statements",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.file_io_seconds = 0.0
+        self.statements: Counter = Counter()
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Prometheus histogram keyed by label values, rendered in the text exposition format."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Tuple[str, ...] = ("method", "route")):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # label values -> [count per bucket (not cumulative), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Counter = Counter()
+
+    def inc(self, label_values: Tuple[str, ...]):
+        self._values[label_values] += 1
+
+    def total(self) -> int:
+        return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Wall time per request.", SECONDS_BUCKETS)
+SQL_DURATION = Histogram("http_request_sql_duration_seconds", "Time spent executing SQL per request.", SECONDS_BUCKETS)
+SQL_QUERIES = Histogram("http_request_sql_queries", "SQL statements executed per request.", COUNT_BUCKETS)
+SQL_ROWS = Histogram("http_request_sql_rows", "Rows fetched from SQL per request.", ROW_BUCKETS)
+FILE_IO_DURATION = Histogram("http_request_file_io_seconds", "Time spent reading and writing stored files per request.", SECONDS_BUCKETS)
+BYTES_IN = Histogram("http_request_size_bytes", "Request body size.", BYTE_BUCKETS)
+BYTES_OUT = Histogram("http_response_size_bytes", "Response body size.", BYTE_BUCKETS)
+REQUESTS = CounterMetric("http_requests_total", "Requests by status code.", ("method", "route", "status"))
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the pool.", SECONDS_BUCKETS, ("pool",)
+)
+POOL_CHECKOUT_TIMEOUTS = CounterMetric(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.", ("pool",)
+)
+QUERY_BUDGET_EXCEEDED = CounterMetric(
+    "http_request_query_budget_exceeded_total",
+    "Requests that ran more than N_PLUS_ONE_QUERY_THRESHOLD SQL statements.",
+    ("method", "route"),
+)
+DEADLINE_BATCH_DURATION = Histogram(
+    "deadline_scheduler_batch_duration_seconds", "Time to process one batch of overdue requests.", SECONDS_BUCKETS, ("job",)
+)
+DEADLINE_LAG = Histogram(
+    "deadline_scheduler_lag_seconds", "Delay between a request falling due and the scheduler acting on it.", LAG_BUCKETS, ("job",)
+)
+DEADLINE_ACTIONS = CounterMetric(
+    "deadline_scheduler_actions_total", "Reminder digests queued and requests expired.", ("job",)
+)
+METRICS = [
+    REQUEST_DURATION, SQL_DURATION, SQL_QUERIES, SQL_ROWS, FILE_IO_DURATION, BYTES_IN, BYTES_OUT,
+    REQUESTS, QUERY_BUDGET_EXCEEDED, POOL_CHECKOUT_WAIT, POOL_CHECKOUT_TIMEOUTS,
+    DEADLINE_BATCH_DURATION, DEADLINE_LAG, DEADLINE_ACTIONS,
+]
+
+
+@contextmanager
+def file_io() -> Iterator[None]:
+    """Charge the time spent in the block to the current request's file I/O."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current_request.get()
+        if metrics is not None:
+            metrics.file_io_seconds += time.perf_counter() - started
+
+
+def _observe_checkout(pool: str, seconds: float, timed_out: bool):
+    POOL_CHECKOUT_WAIT.observe((pool,), seconds)
+    if timed_out:
+        POOL_CHECKOUT_TIMEOUTS.inc((pool,))
+    metrics = current_request.get()
+    if metrics is not None:
+        metrics.pool_wait_seconds += seconds
+
+
+MeasuredQueuePool.checkout_observers.append(_observe_checkout)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_request.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_request.get()
+    started = getattr(context, "_instrumentation_started", None)
+    if metrics is None or started is None:
+        return
+    metrics.sql_seconds += time.perf_counter() - started
+    metrics.queries += 1
+    metrics.rows += _rows_fetched(cursor)
+    metrics.statements[statement] += 1
+
+
+# On the Engine class, so the primary and every replica are covered
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _rows_fetched(cursor) -> int:
+    if cursor.description is None:
+        return 0
+    # The async driver adapters buffer the whole result set on execute
+    rows = getattr(cursor, "_rows", None)
+    if rows is not None:
+        return len(rows)
+    return max(cursor.rowcount, 0)
+
+
+class InstrumentationMiddleware:
+    """Records per-route timings, SQL accounting and body sizes for every HTTP request.
+
+    Histograms are labelled with the matched route template, so path
+    parameters do not multiply series. With ``SERVER_TIMING_ENABLED`` the
+    response carries a ``Server-Timing`` header with the totals at the time
+    headers were sent. Requests running more than
+    ``N_PLUS_ONE_QUERY_THRESHOLD`` statements are logged with their most
+    repeated statement, the usual sign of a query per row.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        status = 500
+
+        async def receive_and_count() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                metrics.bytes_in += len(message.get("body", b""))
+            return message
+
+        async def send_and_count(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append("server-timing", _server_timing(metrics))
+            elif message["type"] == "http.response.body":
+                metrics.bytes_out += len(message.get("body", b""))
+            elif message["type"] == "http.response.zerocopy":
+                metrics.bytes_out += message.get("count") or 0
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_count, send_and_count)
+        finally:
+            current_request.reset(token)
+            self.record(scope["method"], _route_label(scope), status, metrics)
+
+    def record(self, method: str, route: str, status: int, metrics: RequestMetrics):
+        labels = (method, route)
+        REQUEST_DURATION.observe(labels, time.perf_counter() - metrics.started)
+        SQL_DURATION.observe(labels, metrics.sql_seconds)
+        SQL_QUERIES.observe(labels, metrics.queries)
+        SQL_ROWS.observe(labels, metrics.rows)
+        FILE_IO_DURATION.observe(labels, metrics.file_io_seconds)
+        BYTES_IN.observe(labels, metrics.bytes_in)
+        BYTES_OUT.observe(labels, metrics.bytes_out)
+        REQUESTS.inc((method, route, str(status)))
+
+        threshold = settings.N_PLUS_ONE_QUERY_THRESHOLD
+        if threshold > 0 and metrics.queries > threshold:
+            QUERY_BUDGET_EXCEEDED.inc(labels)
+            statement, repeats = metrics.statements.most_common(1)[0]
+            logger.warning(
+                "%s %s ran %s queries (threshold %s), most repeated %s times: %s",
+                method, route, metrics.queries, threshold, repeats, " ".join(statement.split())[:300]
+            )
+
+
+def render_metrics() -> str:
+    from app.core.file_access_cache import file_access_cache
+    from app.core.preview_cache import preview_cache
+    from app.core.principal_cache import principal_cache
+    from app.core.replicas import replica_router
+    from app.core.response_cache import response_cache
+
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    # Samples of one metric must be contiguous, so group the cache stats by name
+    cache_stats: Dict[str, List[Tuple[str, float]]] = {}
+    for cache, stats in [
+        ("responses", response_cache.stats()),
+        ("previews", preview_cache.stats()),
+        ("principals", principal_cache.stats()),
+        ("file_access", file_access_cache.stats()),
+    ]:
+        for key, value in stats.items():
+            cache_stats.setdefault(f"cache_{key}", []).append((cache, value))
+    for name, samples in cache_stats.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f'{name}{{cache="{cache}"}} {value}' for cache, value in samples)
+
+    pool_stats: Dict[str, List[Tuple[str, int]]] = {}
+    engines = [("primary", engine)] + [(replica.name, replica.engine) for replica in replica_router.replicas]
+    for pool_name, pool_engine in engines:
+        pool = pool_engine.pool
+        if not isinstance(pool, MeasuredQueuePool):
+            continue
+        for key, value in [
+            ("size", pool.size()),
+            ("capacity", pool.size() + settings.DB_MAX_OVERFLOW),
+            ("checked_out", pool.checkedout()),
+            ("idle", pool.checkedin()),
+            ("overflow", max(pool.overflow(), 0)),
+        ]:
+            pool_stats.setdefault(f"db_pool_{key}", []).append((pool_name, value))
+    for name, samples in pool_stats.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f'{name}{{pool="{pool_name}"}} {value}' for pool_name, value in samples)
+
+    if replica_router.enabled:
+        lines.append("# TYPE db_reads_total counter")
+        lines.extend(f'db_reads_total{{target="{target}"}} {count}' for target, count in sorted(replica_router.reads.items()))
+        lines.append("# TYPE db_reads_pinned_total counter")
+        lines.append(f"db_reads_pinned_total {replica_router.pinned_reads}")
+        replica_stats: Dict[str, List[Tuple[str, float]]] = {}
+        for replica_name, stats in replica_router.stats().items():
+            for key, value in stats.items():
+                replica_stats.setdefault(f"db_replica_{key}", []).append((replica_name, value))
+        for name, samples in replica_stats.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f'{name}{{replica="{replica_name}"}} {value}' for replica_name, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def _route_label(scope: Scope) -> str:
+    from app.core.response_cache import CACHED_ENDPOINTS
+
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Cache hits are answered before routing
+    if scope["path"] in CACHED_ENDPOINTS:
+        return scope["path"]
+    return "unmatched"
+
+
+def _server_timing(metrics: RequestMetrics) -> str:
+    total = (time.perf_counter() - metrics.started) * 1000
+    return (
+        f'app;dur={total:.1f}, '
+        f'db;dur={metrics.sql_seconds * 1000:.1f};desc="{metrics.queries} queries, {metrics.rows} rows", '
+        f'db-pool;dur={metrics.pool_wait_seconds * 1000:.1f}, '
+        f'file;dur={metrics.file_io_seconds * 1000:.1f}'
+    )
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,72 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_
+
+from app.core.config import settings
+from app.core.exceptions import ValidationException
+
+T = TypeVar("T")
+E = TypeVar("E", bound=Enum)
+
+
+def page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return settings.LIST_PAGE_SIZE_DEFAULT
+    return max(1, min(limit, settings.LIST_PAGE_SIZE_MAX))
+
+
+def requested_page_size(cursor: Optional[str], limit: Optional[int]) -> Optional[int]:
+    """Page size for a list request, or None for the legacy unpaginated response."""
+    if settings.LIST_UNPAGINATED_COMPAT and cursor is None and limit is None:
+        return None
+    return page_size(limit)
+
+
+def parse_statuses(values: Optional[List[int]], allowed: List[E]) -> List[E]:
+    """Turn ``status`` query values into enum members, defaulting to ``allowed``."""
+    if not values:
+        return allowed
+    by_value = {status.value: status for status in allowed}
+    if any(value not in by_value for value in values):
+        raise ValidationException(f"Status must be one of {sorted(by_value)}")
+    return [by_value[value] for value in values]
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> List[Any]:
+    """Decode a cursor built by ``encode_cursor`` whose values have the given types."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+        if not all(type(v) is t for v, t in zip(values, types)):
+            raise ValueError
+        return values
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValidationException("Invalid cursor")
+
+
+def keyset_after(columns: Sequence, values: Sequence):
+    """Filter for the rows following ``values`` when ordered by ``columns`` descending."""
+    return or_(*[
+        and_(*[column == value for column, value in zip(columns[:i], values[:i])], columns[i] < values[i])
+        for i in range(len(columns))
+    ])
+
+
+def split_page(rows: Sequence[T], limit: int, key: Callable[[T], Tuple]) -> Tuple[List[T], Optional[str]]:
+    """Trim a ``limit + 1`` fetch to one page and build the cursor for the next one."""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_cursor(*key(page[-1]))
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+class PreviewCache:
+    """LRU cache of base64-encoded file previews, bounded by total bytes.
+
+    Keys are file ETags, which change whenever the content does, so entries
+    never need explicit invalidation; stale ones simply age out.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def admits(self, encoded_size: int) -> bool:
+        return self.enabled and encoded_size <= min(self.max_entry_bytes, self.max_bytes)
+
+    def set(self, key: str, value: bytes):
+        if not self.admits(len(value)):
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+
+preview_cache = PreviewCache(
+    max_bytes=settings.BASE64_PREVIEW_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.BASE64_PREVIEW_CACHE_MAX_ENTRY_BYTES,
+)
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import time
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """In-process cache of authenticated principals.
+
+    Holds two maps: decoded JWT claims keyed by the raw token (kept until the
+    token's ``exp``), and ``User`` rows keyed by normalized email (kept for a
+    short TTL). Both are bounded LRUs so memory stays flat under token churn.
+    """
+
+    def __init__(self, max_tokens: int, max_users: int, user_ttl_seconds: int, enabled: bool = True):
+        self.enabled = enabled
+        self.max_tokens = max_tokens
+        self.max_users = max_users
+        self.user_ttl_seconds = user_ttl_seconds
+        self._claims: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._users: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self.claims_hits = 0
+        self.claims_misses = 0
+        self.user_hits = 0
+        self.user_misses = 0
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        entry = self._claims.get(token)
+        if entry is None:
+            self.claims_misses += 1
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._claims[token]
+            self.claims_misses += 1
+            return None
+        self._claims.move_to_end(token)
+        self.claims_hits += 1
+        return claims
+
+    def set_claims(self, token: str, claims: Dict[str, Any]):
+        if not self.enabled or self.max_tokens <= 0:
+            return
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        self._claims[token] = (claims, float(exp))
+        self._claims.move_to_end(token)
+        while len(self._claims) > self.max_tokens:
+            self._claims.popitem(last=False)
+
+    def get_user(self, email: str) -> Optional[User]:
+        if not self.enabled:
+            return None
+        key = email.upper()
+        entry = self._users.get(key)
+        if entry is None:
+            self.user_misses += 1
+            return None
+        user, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._users[key]
+            self.user_misses += 1
+            return None
+        self._users.move_to_end(key)
+        self.user_hits += 1
+        return user
+
+    def set_user(self, user: User):
+        if not self.enabled or self.max_users <= 0 or self.user_ttl_seconds <= 0:
+            return
+        key = user.normalized_email
+        self._users[key] = (_detached_copy(user), time.monotonic() + self.user_ttl_seconds)
+        self._users.move_to_end(key)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate_user(self, email: str):
+        self._users.pop(email.upper(), None)
+
+    def clear(self):
+        self._claims.clear()
+        self._users.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "claims_hits": self.claims_hits,
+            "claims_misses": self.claims_misses,
+            "claims_size": len(self._claims),
+            "user_hits": self.user_hits,
+            "user_misses": self.user_misses,
+            "user_size": len(self._users),
+        }
+
+
+def _detached_copy(user: User) -> User:
+    # Cache a session-independent snapshot so concurrent requests never share
+    # an instance that is still attached to another request's session.
+    return User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+
+
+principal_cache = PrincipalCache(
+    max_tokens=settings.PRINCIPAL_CACHE_MAX_TOKENS,
+    max_users=settings.PRINCIPAL_CACHE_MAX_USERS,
+    user_ttl_seconds=settings.PRINCIPAL_CACHE_USER_TTL_SECONDS,
+    enabled=settings.PRINCIPAL_CACHE_ENABLED,
+)
@@ -0,0 +1,237 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+import asyncio
+import itertools
+import logging
+import time
+
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, create_engine
+
+logger = logging.getLogger(__name__)
+
+REDIS_PIN_PREFIX = "click2approve:pin:"
+
+
+class Replica:
+    """One read replica: its engine, health and the sessions currently open on it."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = create_engine(url, name)
+        self.session_factory = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.active_sessions = 0
+
+    def mark_unhealthy(self, reason: str):
+        if self.healthy:
+            logger.warning("Read replica %s taken out of rotation: %s", self.name, reason)
+        self.healthy = False
+
+
+class MemoryPinStore:
+    """Read-your-writes pins of this worker only."""
+
+    def __init__(self):
+        self._pins: Dict[str, float] = {}
+
+    async def pin(self, normalized_emails: List[str], seconds: float):
+        now = time.monotonic()
+        if len(self._pins) > 10000:
+            self._pins = {email: until for email, until in self._pins.items() if until > now}
+        for email in normalized_emails:
+            self._pins[email] = now + seconds
+
+    async def is_pinned(self, normalized_email: str) -> bool:
+        return self._pins.get(normalized_email, 0) > time.monotonic()
+
+
+class RedisPinStore:
+    """Read-your-writes pins shared by every worker through Redis keys that expire with the window."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def pin(self, normalized_emails: List[str], seconds: float):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for email in normalized_emails:
+                pipe.set(REDIS_PIN_PREFIX + email, 1, px=int(seconds * 1000))
+            await pipe.execute()
+
+    async def is_pinned(self, normalized_email: str) -> bool:
+        return bool(await self._redis.exists(REDIS_PIN_PREFIX + normalized_email))
+
+    async def close(self):
+        await self._redis.close()
+
+
+class ReplicaRouter:
+    """Sends read-only sessions to healthy replicas and everything else to the primary.
+
+    Replicas are picked round robin or by fewest open sessions
+    (``DB_REPLICA_BALANCING``). A background check runs ``SELECT 1`` on each
+    replica every ``DB_REPLICA_HEALTH_CHECK_SECONDS``, plus the replication
+    lag on MySQL when ``DB_REPLICA_MAX_LAG_SECONDS`` is set, and a replica
+    whose connection fails during a request is dropped until it passes
+    again. Services call ``pin`` after committing a change with the users
+    whose lists it touched, and those users read from the primary for the
+    next ``DB_READ_YOUR_WRITES_SECONDS``.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls, 1)]
+        self.pins = None
+        if self.replicas and settings.DB_READ_YOUR_WRITES_SECONDS > 0:
+            if settings.DB_READ_YOUR_WRITES_BACKEND == "redis":
+                self.pins = RedisPinStore(settings.DB_READ_YOUR_WRITES_REDIS_URL)
+            else:
+                self.pins = MemoryPinStore()
+        self.reads: Counter = Counter()
+        self.pinned_reads = 0
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    async def pin(self, normalized_emails: Iterable[str]):
+        """Route the users' reads to the primary for a while. Called after commit, so failures are only logged."""
+        emails = sorted(set(normalized_emails))
+        if self.pins is None or not emails:
+            return
+        try:
+            await self.pins.pin(emails, settings.DB_READ_YOUR_WRITES_SECONDS)
+        except Exception:
+            logger.exception("Failed to pin reads to the primary")
+
+    async def choose(self, normalized_email: Optional[str]) -> Optional[Replica]:
+        """The replica to read from, or None for the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.pins is not None and normalized_email is not None:
+            try:
+                if await self.pins.is_pinned(normalized_email):
+                    self.pinned_reads += 1
+                    return None
+            except Exception:
+                logger.exception("Failed to look up read pin, reading from the primary")
+                return None
+        if settings.DB_REPLICA_BALANCING == "least_connections":
+            return min(healthy, key=lambda replica: replica.active_sessions)
+        return healthy[next(self._next) % len(healthy)]
+
+    @asynccontextmanager
+    async def session(self, normalized_email: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        replica = await self.choose(normalized_email)
+        if replica is None:
+            self.reads["primary"] += 1
+            async with AsyncSessionLocal() as session:
+                yield session
+            return
+
+        self.reads[replica.name] += 1
+        replica.active_sessions += 1
+        try:
+            async with replica.session_factory() as session:
+                yield session
+        except (exc.OperationalError, exc.InterfaceError) as e:
+            # Usually a lost or refused connection; the next health check brings it back if not
+            replica.mark_unhealthy(str(e.orig))
+            raise
+        finally:
+            replica.active_sessions -= 1
+
+    async def check(self):
+        for replica in self.replicas:
+            try:
+                replica.lag_seconds = await asyncio.wait_for(
+                    self._probe(replica), timeout=settings.DB_REPLICA_HEALTH_CHECK_SECONDS
+                )
+            except Exception as e:
+                replica.mark_unhealthy(f"health check failed: {e!r}")
+                continue
+            lag_limit = settings.DB_REPLICA_MAX_LAG_SECONDS
+            checks_lag = lag_limit > 0 and replica.engine.dialect.name == "mysql"
+            # No lag means replication is stopped or the server is not a replica
+            if checks_lag and (replica.lag_seconds is None or replica.lag_seconds > lag_limit):
+                replica.mark_unhealthy(f"replication lag {replica.lag_seconds} s")
+            elif not replica.healthy:
+                logger.info("Read replica %s back in rotation", replica.name)
+                replica.healthy = True
+
+    async def _probe(self, replica: Replica) -> Optional[float]:
+        async with replica.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            if settings.DB_REPLICA_MAX_LAG_SECONDS <= 0 or replica.engine.dialect.name != "mysql":
+                return None
+            row = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+            if row is None:
+                return None
+            lag = row.get("Seconds_Behind_Source")
+            return float(lag) if lag is not None else None
+
+    def start(self):
+        if self._task is None and self.replicas and settings.DB_REPLICA_HEALTH_CHECK_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if isinstance(self.pins, RedisPinStore):
+            await self.pins.close()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            replica.name: {
+                "healthy": int(replica.healthy),
+                "active_sessions": replica.active_sessions,
+                "lag_seconds": replica.lag_seconds if replica.lag_seconds is not None else -1,
+            }
+            for replica in self.replicas
+        }
+
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS)
+
+
+async def get_read_db(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+):
+    """Session for read-only routes, on a replica unless the caller is pinned to the primary.
+
+    The routes still require ``get_current_user``; the token is only read
+    here to find the caller's pin.
+    """
+    from app.core.security import verify_token
+
+    email = await verify_token(credentials.credentials) if credentials is not None else None
+    async with replica_router.session(email.upper() if email else None) as session:
+        yield session
@@ -0,0 +1,288 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import itertools
+import logging
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Version scopes, bumped by the service methods that change what they cover
+REQUESTS = "requests"
+TASKS = "tasks"
+FILES = "files"
+ACCOUNT = "account"
+
+CACHED_ENDPOINTS = {
+    "/api/request/list": REQUESTS,
+    "/api/task/listUncompleted": TASKS,
+    "/api/task/listCompleted": TASKS,
+    "/api/file/list": FILES,
+    "/api/account/manage/info": ACCOUNT,
+}
+
+REDIS_KEY_PREFIX = "click2approve:cache:"
+
+# Reads a version, creating it from the global counter when missing, so a
+# version that was evicted never comes back with a value it had before
+REDIS_GET_VERSION = """
+local version = redis.call('GET', KEYS[2])
+if not version then
+    version = redis.call('INCR', KEYS[1])
+    redis.call('SET', KEYS[2], version)
+end
+return version
+"""
+REDIS_BUMP_VERSIONS = """
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], redis.call('INCR', KEYS[1]))
+end
+"""
+
+
+class MemoryCacheBackend:
+    """Per-process LRU of response bodies and version stamps.
+
+    Versions come from one counter seeded with a random epoch, so they never
+    repeat, even after a restart or after an evicted stamp is recreated.
+    Only suitable for a single worker: other workers never see its bumps.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._epoch = uuid.uuid4().hex[:8]
+        self._counter = itertools.count(1)
+        self._versions: "OrderedDict[str, str]" = OrderedDict()
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    async def get_version(self, key: str) -> str:
+        version = self._versions.get(key)
+        if version is None:
+            version = self._versions[key] = self._next_version()
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.max_entries:
+            self._versions.popitem(last=False)
+        return version
+
+    async def bump(self, keys: List[str]):
+        for key in keys:
+            if key in self._versions:
+                self._versions[key] = self._next_version()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        body, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    async def set(self, key: str, body: bytes, ttl_seconds: int):
+        self._entries[key] = (body, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _next_version(self) -> str:
+        return f"{self._epoch}.{next(self._counter)}"
+
+
+class RedisCacheBackend:
+    """Responses and version stamps shared by every worker through Redis.
+
+    Entries expire after ``RESPONSE_CACHE_TTL_SECONDS``. Versions are drawn
+    from one global counter, so they never repeat even if Redis evicts a
+    stamp.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._get_version = self._redis.register_script(REDIS_GET_VERSION)
+        self._bump_versions = self._redis.register_script(REDIS_BUMP_VERSIONS)
+        self._counter_key = REDIS_KEY_PREFIX + "counter"
+
+    async def get_version(self, key: str) -> str:
+        version = await self._get_version(keys=[self._counter_key, REDIS_KEY_PREFIX + "version:" + key])
+        return version.decode() if isinstance(version, bytes) else str(version)
+
+    async def bump(self, keys: List[str]):
+        await self._bump_versions(keys=[self._counter_key] + [REDIS_KEY_PREFIX + "version:" + key for key in keys])
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(REDIS_KEY_PREFIX + "entry:" + key)
+
+    async def set(self, key: str, body: bytes, ttl_seconds: int):
+        await self._redis.set(REDIS_KEY_PREFIX + "entry:" + key, body, ex=ttl_seconds)
+
+    def size(self) -> int:
+        return -1  # Not tracked, the entries live in Redis
+
+
+class ResponseCache:
+    """Cache of GET responses keyed by user and URL, invalidated by version stamps.
+
+    Each user has one version stamp per scope (``REQUESTS``, ``TASKS``,
+    ``FILES``, ``ACCOUNT``). Entries are stored under the stamp that was
+    current when they were computed, and services call ``invalidate`` after
+    committing a change, so stale entries simply stop being found. The
+    stamp also makes up the ETag, which lets an unchanged response be
+    answered with 304 without reading the entry at all.
+    """
+
+    def __init__(self, backend_name: str):
+        self.backend = None
+        if backend_name == "memory":
+            self.backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+        elif backend_name == "redis":
+            self.backend = RedisCacheBackend(settings.RESPONSE_CACHE_REDIS_URL)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def invalidate(self, scope: str, normalized_emails: Iterable[str]):
+        """Bump the users' stamps for ``scope``. Called after commit, so failures are only logged."""
+        if not self.enabled:
+            return
+        keys = sorted({f"{scope}:{email}" for email in normalized_emails})
+        if not keys:
+            return
+        try:
+            await self.backend.bump(keys)
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to invalidate cached %s responses", scope)
+
+    async def version(self, scope: str, normalized_email: str) -> str:
+        return await self.backend.get_version(f"{scope}:{normalized_email}")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, body: bytes):
+        if len(body) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES:
+            await self.backend.set(key, body, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.not_modified + self.misses
+        return {
+            "hits": self.hits,
+            "not_modified": self.not_modified,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": (self.hits + self.not_modified) / lookups if lookups else 0.0,
+            "entries": self.backend.size() if self.enabled else 0,
+        }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_BACKEND)
+
+
+class ResponseCacheMiddleware:
+    """Serves ``CACHED_ENDPOINTS`` from ``response_cache``.
+
+    The caller is identified from the bearer token; requests without a valid
+    one pass straight through so the endpoint answers them. Only 200
+    responses are stored. Cached responses are marked ``private, no-cache``
+    so browsers revalidate them with ``If-None-Match``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        cache_scope = CACHED_ENDPOINTS.get(scope.get("path")) if scope["type"] == "http" else None
+        if cache_scope is None or scope["method"] != "GET" or not response_cache.enabled:
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        email = await _authenticated_email(headers)
+        if email is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            version = await response_cache.version(cache_scope, email)
+            key = f"{email}:{scope['path']}?{_canonical_query(scope)}:{version}"
+            etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+            if etag in [tag.strip() for tag in headers.get("if-none-match", "").split(",")]:
+                response_cache.not_modified += 1
+                return await _send_cached(send, 304, etag, b"")
+            body = await response_cache.get(key)
+        except Exception:
+            response_cache.errors += 1
+            logger.exception("Response cache lookup failed")
+            return await self.app(scope, receive, send)
+
+        if body is not None:
+            response_cache.hits += 1
+            return await _send_cached(send, 200, etag, body)
+
+        response_cache.misses += 1
+        status = 0
+        chunks: List[bytes] = []
+
+        async def send_and_capture(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if status == 200:
+                    response_headers = MutableHeaders(scope=message)
+                    response_headers["etag"] = etag
+                    response_headers["cache-control"] = "private, no-cache"
+                    response_headers.append("vary", "Authorization")
+            elif message["type"] == "http.response.body" and status == 200:
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+        if status == 200:
+            try:
+                await response_cache.set(key, b"".join(chunks))
+            except Exception:
+                response_cache.errors += 1
+                logger.exception("Response cache store failed")
+
+
+async def _authenticated_email(headers: Headers) -> Optional[str]:
+    from app.core.security import verify_token
+
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    email = await verify_token(token)
+    return email.upper() if email else None
+
+
+def _canonical_query(scope: Scope) -> str:
+    query = scope.get("query_string", b"").decode("latin-1")
+    return "&".join(sorted(part for part in query.split("&") if part))
+
+
+async def _send_cached(send: Send, status: int, etag: str, body: bytes):
+    headers = [
+        (b"etag", etag.encode()),
+        (b"cache-control", b"private, no-cache"),
+        (b"vary", b"Authorization"),
+    ]
+    if status == 200:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
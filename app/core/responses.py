@@ -0,0 +1,218 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, List, Optional, Tuple, Type
+import os
+import secrets
+
+import anyio
+import orjson
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, JSONResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.instrumentation import file_io
+
+MAX_RANGES = 16
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    FastAPI hands over content already converted by the response model or
+    ``jsonable_encoder``, and for that content the output is byte for byte
+    what ``JSONResponse`` produces. Enums, datetimes and Pydantic models
+    passed to the class directly are serialized as FastAPI would.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def default_response_class() -> Type[JSONResponse]:
+    if settings.JSON_RESPONSE_CLASS == "orjson":
+        return ORJSONResponse
+    return JSONResponse
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse with strong ETags, conditional GET and byte ranges.
+
+    Answers ``If-None-Match``/``If-Modified-Since`` with 304, single ranges
+    with 206 and ``Content-Range``, several ranges with a
+    ``multipart/byteranges`` body, and unsatisfiable ranges with 416. The body
+    is handed to the server through the ASGI ``http.response.zerocopy``
+    extension when it is offered, and otherwise streamed in fixed-size chunks,
+    so memory use does not grow with the file size.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        request_headers: Headers,
+        etag: str,
+        stat_result: os.stat_result,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        method: Optional[str] = None,
+    ) -> None:
+        super().__init__(path, filename=filename, media_type=media_type, method=method)
+        self.stat_result = stat_result
+        self.file_size = stat_result.st_size
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = last_modified
+        self.headers["accept-ranges"] = "bytes"
+
+        # (part header, offset, length) segments followed by a trailer
+        self.segments: List[Tuple[bytes, int, int]] = [(b"", 0, self.file_size)]
+        self.trailer = b""
+
+        if _not_modified(request_headers, etag, stat_result.st_mtime):
+            self.status_code = 304
+            self.send_header_only = True
+            del self.headers["content-type"]
+            del self.headers["content-disposition"]
+            return
+
+        ranges = _requested_ranges(request_headers, etag, last_modified, self.file_size)
+        if ranges is None:
+            self.headers["content-length"] = str(self.file_size)
+        elif not ranges:
+            self.status_code = 416
+            self.send_header_only = True
+            self.headers["content-range"] = f"bytes */{self.file_size}"
+            self.headers["content-length"] = "0"
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.status_code = 206
+            self.segments = [(b"", start, end - start + 1)]
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            boundary = secrets.token_hex(16)
+            part_type = self.media_type
+            self.status_code = 206
+            self.segments = [
+                (
+                    (
+                        f"\r\n--{boundary}\r\n"
+                        f"Content-Type: {part_type}\r\n"
+                        f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+                    ).encode("latin-1"),
+                    start,
+                    end - start + 1,
+                )
+                for start, end in ranges
+            ]
+            self.trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            self.headers["content-length"] = str(
+                sum(len(header) + length for header, _, length in self.segments) + len(self.trailer)
+            )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopy" in scope.get("extensions", {})
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for header, offset, length in self.segments:
+                if header:
+                    await send({"type": "http.response.body", "body": header, "more_body": True})
+                if zerocopy:
+                    await send(
+                        {
+                            "type": "http.response.zerocopy",
+                            "file": file.wrapped,
+                            "offset": offset,
+                            "count": length,
+                            "more_body": True,
+                        }
+                    )
+                    continue
+                await file.seek(offset)
+                remaining = length
+                while remaining > 0:
+                    with file_io():
+                        chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": self.trailer, "more_body": False})
+
+
+def _not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or _weak(etag) in [_weak(tag) for tag in tags]
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _requested_ranges(
+    request_headers: Headers, etag: str, last_modified: str, size: int
+) -> Optional[List[Tuple[int, int]]]:
+    """Return the satisfiable ranges, an empty list if none are, or None to send the whole file."""
+    header = request_headers.get("range")
+    if not header or not header.startswith("bytes="):
+        return None
+
+    if_range = request_headers.get("if-range")
+    if if_range is not None and if_range != etag and if_range != last_modified:
+        return None
+
+    specs = header[len("bytes="):].split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        first, sep, last = spec.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and end < start:
+                    return None
+            else:
+                suffix = int(last)
+                start = max(size - suffix, 0)
+                end = size - 1
+                if suffix == 0:
+                    continue
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def _weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
@@ -1,28 +1,19 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.principal_cache import principal_cache
 from app.models.user import User
 from app.services.user_service import UserService
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -42,34 +33,55 @@ def create_refresh_token(data: dict):
     return encoded_jwt
 
 
-async def verify_token(token: str) -> Optional[str]:
+def decode_token(token: str) -> Optional[dict]:
+    payload = principal_cache.get_claims(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    principal_cache.set_claims(token, payload)
+    return payload
+
+
+async def verify_token(token: str) -> Optional[str]:
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+    return email
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ) -> User:
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """Resolve a bearer token to its user, raising 401 when it is invalid."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    email = await verify_token(credentials.credentials)
+    email = await verify_token(token)
     if email is None:
         raise credentials_exception
     
+    user = principal_cache.get_user(email)
+    if user is not None:
+        return user
+    
     user_service = UserService(db)
     user = await user_service.get_by_email(email)
     if user is None:
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    principal_cache.set_user(user)
+    return user
@@ -1,11 +1,21 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.passwords import password_hasher
+from app.core.replicas import replica_router
+from app.core.responses import default_response_class
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.instrumentation import InstrumentationMiddleware
+from app.services.email_dispatcher import email_dispatcher
+from app.services.counter_service import counter_reconciler
+from app.services.deadline_service import deadline_scheduler
+from app.services.audit_log_writer import audit_log_writer
+from app.services.audit_log_archive import audit_log_archiver
+from app.services.event_broker import event_broker
 from app.api.v1.api import api_router
 from app.core.exceptions import AppException
 
@@ -15,16 +25,41 @@ async def lifespan(app: FastAPI):
     # Create tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    if settings.EMAIL_SERVICE_ENABLED:
+        email_dispatcher.start()
+    if settings.AUDIT_LOG_MODE == "async":
+        audit_log_writer.start()
+    counter_reconciler.start()
+    audit_log_archiver.start()
+    deadline_scheduler.start()
+    await event_broker.start()
+    replica_router.start()
     yield
+    await event_broker.stop()
+    await deadline_scheduler.stop()
+    await audit_log_archiver.stop()
+    await counter_reconciler.stop()
+    await email_dispatcher.stop()
+    # Drain buffered audit entries last, after everything that may still log
+    await audit_log_writer.stop()
+    password_hasher.shutdown()
+    await replica_router.stop()
+    await engine.dispose()
 
 
+json_response_class = default_response_class()
+
 app = FastAPI(
     title="Click2Approve API",
     description="Document approval system API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=json_response_class
 )
 
+# Added before CORS so that cached responses still get CORS headers
+app.add_middleware(ResponseCacheMiddleware)
+
 # Configure CORS
 if settings.ALLOWED_ORIGINS:
     app.add_middleware(
@@ -35,13 +70,17 @@ if settings.ALLOWED_ORIGINS:
         allow_headers=["*"],
     )
 
+# Outermost, so timings include every other middleware
+if settings.INSTRUMENTATION_ENABLED:
+    app.add_middleware(InstrumentationMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api")
 
 
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
-    return JSONResponse(
+    return json_response_class(
         status_code=exc.status_code,
         content={"detail": exc.detail, "title": exc.title}
     )
@@ -0,0 +1,11 @@
+"""Importing the package registers every model on ``Base.metadata``."""
+from app.models import (
+    user,
+    user_file,
+    approval_request,
+    approval_request_task,
+    audit_log,
+    email_outbox,
+    file_blob,
+    user_stats,
+)
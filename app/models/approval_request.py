@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, BigInteger, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, BigInteger, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -15,13 +15,20 @@ class ApprovalStatus(Enum):
 class ApprovalRequest(Base):
     __tablename__ = "approval_requests"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     submitted = Column(DateTime, default=datetime.utcnow)
     author = Column(String(256), nullable=False)
     author_id = Column(String(36), ForeignKey("users.id"), nullable=False)
     status = Column(SQLEnum(ApprovalStatus), default=ApprovalStatus.SUBMITTED)
     approve_by = Column(DateTime, nullable=True)
     comment = Column(Text, nullable=True)
+    reminded = Column(DateTime, nullable=True)  # when the approvers were sent an overdue reminder
+
+    __table_args__ = (
+        Index("ix_approval_requests_author_id", "author", "id"),
+        Index("ix_approval_requests_status_approve_by_id", "status", "approve_by", "id"),
+        Index("ix_approval_requests_status_reminded_approve_by_id", "status", "reminded", "approve_by", "id"),
+    )
     
     # Relationships
     author_user = relationship("User", back_populates="approval_requests")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, BigInteger, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, BigInteger, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -8,13 +8,17 @@ from app.models.approval_request import ApprovalStatus
 class ApprovalRequestTask(Base):
     __tablename__ = "approval_request_tasks"
 
-    id = Column(BigInteger, primary_key=True, index=True)
-    approval_request_id = Column(BigInteger, ForeignKey("approval_requests.id"), nullable=False)
+    id = Column(BigInteger, primary_key=True)
+    approval_request_id = Column(BigInteger, ForeignKey("approval_requests.id"), nullable=False, index=True)
     approver = Column(String(256), nullable=False)
     approver_id = Column(String(36), ForeignKey("users.id"), nullable=True)
     status = Column(SQLEnum(ApprovalStatus), default=ApprovalStatus.SUBMITTED)
     completed = Column(DateTime, nullable=True)
     comment = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_approval_request_tasks_approver_status_id", "approver", "status", "id"),
+    )
     
     # Relationships
     approval_request = relationship("ApprovalRequest", back_populates="tasks")
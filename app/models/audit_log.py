@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, BigInteger, Text
+from sqlalchemy import Column, String, DateTime, BigInteger, Text, Index
 from datetime import datetime
 from app.core.database import Base
 
@@ -6,8 +6,14 @@ from app.core.database import Base
 class AuditLogEntry(Base):
     __tablename__ = "audit_log_entries"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     who = Column(String(256), nullable=False)
-    when = Column(DateTime, default=datetime.utcnow)
+    when = Column(DateTime, default=datetime.utcnow, nullable=False)
     what = Column(String(500), nullable=False)
-    data = Column(Text, nullable=False)
\ No newline at end of file
+    data = Column(Text, nullable=False)
+
+    # On MySQL the table is range-partitioned by month on `when` (see migration 0004)
+    __table_args__ = (
+        Index("ix_audit_log_entries_who_when_id", "who", "when", "id"),
+        Index("ix_audit_log_entries_when", "when"),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Integer, BigInteger, String, Text, Index, Enum as SQLEnum
+from datetime import datetime
+from enum import Enum
+from app.core.database import Base
+
+
+class OutboxStatus(Enum):
+    PENDING = 0
+    DEAD = 1
+
+
+class EmailOutboxMessage(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    recipients = Column(Text, nullable=False)  # JSON list of addresses not yet delivered
+    subject = Column(String(500), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(SQLEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
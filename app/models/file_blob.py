@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from datetime import datetime
+from app.core.database import Base
+
+
+class FileBlob(Base):
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created = Column(DateTime, default=datetime.utcnow)
@@ -7,7 +7,7 @@ from app.core.database import Base
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String(36), primary_key=True, index=True)
+    id = Column(String(36), primary_key=True)
     email = Column(String(256), unique=True, index=True, nullable=False)
     normalized_email = Column(String(256), unique=True, index=True, nullable=False)
     password_hash = Column(String(256), nullable=False)
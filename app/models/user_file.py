@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, BigInteger, Table
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, BigInteger, Table, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -7,20 +7,26 @@ from app.core.database import Base
 approval_request_files = Table(
     'approval_request_files',
     Base.metadata,
-    Column('approval_request_id', BigInteger, ForeignKey('approval_requests.id')),
-    Column('user_file_id', BigInteger, ForeignKey('user_files.id'))
+    Column('approval_request_id', BigInteger, ForeignKey('approval_requests.id'), primary_key=True),
+    Column('user_file_id', BigInteger, ForeignKey('user_files.id'), primary_key=True),
+    Index('ix_approval_request_files_user_file_id', 'user_file_id')
 )
 
 
 class UserFile(Base):
     __tablename__ = "user_files"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     name = Column(String(255), nullable=False)
     type = Column(String(50), nullable=False)
     size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=True, index=True)
     created = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_user_files_owner_created_id", "owner_id", "created", "id"),
+    )
     
     # Relationships
     owner = relationship("User", back_populates="user_files")
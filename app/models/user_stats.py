@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from datetime import datetime
+from app.core.database import Base
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    normalized_email = Column(String(256), primary_key=True)
+    pending_tasks = Column(Integer, nullable=False, default=0)
+    request_count = Column(Integer, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -41,4 +41,8 @@ class ApprovalRequestResponse(BaseModel):
 class ApprovalRequestTaskComplete(BaseModel):
     id: int
     status: ApprovalStatus
-    comment: Optional[str] = None
\ No newline at end of file
+    comment: Optional[str] = None
+
+
+class ApprovalRequestTaskBulkComplete(BaseModel):
+    tasks: List[ApprovalRequestTaskComplete]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class AuditLogEntryResponse(BaseModel):
+    id: int
+    who: str
+    when: datetime
+    what: str
+    data: str
+
+    class Config:
+        from_attributes = True
@@ -22,4 +22,9 @@ class UserFileResponse(UserFileBase):
 
 
 class UserFileListResponse(BaseModel):
-    files: List[UserFileResponse]
\ No newline at end of file
+    files: List[UserFileResponse]
+
+
+class FileAccessResponse(BaseModel):
+    id: int
+    allowed: bool
\ No newline at end of file
@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from datetime import datetime
+
+from app.models.user import User
+from app.models.user_file import UserFile, approval_request_files
+from app.models.approval_request import ApprovalRequest, ApprovalStatus
+from app.models.approval_request_task import ApprovalRequestTask
+from app.models.user_stats import UserStats
+from app.core.pagination import decode_cursor, keyset_after, split_page
+
+REQUEST_COLUMNS = (
+    ApprovalRequest.id,
+    ApprovalRequest.submitted,
+    ApprovalRequest.author,
+    ApprovalRequest.status,
+    ApprovalRequest.approve_by,
+    ApprovalRequest.comment,
+)
+FILE_COLUMNS = (UserFile.id, UserFile.name, UserFile.type, UserFile.size, UserFile.created)
+TASK_COLUMNS = (
+    ApprovalRequestTask.id,
+    ApprovalRequestTask.approver,
+    ApprovalRequestTask.status,
+    ApprovalRequestTask.completed,
+    ApprovalRequestTask.comment,
+)
+
+# Parent ids per child query, keeps IN lists bounded for unpaginated listings
+CHILD_BATCH_SIZE = 500
+
+
+class ApprovalRequestReadModel:
+    """Read side of approval requests and tasks.
+
+    Queries select only the columns the list responses return and build
+    plain dicts shaped like ``ApprovalRequestResponse`` and
+    ``ApprovalRequestTaskResponse``, so no ORM objects enter the identity
+    map. Files and tasks of a page of requests are fetched with one query
+    each and grouped by request id.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def count_uncompleted_tasks(self, user: User) -> Optional[int]:
+        """The user's pending task counter, or None while ``user_stats`` has no row to read it from."""
+        return await self.db.scalar(
+            select(UserStats.pending_tasks).where(UserStats.normalized_email == user.normalized_email)
+        )
+
+    async def list_approval_requests(
+        self,
+        user: User,
+        statuses: Optional[List[ApprovalStatus]] = None,
+        submitted_from: Optional[datetime] = None,
+        submitted_to: Optional[datetime] = None,
+        file_name: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of the user's requests, newest first, and the cursor for the next page.
+
+        Without ``limit`` every matching request is returned.
+        """
+        query = select(*REQUEST_COLUMNS).where(ApprovalRequest.author == user.normalized_email)
+        if statuses:
+            query = query.where(ApprovalRequest.status.in_(statuses))
+        if submitted_from:
+            query = query.where(ApprovalRequest.submitted >= submitted_from)
+        if submitted_to:
+            query = query.where(ApprovalRequest.submitted < submitted_to)
+        if file_name:
+            query = query.where(ApprovalRequest.user_files.any(UserFile.name.icontains(file_name, autoescape=True)))
+        if cursor:
+            query = query.where(keyset_after([ApprovalRequest.id], decode_cursor(cursor, int)))
+        query = query.order_by(ApprovalRequest.id.desc())
+
+        next_cursor = None
+        if limit is None:
+            rows = (await self.db.execute(query)).all()
+        else:
+            rows = (await self.db.execute(query.limit(limit + 1))).all()
+            rows, next_cursor = split_page(rows, limit, lambda r: (r.id,))
+
+        requests = {}
+        for row in rows:
+            request = row._asdict()
+            request.update(user_files=[], approvers=[], tasks=[])
+            requests[row.id] = request
+        await self._attach_children(requests)
+        return list(requests.values()), next_cursor
+
+    async def list_tasks(
+        self,
+        user: User,
+        statuses: List[ApprovalStatus],
+        author: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of the user's tasks, newest first, and the cursor for the next page.
+
+        The date range applies to the completion date of completed tasks and
+        to the submission date of the request otherwise. Without ``limit``
+        every matching task is returned.
+        """
+        query = select(*TASK_COLUMNS).where(
+            and_(
+                ApprovalRequestTask.approver == user.normalized_email,
+                ApprovalRequestTask.status.in_(statuses)
+            )
+        )
+        if author or ((date_from or date_to) and ApprovalStatus.SUBMITTED in statuses):
+            query = query.join(ApprovalRequest, ApprovalRequestTask.approval_request_id == ApprovalRequest.id)
+        if author:
+            query = query.where(ApprovalRequest.author == author.upper())
+        date_column = ApprovalRequest.submitted if ApprovalStatus.SUBMITTED in statuses else ApprovalRequestTask.completed
+        if date_from:
+            query = query.where(date_column >= date_from)
+        if date_to:
+            query = query.where(date_column < date_to)
+        if cursor:
+            query = query.where(keyset_after([ApprovalRequestTask.id], decode_cursor(cursor, int)))
+        query = query.order_by(ApprovalRequestTask.id.desc())
+
+        if limit is None:
+            rows = (await self.db.execute(query)).all()
+            return [row._asdict() for row in rows], None
+        rows = (await self.db.execute(query.limit(limit + 1))).all()
+        rows, next_cursor = split_page(rows, limit, lambda r: (r.id,))
+        return [row._asdict() for row in rows], next_cursor
+
+    async def _attach_children(self, requests: Dict[int, Dict[str, Any]]):
+        request_ids = list(requests)
+        for start in range(0, len(request_ids), CHILD_BATCH_SIZE):
+            batch = request_ids[start:start + CHILD_BATCH_SIZE]
+
+            request_id = approval_request_files.c.approval_request_id
+            result = await self.db.execute(
+                select(request_id, *FILE_COLUMNS)
+                .join(UserFile, UserFile.id == approval_request_files.c.user_file_id)
+                .where(request_id.in_(batch))
+                .order_by(UserFile.id)
+            )
+            for row in result.all():
+                file = row._asdict()
+                requests[file.pop("approval_request_id")]["user_files"].append(file)
+
+            result = await self.db.execute(
+                select(ApprovalRequestTask.approval_request_id, *TASK_COLUMNS)
+                .where(ApprovalRequestTask.approval_request_id.in_(batch))
+                .order_by(ApprovalRequestTask.id)
+            )
+            for row in result.all():
+                task = row._asdict()
+                request = requests[task.pop("approval_request_id")]
+                request["approvers"].append(task["approver"])
+                request["tasks"].append(task)
@@ -1,34 +1,38 @@
-from typing import List
+from typing import Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, delete, and_, case, literal
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime
 
 from app.models.user import User
-from app.models.user_file import UserFile
+from app.models.user_file import UserFile, approval_request_files
 from app.models.approval_request import ApprovalRequest, ApprovalStatus
 from app.models.approval_request_task import ApprovalRequestTask
 from app.schemas.approval_request import ApprovalRequestSubmit, ApprovalRequestTaskComplete
 from app.core.config import settings
 from app.core.exceptions import ValidationException, NotFoundException
+from app.core.file_access_cache import file_access_cache
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache, REQUESTS, TASKS
 from app.services.audit_log_service import AuditLogService
 from app.services.email_service import EmailService
+from app.services.counter_service import CounterService
+from app.services.event_broker import event_broker, pending_task_events, user_channel
 
 
 class ApprovalRequestService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.audit_service = AuditLogService(db)
-        self.email_service = EmailService()
+        self.email_service = EmailService(db)
+        self.counters = CounterService(db)
 
     async def check_limitations(self, user: User, payload: ApprovalRequestSubmit):
         # Check approval request count limit
         if settings.MAX_APPROVAL_REQUEST_COUNT > 0:
-            result = await self.db.execute(
-                select(ApprovalRequest).where(ApprovalRequest.author == user.normalized_email)
-            )
-            current_count = len(result.scalars().all())
-            if current_count + 1 > settings.MAX_APPROVAL_REQUEST_COUNT:
+            stats = await self.counters.get(user.normalized_email)
+            if stats.request_count + 1 > settings.MAX_APPROVAL_REQUEST_COUNT:
                 raise ValidationException(f"Maximum approval request count ({settings.MAX_APPROVAL_REQUEST_COUNT}) exceeded")
 
         # Check approver count limit
@@ -74,7 +78,15 @@ class ApprovalRequestService:
             )
             self.db.add(task)
 
-        await self.db.commit()
+        await self.counters.add(user.normalized_email, request_count=1)
+        await self.counters.add_pending_tasks(normalized_emails, 1)
+
+        # Queue email notifications in the same transaction
+        await self.email_service.send_approval_request_notification(
+            [email.lower() for email in payload.emails],
+            user.email.lower(),
+            [f.name for f in user_files]
+        )
 
         # Audit log
         await self.audit_service.log(
@@ -83,31 +95,57 @@ class ApprovalRequestService:
             f"Request ID: {approval_request.id}, Files: {len(user_files)}"
         )
 
-        # Send email notifications
-        for email in payload.emails:
-            await self.email_service.send_approval_request_notification(
-                email.lower(),
-                user.email.lower(),
-                [f.name for f in user_files]
-            )
+        await self.db.commit()
+        await replica_router.pin([user.normalized_email, *normalized_emails])
+        await response_cache.invalidate(REQUESTS, [user.normalized_email])
+        await response_cache.invalidate(TASKS, normalized_emails)
+        await event_broker.publish(pending_task_events(
+            normalized_emails, "task.created", 1, request_id=approval_request.id, author=user.email.lower()
+        ))
 
     async def delete_approval_request(self, user: User, request_id: int):
-        result = await self.db.execute(
-            select(ApprovalRequest)
-            .options(selectinload(ApprovalRequest.tasks), selectinload(ApprovalRequest.user_files))
-            .where(and_(ApprovalRequest.id == request_id, ApprovalRequest.author == user.normalized_email))
+        approval_requests = await lock_approval_requests(
+            self.db, ApprovalRequest.id == request_id, ApprovalRequest.author == user.normalized_email
         )
-        approval_request = result.scalar_one_or_none()
-        
-        if not approval_request:
+        if not approval_requests:
             raise NotFoundException("Approval request not found")
+        approval_request = approval_requests[0]
 
         # Get approvers for notification
         approvers = [task.approver for task in approval_request.tasks]
         file_names = [f.name for f in approval_request.user_files]
 
-        await self.db.delete(approval_request)
-        await self.db.commit()
+        # Pending tasks are deleted only while still submitted, so a task completed
+        # concurrently is not decremented twice
+        pending_approvers = []
+        for approver in sorted({task.approver for task in approval_request.tasks if task.status == ApprovalStatus.SUBMITTED}):
+            result = await self.db.execute(
+                delete(ApprovalRequestTask).where(
+                    ApprovalRequestTask.approval_request_id == request_id,
+                    ApprovalRequestTask.approver == approver,
+                    ApprovalRequestTask.status == ApprovalStatus.SUBMITTED
+                )
+            )
+            pending_approvers.extend([approver] * result.rowcount)
+
+        await self.db.execute(delete(ApprovalRequestTask).where(ApprovalRequestTask.approval_request_id == request_id))
+        await self.db.execute(delete(approval_request_files).where(approval_request_files.c.approval_request_id == request_id))
+        result = await self.db.execute(delete(ApprovalRequest).where(ApprovalRequest.id == request_id))
+        if result.rowcount == 0:
+            # Deleted concurrently
+            await self.db.rollback()
+            raise NotFoundException("Approval request not found")
+        self.db.expunge(approval_request)
+
+        await self.counters.add(user.normalized_email, request_count=-1)
+        await self.counters.add_pending_tasks(pending_approvers, -1)
+
+        # Queue email notifications in the same transaction
+        await self.email_service.send_approval_request_deleted_notification(
+            [approver.lower() for approver in approvers],
+            user.email.lower(),
+            file_names
+        )
 
         # Audit log
         await self.audit_service.log(
@@ -116,103 +154,172 @@ class ApprovalRequestService:
             f"Request ID: {request_id}"
         )
 
-        # Send email notifications
-        for approver in approvers:
-            await self.email_service.send_approval_request_deleted_notification(
-                approver.lower(),
-                user.email.lower(),
-                file_names
-            )
+        await self.db.commit()
+        # Approvers lose access to the request's files
+        file_access_cache.invalidate_users(approvers)
+        await replica_router.pin([user.normalized_email, *approvers])
+        await response_cache.invalidate(REQUESTS, [user.normalized_email])
+        await response_cache.invalidate(TASKS, approvers)
+        await event_broker.publish(pending_task_events(pending_approvers, "task.deleted", -1, request_id=request_id))
 
-    async def list_approval_requests(self, user: User) -> List[ApprovalRequest]:
-        result = await self.db.execute(
-            select(ApprovalRequest)
-            .options(selectinload(ApprovalRequest.user_files), selectinload(ApprovalRequest.tasks))
-            .where(ApprovalRequest.author == user.normalized_email)
-            .order_by(ApprovalRequest.id.desc())
-        )
-        return result.scalars().all()
+    async def complete_task(self, user: User, payload: ApprovalRequestTaskComplete):
+        await self.complete_tasks(user, [payload])
+
+    async def complete_tasks(self, user: User, payloads: List[ApprovalRequestTaskComplete]):
+        """Complete several of the user's tasks in one transaction.
+
+        Tasks and their requests are loaded with a fixed number of queries,
+        each parent request's status is rolled up once, and every author
+        gets a single notification however many of their requests were
+        reviewed. Nothing is applied unless every task can be completed.
+        The parent requests and their tasks are locked first, see
+        ``lock_approval_requests``, and the tasks are flipped with an
+        ``UPDATE`` guarded on their pending status, so of two concurrent
+        completions of a task only one applies.
+        """
+        if not payloads:
+            raise ValidationException("No tasks to complete")
+        if len(payloads) > settings.MAX_BULK_COMPLETE_TASKS:
+            raise ValidationException(f"Maximum bulk completion size ({settings.MAX_BULK_COMPLETE_TASKS}) exceeded")
+        statuses = {payload.id: payload for payload in payloads}
+        if len(statuses) != len(payloads):
+            raise ValidationException("Each task may only be completed once")
+        if any(payload.status == ApprovalStatus.SUBMITTED for payload in payloads):
+            raise ValidationException("Tasks must be approved or rejected")
 
-    async def list_tasks(self, user: User, statuses: List[ApprovalStatus]) -> List[ApprovalRequestTask]:
+        # A task's request never changes, so this lookup needs no lock
         result = await self.db.execute(
-            select(ApprovalRequestTask)
-            .options(selectinload(ApprovalRequestTask.approval_request).selectinload(ApprovalRequest.user_files))
-            .where(
+            select(ApprovalRequestTask.id, ApprovalRequestTask.approval_request_id).where(
                 and_(
-                    ApprovalRequestTask.approver == user.normalized_email,
-                    ApprovalRequestTask.status.in_(statuses)
+                    ApprovalRequestTask.id.in_(statuses),
+                    ApprovalRequestTask.approver == user.normalized_email
                 )
             )
-            .order_by(ApprovalRequestTask.id.desc())
         )
-        return result.scalars().all()
+        parents = dict(result.all())
+        
+        missing = sorted(set(statuses) - set(parents))
+        if missing:
+            raise NotFoundException("Task not found" if len(payloads) == 1 else f"Tasks not found: {missing}")
 
-    async def complete_task(self, user: User, payload: ApprovalRequestTaskComplete):
-        result = await self.db.execute(
-            select(ApprovalRequestTask)
-            .options(
-                selectinload(ApprovalRequestTask.approval_request)
-                .selectinload(ApprovalRequest.user_files),
-                selectinload(ApprovalRequestTask.approval_request)
-                .selectinload(ApprovalRequest.tasks)
+        approval_requests = {
+            approval_request.id: approval_request
+            for approval_request in await lock_approval_requests(
+                self.db, ApprovalRequest.id.in_(set(parents.values()))
             )
-            .where(
-                and_(
-                    ApprovalRequestTask.id == payload.id,
-                    ApprovalRequestTask.approver == user.normalized_email
-                )
+        }
+        tasks = [task for r in approval_requests.values() for task in r.tasks if task.id in statuses]
+        completed = sorted(task.id for task in tasks if task.status != ApprovalStatus.SUBMITTED)
+        if completed:
+            raise ValidationException("Task is already completed" if len(payloads) == 1 else f"Tasks already completed: {completed}")
+
+        # Complete the tasks; the pending_tasks delta is only applied if every one of them was still pending
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            update(ApprovalRequestTask)
+            .where(and_(ApprovalRequestTask.id.in_(statuses), ApprovalRequestTask.status == ApprovalStatus.SUBMITTED))
+            .values(
+                status=case(
+                    {task_id: literal(p.status, ApprovalRequestTask.status.type) for task_id, p in statuses.items()},
+                    value=ApprovalRequestTask.id
+                ),
+                comment=case(
+                    {task_id: literal(p.comment, ApprovalRequestTask.comment.type) for task_id, p in statuses.items()},
+                    value=ApprovalRequestTask.id
+                ),
+                completed=now
             )
+            .execution_options(synchronize_session=False)
         )
-        task = result.scalar_one_or_none()
-        
-        if not task:
-            raise NotFoundException("Task not found")
-        
-        if task.status != ApprovalStatus.SUBMITTED:
-            raise ValidationException("Task is already completed")
-
-        # Complete the task
-        task.status = payload.status
-        task.comment = payload.comment
-        task.completed = datetime.utcnow()
-
-        # Update approval request status if needed
-        approval_request = task.approval_request
-        if approval_request.status == ApprovalStatus.SUBMITTED:
-            if payload.status == ApprovalStatus.REJECTED:
+        if result.rowcount != len(tasks):
+            await self.db.rollback()
+            raise ValidationException("Task is already completed" if len(payloads) == 1 else "Tasks were completed concurrently")
+        for task in tasks:
+            payload = statuses[task.id]
+            set_committed_value(task, "status", payload.status)
+            set_committed_value(task, "comment", payload.comment)
+            set_committed_value(task, "completed", now)
+        await self.counters.add(user.normalized_email, pending_tasks=-len(tasks))
+
+        # Roll each request's status up once: any rejection rejects it, no pending task approves it
+        for approval_request in approval_requests.values():
+            if approval_request.status != ApprovalStatus.SUBMITTED:
+                continue
+            if any(t.status == ApprovalStatus.REJECTED for t in approval_request.tasks):
                 approval_request.status = ApprovalStatus.REJECTED
-            elif payload.status == ApprovalStatus.APPROVED:
-                # Check if all other tasks are completed
-                other_pending_tasks = [
-                    t for t in approval_request.tasks 
-                    if t.id != task.id and t.status == ApprovalStatus.SUBMITTED
-                ]
-                if not other_pending_tasks:
-                    approval_request.status = ApprovalStatus.APPROVED
+            elif all(t.status != ApprovalStatus.SUBMITTED for t in approval_request.tasks):
+                approval_request.status = ApprovalStatus.APPROVED
 
-        await self.db.commit()
+        # Queue one notification per author in the same transaction
+        reviewed: Dict[str, List[List[str]]] = {}
+        for request_id in sorted(approval_requests):
+            approval_request = approval_requests[request_id]
+            reviewed.setdefault(approval_request.author.lower(), []).append(
+                [f.name for f in approval_request.user_files]
+            )
+        for author, file_names in reviewed.items():
+            if len(file_names) == 1:
+                await self.email_service.send_approval_request_reviewed_notification(
+                    author, user.email.lower(), file_names[0]
+                )
+            else:
+                await self.email_service.send_approval_requests_reviewed_digest(
+                    author, user.email.lower(), file_names
+                )
 
         # Audit log
-        await self.audit_service.log(
-            user.normalized_email,
-            "Completed task",
-            f"Task ID: {task.id}, Status: {payload.status.name}"
-        )
+        for task in sorted(tasks, key=lambda t: t.id):
+            await self.audit_service.log(
+                user.normalized_email,
+                "Completed task",
+                f"Task ID: {task.id}, Status: {task.status.name}"
+            )
 
-        # Send email notification to requester
-        await self.email_service.send_approval_request_reviewed_notification(
-            approval_request.author.lower(),
-            user.email.lower(),
-            [f.name for f in approval_request.user_files]
+        await self.db.commit()
+        authors = [r.author for r in approval_requests.values()]
+        await replica_router.pin([user.normalized_email, *authors])
+        await response_cache.invalidate(TASKS, [user.normalized_email])
+        await response_cache.invalidate(REQUESTS, authors)
+        events = pending_task_events(
+            [user.normalized_email] * len(tasks), "task.completed", -1, task_ids=sorted(statuses)
         )
+        for request_id, approval_request in sorted(approval_requests.items()):
+            events.append((user_channel(approval_request.author), {
+                "type": "request.reviewed", "request_id": request_id, "status": approval_request.status.name
+            }))
+        await event_broker.publish(events)
 
     async def count_uncompleted_tasks(self, user: User) -> int:
-        result = await self.db.execute(
-            select(ApprovalRequestTask).where(
-                and_(
-                    ApprovalRequestTask.approver == user.normalized_email,
-                    ApprovalRequestTask.status == ApprovalStatus.SUBMITTED
-                )
-            )
+        stats = await self.counters.get(user.normalized_email)
+        # Keep the row if it was just seeded, and release the seeding count's share locks
+        await self.db.commit()
+        return stats.pending_tasks
+
+
+async def lock_approval_requests(db: AsyncSession, *criteria, skip_locked: bool = False) -> List[ApprovalRequest]:
+    """Lock the approval requests matching ``criteria``, then all of their tasks, in request id order.
+
+    Every path that changes a task's status (completion, expiry, deletion)
+    takes its locks through here, requests before tasks, so the paths
+    serialize instead of deadlocking. Both are re-read with
+    ``populate_existing``, so ``approval_request.tasks`` holds the latest
+    committed state rather than an earlier snapshot.
+    """
+    result = await db.execute(
+        select(ApprovalRequest)
+        .options(selectinload(ApprovalRequest.tasks), selectinload(ApprovalRequest.user_files))
+        .where(*criteria)
+        .order_by(ApprovalRequest.id)
+        .with_for_update(skip_locked=skip_locked)
+        .execution_options(populate_existing=True)
+    )
+    approval_requests = result.scalars().all()
+    if approval_requests:
+        await db.execute(
+            select(ApprovalRequestTask)
+            .where(ApprovalRequestTask.approval_request_id.in_([r.id for r in approval_requests]))
+            .order_by(ApprovalRequestTask.approval_request_id, ApprovalRequestTask.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
         )
-        return len(result.scalars().all())
\ No newline at end of file
+    return list(approval_requests)
@@ -0,0 +1,326 @@
+from datetime import date, datetime
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+import asyncio
+import fcntl
+import gzip
+import io
+import json
+import logging
+import os
+import uuid
+
+from sqlalchemy import select, delete, func, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import decode_cursor, keyset_after, split_page
+from app.models.audit_log import AuditLogEntry
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 5000
+
+
+class AuditLogArchiveService:
+    """Rolls old audit log months out of the database into compressed archives.
+
+    Each month older than ``AUDIT_LOG_LIVE_MONTHS`` is exported to
+    ``<root>/audit/YYYY-MM.jsonl.gz``, one gzip member per actor with entries
+    newest first, plus a ``YYYY-MM.index.json`` sidecar holding each actor's
+    member offset. The sidecar is written last and marks the month as
+    archived; only then is the month dropped, as a whole partition on MySQL
+    and with batched deletes elsewhere. ``query`` reads the live table and
+    the archives through one keyset-paginated interface.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def query(
+        self,
+        who: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[AuditLogEntry], Optional[str]]:
+        """Return one page of an actor's entries, newest first, and the cursor for the next page."""
+        after = decode_cursor(cursor, datetime, int) if cursor else None
+        archived = archived_months()
+        horizon = datetime.combine(_add_month(archived[-1]), datetime.min.time()) if archived else None
+
+        query = select(AuditLogEntry).where(AuditLogEntry.who == who)
+        live_since = max(filter(None, [since, horizon]), default=None)
+        if live_since:
+            query = query.where(AuditLogEntry.when >= live_since)
+        if until:
+            query = query.where(AuditLogEntry.when < until)
+        if after:
+            query = query.where(keyset_after([AuditLogEntry.when, AuditLogEntry.id], after))
+        result = await self.db.execute(
+            query.order_by(AuditLogEntry.when.desc(), AuditLogEntry.id.desc()).limit(limit + 1)
+        )
+        entries = list(result.scalars().all())
+
+        def wanted(entry: AuditLogEntry) -> bool:
+            if (since and entry.when < since) or (until and entry.when >= until):
+                return False
+            return not after or (entry.when, entry.id) < tuple(after)
+
+        loop = asyncio.get_running_loop()
+        for month in reversed(archived):
+            if len(entries) > limit:
+                break
+            month_start = datetime.combine(month, datetime.min.time())
+            month_end = datetime.combine(_add_month(month), datetime.min.time())
+            if (since and month_end <= since) or (until and month_start >= until):
+                continue
+            entries.extend(await loop.run_in_executor(None, _read_actor, month, who, wanted, limit + 1 - len(entries)))
+
+        return split_page(entries, limit, lambda e: (e.when, e.id))
+
+    async def archive(self) -> List[date]:
+        """Archive and drop every month older than the live window; return the months archived."""
+        cutoff = _add_month(datetime.utcnow().date().replace(day=1), 1 - settings.AUDIT_LOG_LIVE_MONTHS)
+        partitions = await self._partitions()
+        oldest = await self.db.scalar(select(func.min(AuditLogEntry.when)))
+        await self.db.rollback()
+
+        months = set(month for month in partitions if month < cutoff)
+        if oldest is not None:
+            month = oldest.date().replace(day=1)
+            while month < cutoff:
+                months.add(month)
+                month = _add_month(month)
+
+        archived = []
+        done = set(archived_months())
+        for month in sorted(months):
+            if month not in done:
+                count = await self._export(month, partitioned=bool(partitions))
+                logger.info("Archived %s audit log entries for %s", count, f"{month:%Y-%m}")
+                archived.append(month)
+            await self._drop(month, partitions)
+
+        await self._ensure_partitions(partitions)
+        return archived
+
+    async def _export(self, month: date, partitioned: bool) -> int:
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(_add_month(month), datetime.min.time())
+        # On MySQL a month's partition also holds anything older than its boundary
+        window = AuditLogEntry.when < end if partitioned else and_(AuditLogEntry.when >= start, AuditLogEntry.when < end)
+
+        result = await self.db.execute(select(AuditLogEntry.who).where(window).distinct())
+        actors = sorted(result.scalars().all())
+
+        directory = _archive_dir()
+        os.makedirs(directory, exist_ok=True)
+        data_path, index_path = _archive_paths(month)
+        temp_path = os.path.join(directory, f".{uuid.uuid4()}.tmp")
+        # Compression and every file operation run in the executor, only the queries stay on the loop
+        loop = asyncio.get_running_loop()
+        index: Dict[str, List[int]] = {}
+        count = 0
+        f = await loop.run_in_executor(None, open, temp_path, "wb")
+        try:
+            for who in actors:
+                result = await self.db.execute(
+                    select(AuditLogEntry)
+                    .where(and_(AuditLogEntry.who == who, window))
+                    .order_by(AuditLogEntry.when.desc(), AuditLogEntry.id.desc())
+                )
+                lines = "".join(json.dumps(_to_dict(entry)) + "\n" for entry in result.scalars().all())
+                index[who] = await loop.run_in_executor(None, _write_member, f, lines.encode())
+                count += lines.count("\n")
+                self.db.expunge_all()
+            await loop.run_in_executor(None, _publish_archive, f, temp_path, data_path, index_path, index)
+        finally:
+            await loop.run_in_executor(None, _discard_temp, f, temp_path)
+        await self.db.rollback()
+        return count
+
+    async def _drop(self, month: date, partitions: Dict[date, str]):
+        if month in partitions:
+            await self.db.execute(text(f"ALTER TABLE audit_log_entries DROP PARTITION {partitions[month]}"))
+            await self.db.commit()
+            return
+
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(_add_month(month), datetime.min.time())
+        while True:
+            ids = (await self.db.execute(
+                select(AuditLogEntry.id)
+                .where(and_(AuditLogEntry.when >= start, AuditLogEntry.when < end))
+                .limit(DELETE_BATCH_SIZE)
+            )).scalars().all()
+            if not ids:
+                break
+            await self.db.execute(delete(AuditLogEntry).where(AuditLogEntry.id.in_(ids)))
+            await self.db.commit()
+
+    async def _partitions(self) -> Dict[date, str]:
+        """Monthly partitions of the audit table keyed by month, empty when it is not partitioned."""
+        if self.db.bind.dialect.name != "mysql":
+            return {}
+        result = await self.db.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_log_entries' AND PARTITION_NAME IS NOT NULL"
+        ))
+        return {
+            datetime.strptime(name[1:], "%Y%m").date(): name
+            for name in result.scalars().all() if name != "p_future"
+        }
+
+    async def _ensure_partitions(self, partitions: Dict[date, str]):
+        """Split ``p_future`` so the current and next month have their own partitions."""
+        if not partitions:
+            return
+        month = _add_month(max(partitions))
+        horizon = _add_month(datetime.utcnow().date().replace(day=1))
+        definitions = []
+        while month <= horizon:
+            definitions.append(
+                f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_add_month(month):%Y-%m-%d}'))"
+            )
+            month = _add_month(month)
+        if definitions:
+            definitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+            await self.db.execute(text(
+                f"ALTER TABLE audit_log_entries REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})"
+            ))
+            await self.db.commit()
+
+
+class AuditLogArchiver:
+    """Background task that runs ``AuditLogArchiveService.archive`` every
+    ``AUDIT_LOG_ARCHIVE_INTERVAL_SECONDS``. A lock file in the archive directory
+    keeps several workers sharing the storage root from archiving at once."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and settings.AUDIT_LOG_ARCHIVE_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> Optional[List[date]]:
+        """Archive if no other process is doing so; None when the lock was busy."""
+        os.makedirs(_archive_dir(), exist_ok=True)
+        with open(os.path.join(_archive_dir(), ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            async with AsyncSessionLocal() as db:
+                return await AuditLogArchiveService(db).archive()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Audit log archival failed")
+            await asyncio.sleep(settings.AUDIT_LOG_ARCHIVE_INTERVAL_SECONDS)
+
+
+audit_log_archiver = AuditLogArchiver()
+
+
+def archived_months() -> List[date]:
+    try:
+        names = os.listdir(_archive_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(
+        datetime.strptime(name[:7], "%Y-%m").date() for name in names if name.endswith(".index.json")
+    )
+
+
+def _read_actor(month: date, who: str, wanted: Callable[[AuditLogEntry], bool], limit: int) -> List[AuditLogEntry]:
+    """Up to ``limit`` of an actor's archived entries for a month that pass ``wanted``, newest first.
+
+    The actor's member is decompressed line by line and reading stops once
+    ``limit`` entries were found, so the first pages of a busy month only
+    inflate their own entries. Deeper pages still decompress every entry
+    newer than they are, and the compressed member is read whole.
+    """
+    data_path, index_path = _archive_paths(month)
+    with open(index_path) as f:
+        location = json.load(f).get(who)
+    if location is None:
+        return []
+    offset, length = location
+    with open(data_path, "rb") as f:
+        f.seek(offset)
+        member = f.read(length)
+    entries = []
+    with gzip.GzipFile(fileobj=io.BytesIO(member)) as lines:
+        for line in lines:
+            entry = _from_dict(json.loads(line))
+            if wanted(entry):
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+    return entries
+
+
+def _write_member(f: BinaryIO, data: bytes) -> List[int]:
+    """Append one gzip member and return its ``[offset, length]``."""
+    member = gzip.compress(data)
+    offset = f.tell()
+    f.write(member)
+    return [offset, len(member)]
+
+
+def _publish_archive(f: BinaryIO, temp_path: str, data_path: str, index_path: str, index: Dict[str, List[int]]):
+    """Move the finished data file into place, then write the index that marks the month archived."""
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(temp_path, data_path)
+    with open(temp_path, "w") as index_file:
+        json.dump(index, index_file)
+        index_file.flush()
+        os.fsync(index_file.fileno())
+    os.replace(temp_path, index_path)
+
+
+def _discard_temp(f: BinaryIO, temp_path: str):
+    f.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def _to_dict(entry: AuditLogEntry) -> dict:
+    return {"id": entry.id, "who": entry.who, "when": entry.when.isoformat(), "what": entry.what, "data": entry.data}
+
+
+def _from_dict(values: dict) -> AuditLogEntry:
+    return AuditLogEntry(**{**values, "when": datetime.fromisoformat(values["when"])})
+
+
+def _archive_dir() -> str:
+    return os.path.join(settings.FILE_STORAGE_ROOT_PATH, "audit")
+
+
+def _archive_paths(month: date) -> Tuple[str, str]:
+    base = os.path.join(_archive_dir(), f"{month:%Y-%m}")
+    return f"{base}.jsonl.gz", f"{base}.index.json"
+
+
+def _add_month(month: date, months: int = 1) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
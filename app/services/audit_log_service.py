@@ -1,14 +1,31 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
+from app.core.config import settings
 from app.models.audit_log import AuditLogEntry
+from app.services.audit_log_writer import audit_log_writer, PENDING_KEY
 
 
 class AuditLogService:
+    """Records audit entries as part of the caller's unit of work.
+
+    Call ``log`` before the caller commits. In ``async`` mode the entry is
+    written by the background ``audit_log_writer`` once the commit succeeds;
+    in ``transactional`` mode, or when the writer is not running, it is added
+    to the session and committed together with the caller's changes.
+    """
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def log(self, who: str, what: str, data: str):
+        if settings.AUDIT_LOG_MODE == "async" and audit_log_writer.running:
+            await audit_log_writer.wait_for_space()
+            self.db.info.setdefault(PENDING_KEY, []).append(
+                {"who": who, "when": datetime.utcnow(), "what": what, "data": data}
+            )
+            return
+
         entry = AuditLogEntry(
             who=who,
             when=datetime.utcnow(),
@@ -16,4 +33,3 @@ class AuditLogService:
             data=data
         )
         self.db.add(entry)
-        await self.db.commit()
\ No newline at end of file
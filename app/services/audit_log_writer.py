@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.audit_log import AuditLogEntry
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "audit_log_entries"
+
+
+class AuditLogWriter:
+    """Background writer that persists audit entries in bulk.
+
+    Entries logged through a session wait in ``session.info`` and are handed
+    over only when that session's outermost transaction commits, so rolled
+    back work is never audited. The buffer is flushed with one multi-row
+    INSERT per batch, on its own connection, whenever ``AUDIT_LOG_BATCH_SIZE``
+    entries are waiting or ``AUDIT_LOG_FLUSH_INTERVAL_SECONDS`` has passed.
+    Callers wait in ``wait_for_space`` while ``AUDIT_LOG_QUEUE_MAX_SIZE``
+    entries are buffered. ``stop`` drains whatever is left.
+    """
+
+    def __init__(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Dropped %s audit log entries on shutdown", len(self._buffer))
+            self._buffer.clear()
+
+    async def wait_for_space(self):
+        while len(self._buffer) >= settings.AUDIT_LOG_QUEUE_MAX_SIZE:
+            self._space.clear()
+            await self._space.wait()
+
+    def submit(self, rows: List[Dict[str, Any]]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= settings.AUDIT_LOG_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def flush(self):
+        while self._buffer:
+            batch = self._buffer[:settings.AUDIT_LOG_BATCH_SIZE]
+            async with engine.begin() as conn:
+                await conn.execute(insert(AuditLogEntry).values(batch))
+            del self._buffer[:len(batch)]
+            self._space.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Entries stay buffered and are retried on the next cycle
+                logger.exception("Audit log flush failed, %s entries pending", len(self._buffer))
+                await asyncio.sleep(settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS)
+
+
+audit_log_writer = AuditLogWriter()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending_entries(session: Session):
+    if session.in_nested_transaction():
+        return
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        audit_log_writer.submit(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_entries(session: Session):
+    if not session.in_nested_transaction():
+        session.info.pop(PENDING_KEY, None)
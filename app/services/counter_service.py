@@ -0,0 +1,193 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, and_
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from datetime import datetime
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.user import User
+from app.models.user_file import UserFile
+from app.models.user_stats import UserStats
+from app.models.approval_request import ApprovalRequest, ApprovalStatus
+from app.models.approval_request_task import ApprovalRequestTask
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("pending_tasks", "request_count", "file_count", "total_bytes")
+
+
+class CounterService:
+    """Denormalized per-user counters kept in ``user_stats``.
+
+    Services apply deltas with atomic ``UPDATE ... SET x = x + n`` statements
+    in the same transaction as the change they describe. A user without a row
+    is counted with ``SELECT COUNT(*)`` on first read and the row is seeded
+    from the result, so deltas against a missing row can safely be dropped.
+    The seeding count is a locking read: it waits for writers that already
+    touched the counted rows, whose deltas found no row, and holds off new
+    ones until the seeded row commits, so their deltas land on it.
+    ``reconcile`` repairs any drift.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, normalized_email: str) -> UserStats:
+        stats = await self.db.get(UserStats, normalized_email)
+        if stats is not None:
+            return stats
+
+        stats = UserStats(normalized_email=normalized_email, **await self._count(normalized_email, lock=True))
+        try:
+            async with self.db.begin_nested():
+                self.db.add(stats)
+        except IntegrityError:
+            # Seeded concurrently
+            stats = await self.db.get(UserStats, normalized_email, populate_existing=True)
+        return stats
+
+    async def add(self, normalized_email: str, **deltas: int):
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        await self.db.execute(
+            update(UserStats)
+            .where(UserStats.normalized_email == normalized_email)
+            .values(
+                updated=datetime.utcnow(),
+                **{field: getattr(UserStats, field) + delta for field, delta in deltas.items()}
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def add_pending_tasks(self, approvers: Iterable[str], delta: int):
+        for approver, count in Counter(approvers).items():
+            await self.add(approver, pending_tasks=count * delta)
+
+    async def reconcile(self) -> int:
+        """Compare every row with freshly aggregated counts and fix the ones that drifted."""
+        expected: Dict[str, Dict[str, int]] = {}
+
+        def entry(email: str) -> Dict[str, int]:
+            return expected.setdefault(email, dict.fromkeys(COUNTER_FIELDS, 0))
+
+        result = await self.db.execute(
+            select(User.normalized_email, func.count(UserFile.id), func.coalesce(func.sum(UserFile.size), 0))
+            .join(UserFile, UserFile.owner_id == User.id)
+            .group_by(User.normalized_email)
+        )
+        for email, file_count, total_bytes in result.all():
+            entry(email).update(file_count=file_count, total_bytes=total_bytes)
+
+        result = await self.db.execute(
+            select(ApprovalRequest.author, func.count()).group_by(ApprovalRequest.author)
+        )
+        for email, request_count in result.all():
+            entry(email)["request_count"] = request_count
+
+        result = await self.db.execute(
+            select(ApprovalRequestTask.approver, func.count())
+            .where(ApprovalRequestTask.status == ApprovalStatus.SUBMITTED)
+            .group_by(ApprovalRequestTask.approver)
+        )
+        for email, pending_tasks in result.all():
+            entry(email)["pending_tasks"] = pending_tasks
+
+        result = await self.db.execute(select(UserStats))
+        current = {stats.normalized_email: _values(stats) for stats in result.scalars().all()}
+        await self.db.rollback()
+
+        empty = dict.fromkeys(COUNTER_FIELDS, 0)
+        drifted = [email for email, values in current.items() if values != expected.get(email, empty)]
+        corrected = 0
+        for email in drifted:
+            # Re-count under the row lock, the bulk snapshot may already be stale
+            result = await self.db.execute(
+                select(UserStats).where(UserStats.normalized_email == email).with_for_update()
+            )
+            stats = result.scalar_one_or_none()
+            if stats is None:
+                continue
+            counts = await self._count(email)
+            if _values(stats) != counts:
+                logger.warning("Reconciled counters for %s: %s -> %s", email, _values(stats), counts)
+                for field, value in counts.items():
+                    setattr(stats, field, value)
+                stats.updated = datetime.utcnow()
+                corrected += 1
+            await self.db.commit()
+        return corrected
+
+    async def _count(self, normalized_email: str, lock: bool = False) -> Dict[str, int]:
+        """Aggregate the user's counters. With ``lock`` the counted rows are read
+        ``FOR SHARE``, which sees the latest committed data rather than the
+        transaction's snapshot and blocks writers to them until commit."""
+        def locking(query):
+            return query.with_for_update(read=True) if lock else query
+
+        result = await self.db.execute(locking(
+            select(func.count(UserFile.id), func.coalesce(func.sum(UserFile.size), 0))
+            .join(User, UserFile.owner_id == User.id)
+            .where(User.normalized_email == normalized_email)
+        ))
+        file_count, total_bytes = result.one()
+        request_count = await self.db.scalar(locking(
+            select(func.count()).select_from(ApprovalRequest).where(ApprovalRequest.author == normalized_email)
+        ))
+        pending_tasks = await self.db.scalar(locking(
+            select(func.count()).select_from(ApprovalRequestTask).where(
+                and_(
+                    ApprovalRequestTask.approver == normalized_email,
+                    ApprovalRequestTask.status == ApprovalStatus.SUBMITTED
+                )
+            )
+        ))
+        return {
+            "pending_tasks": pending_tasks,
+            "request_count": request_count,
+            "file_count": file_count,
+            "total_bytes": total_bytes,
+        }
+
+
+def _values(stats: UserStats) -> Dict[str, int]:
+    return {field: getattr(stats, field) for field in COUNTER_FIELDS}
+
+
+class CounterReconciler:
+    """Background task that runs ``CounterService.reconcile`` every
+    ``COUNTERS_RECONCILE_INTERVAL_SECONDS``."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and settings.COUNTERS_RECONCILE_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.COUNTERS_RECONCILE_INTERVAL_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await CounterService(db).reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Counter reconciliation failed")
+
+
+counter_reconciler = CounterReconciler()
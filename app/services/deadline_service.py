@@ -0,0 +1,255 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.instrumentation import DEADLINE_ACTIONS, DEADLINE_BATCH_DURATION, DEADLINE_LAG
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache, REQUESTS, TASKS
+from app.models.approval_request import ApprovalRequest, ApprovalStatus
+from app.models.approval_request_task import ApprovalRequestTask
+from app.models.user_file import UserFile, approval_request_files
+from app.services.approval_request_service import lock_approval_requests
+from app.services.audit_log_service import AuditLogService
+from app.services.counter_service import CounterService
+from app.services.email_service import EmailService
+from app.services.event_broker import event_broker, pending_task_events, user_channel
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_COMMENT = "Expired: not reviewed by the deadline"
+
+
+class DeadlineService:
+    """Acts on pending approval requests whose ``approve_by`` has passed.
+
+    Overdue requests are read in ``(approve_by, id)`` order along
+    ``ix_approval_requests_status_approve_by_id``, ``DEADLINE_SCAN_BATCH_SIZE``
+    at a time with a keyset cursor, so each query touches one batch however
+    large the table is. ``expire_overdue`` rejects the requests that are
+    ``DEADLINE_AUTO_EXPIRE_AFTER_MINUTES`` past their deadline.
+    ``send_reminders`` claims a batch of overdue requests nobody was reminded
+    of yet along ``ix_approval_requests_status_reminded_approve_by_id``,
+    queues one digest per approver of the batch and marks the requests in
+    the same transaction, so reminded requests drop out of later scans.
+    Rows are claimed with ``SKIP LOCKED`` where the database supports it, so
+    several workers may scan side by side. Expiry locks requests and then
+    their tasks through ``lock_approval_requests``, like task completion,
+    so the two never act on the same request at once.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.audit_service = AuditLogService(db)
+        self.email_service = EmailService(db)
+        self.counters = CounterService(db)
+
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        now = now or datetime.utcnow()
+        expired = await self.expire_overdue(now)
+        reminded = 0
+        if settings.DEADLINE_REMINDERS_ENABLED and settings.EMAIL_SERVICE_ENABLED:
+            reminded = await self.send_reminders(now)
+        return {"expired": expired, "reminded": reminded}
+
+    async def overdue_batches(self, due: datetime) -> AsyncIterator[List[Tuple[int, datetime]]]:
+        """Yield ``(id, approve_by)`` of pending requests due by ``due``, one batch at a time."""
+        batch_size = settings.DEADLINE_SCAN_BATCH_SIZE
+        after: Optional[Tuple[int, datetime]] = None
+        while True:
+            query = select(ApprovalRequest.id, ApprovalRequest.approve_by).where(
+                and_(ApprovalRequest.status == ApprovalStatus.SUBMITTED, ApprovalRequest.approve_by <= due)
+            )
+            if after is not None:
+                query = query.where(or_(
+                    ApprovalRequest.approve_by > after[1],
+                    and_(ApprovalRequest.approve_by == after[1], ApprovalRequest.id > after[0])
+                ))
+            result = await self.db.execute(
+                query.order_by(ApprovalRequest.approve_by, ApprovalRequest.id).limit(batch_size)
+            )
+            rows = [tuple(row) for row in result.all()]
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]
+
+    async def expire_overdue(self, now: datetime) -> int:
+        if settings.DEADLINE_AUTO_EXPIRE_AFTER_MINUTES <= 0:
+            return 0
+        grace = timedelta(minutes=settings.DEADLINE_AUTO_EXPIRE_AFTER_MINUTES)
+        expired = 0
+        async for rows in self.overdue_batches(now - grace):
+            started = time.perf_counter()
+            expired += await self._expire(dict(rows), now, grace)
+            DEADLINE_BATCH_DURATION.observe(("expire",), time.perf_counter() - started)
+        return expired
+
+    async def _expire(self, deadlines: Dict[int, datetime], now: datetime, grace: timedelta) -> int:
+        # Requests being completed are skipped; their tasks are locked and re-read, so an
+        # approval committed since this scan started is never overwritten as expired
+        approval_requests = await lock_approval_requests(
+            self.db,
+            ApprovalRequest.id.in_(deadlines),
+            ApprovalRequest.status == ApprovalStatus.SUBMITTED,
+            skip_locked=True
+        )
+        if not approval_requests:
+            await self.db.rollback()
+            return 0
+
+        pending_tasks: List[ApprovalRequestTask] = []
+        expired: Dict[str, List[List[str]]] = {}
+        for approval_request in approval_requests:
+            for task in approval_request.tasks:
+                if task.status == ApprovalStatus.SUBMITTED:
+                    task.status = ApprovalStatus.REJECTED
+                    task.comment = EXPIRED_COMMENT
+                    task.completed = now
+                    pending_tasks.append(task)
+            approval_request.status = ApprovalStatus.REJECTED
+            expired.setdefault(approval_request.author.lower(), []).append(
+                [f.name for f in approval_request.user_files]
+            )
+            await self.audit_service.log(
+                approval_request.author,
+                "Approval request expired",
+                f"Request ID: {approval_request.id}, Deadline: {approval_request.approve_by.isoformat()}"
+            )
+        approvers = [task.approver for task in pending_tasks]
+        await self.counters.add_pending_tasks(approvers, -1)
+
+        # Queue one notification per author in the same transaction
+        for author, file_names in expired.items():
+            await self.email_service.send_approval_requests_expired_notification(author, file_names)
+
+        await self.db.commit()
+        authors = [r.author for r in approval_requests]
+        await replica_router.pin([*authors, *approvers])
+        await response_cache.invalidate(REQUESTS, authors)
+        await response_cache.invalidate(TASKS, approvers)
+        events = []
+        for approver in set(approvers):
+            task_ids = sorted(task.id for task in pending_tasks if task.approver == approver)
+            events.extend(pending_task_events([approver] * len(task_ids), "task.completed", -1, task_ids=task_ids))
+        for approval_request in approval_requests:
+            events.append((user_channel(approval_request.author), {
+                "type": "request.reviewed", "request_id": approval_request.id, "status": approval_request.status.name
+            }))
+        await event_broker.publish(events)
+
+        for approval_request in approval_requests:
+            DEADLINE_LAG.observe(("expire",), (now - deadlines[approval_request.id] - grace).total_seconds())
+            DEADLINE_ACTIONS.inc(("expire",))
+        return len(approval_requests)
+
+    async def send_reminders(self, now: datetime) -> int:
+        """Queue the overdue digests and return how many were queued."""
+        batch_size = settings.DEADLINE_SCAN_BATCH_SIZE
+        digests = 0
+        while True:
+            started = time.perf_counter()
+            # Claimed requests are marked before commit and leave the scanned range
+            result = await self.db.execute(
+                select(ApprovalRequest.id, ApprovalRequest.author, ApprovalRequest.approve_by)
+                .where(
+                    and_(
+                        ApprovalRequest.status == ApprovalStatus.SUBMITTED,
+                        ApprovalRequest.reminded.is_(None),
+                        ApprovalRequest.approve_by <= now
+                    )
+                )
+                .order_by(ApprovalRequest.approve_by, ApprovalRequest.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            summaries: Dict[int, Tuple[str, List[str], datetime]] = {
+                request_id: (author.lower(), [], approve_by) for request_id, author, approve_by in result.all()
+            }
+            if not summaries:
+                await self.db.rollback()
+                return digests
+
+            result = await self.db.execute(
+                select(approval_request_files.c.approval_request_id, UserFile.name)
+                .join(UserFile, UserFile.id == approval_request_files.c.user_file_id)
+                .where(approval_request_files.c.approval_request_id.in_(summaries))
+            )
+            for request_id, name in result.all():
+                summaries[request_id][1].append(name)
+
+            result = await self.db.execute(
+                select(ApprovalRequestTask.approver, ApprovalRequestTask.approval_request_id).where(
+                    and_(
+                        ApprovalRequestTask.approval_request_id.in_(summaries),
+                        ApprovalRequestTask.status == ApprovalStatus.SUBMITTED
+                    )
+                )
+            )
+            overdue: Dict[str, List[Tuple[str, List[str], datetime]]] = {}
+            for approver, request_id in result.all():
+                overdue.setdefault(approver, []).append(summaries[request_id])
+
+            await self.db.execute(
+                update(ApprovalRequest)
+                .where(ApprovalRequest.id.in_(summaries))
+                .values(reminded=now)
+                .execution_options(synchronize_session=False)
+            )
+            for approver, tasks in sorted(overdue.items()):
+                await self.email_service.send_overdue_tasks_digest(
+                    approver.lower(), sorted(tasks, key=lambda summary: summary[2])
+                )
+            await self.db.commit()
+
+            for _, _, approve_by in summaries.values():
+                DEADLINE_LAG.observe(("remind",), (now - approve_by).total_seconds())
+            for _ in overdue:
+                DEADLINE_ACTIONS.inc(("remind",))
+            DEADLINE_BATCH_DURATION.observe(("remind",), time.perf_counter() - started)
+            digests += len(overdue)
+            if len(summaries) < batch_size:
+                return digests
+
+
+class DeadlineScheduler:
+    """Background task that runs ``DeadlineService.run`` every
+    ``DEADLINE_SCAN_INTERVAL_SECONDS`` when ``DEADLINE_SCHEDULER=asyncio``."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and settings.DEADLINE_SCHEDULER == "asyncio" and settings.DEADLINE_SCAN_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.DEADLINE_SCAN_INTERVAL_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await DeadlineService(db).run()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Deadline scan failed")
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -0,0 +1,46 @@
+"""Celery entry point for the deadline scan, used with ``DEADLINE_SCHEDULER=celery``.
+
+Run a single beat next to the workers:
+    celery -A app.services.deadline_tasks worker --beat --loglevel=info
+
+Beat enqueues ``scan_deadlines`` every ``DEADLINE_SCAN_INTERVAL_SECONDS``. A
+scan left in the queue longer than ``JOB_EXPIRATION_TIMEOUT_MIN`` is dropped,
+the next one covers the same requests. The scheduler histograms stay in the
+worker process and are not exported, so each scan logs its counts instead.
+"""
+import asyncio
+import logging
+
+from celery import Celery
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+import app.models  # registers every model on Base.metadata
+from app.services.deadline_service import DeadlineService
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery("click2approve", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
+celery_app.conf.beat_schedule = {
+    "scan-deadlines": {
+        "task": "click2approve.scan_deadlines",
+        "schedule": float(settings.DEADLINE_SCAN_INTERVAL_SECONDS),
+        "options": {"expires": settings.JOB_EXPIRATION_TIMEOUT_MIN * 60},
+    },
+}
+
+
+async def _scan():
+    try:
+        async with AsyncSessionLocal() as db:
+            return await DeadlineService(db).run()
+    finally:
+        # Each task gets a fresh event loop, pooled connections cannot outlive it
+        await engine.dispose()
+
+
+@celery_app.task(name="click2approve.scan_deadlines", ignore_result=True)
+def scan_deadlines():
+    counts = asyncio.run(_scan())
+    logger.info("Deadline scan: %s requests expired, %s reminder digests queued", counts["expired"], counts["reminded"])
+    return counts
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+
+from sqlalchemy import select, and_
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.email_outbox import EmailOutboxMessage, OutboxStatus
+from app.services.email_service import send_email
+from app.services.smtp_pool import smtp_pool
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher:
+    """Background task that drains the email outbox.
+
+    Due rows are claimed in batches (``SKIP LOCKED`` where the database
+    supports it, so several workers can run side by side) and leased for
+    ``EMAIL_OUTBOX_LEASE_SECONDS`` in a short transaction. They are then
+    delivered over pooled SMTP sessions off the event loop, and deleted once
+    every recipient has been served. Failed rows are retried with exponential
+    backoff and marked ``DEAD`` after ``EMAIL_OUTBOX_MAX_ATTEMPTS``.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.EMAIL_SMTP_POOL_SIZE, thread_name_prefix="email-dispatcher")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        smtp_pool.close_all()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.dispatch_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox dispatch failed")
+                processed = 0
+
+            # Keep draining while full batches come back
+            if processed >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+
+            await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS)
+
+    async def dispatch_batch(self) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(EmailOutboxMessage)
+                .where(
+                    and_(
+                        EmailOutboxMessage.status == OutboxStatus.PENDING,
+                        EmailOutboxMessage.next_attempt_at <= datetime.utcnow()
+                    )
+                )
+                .order_by(EmailOutboxMessage.next_attempt_at, EmailOutboxMessage.id)
+                .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            if not messages:
+                return 0
+
+            # Lease the batch and release the row locks before talking to SMTP; rows of a
+            # dispatcher that dies mid-send become due again when the lease runs out
+            lease = datetime.utcnow() + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+            for message in messages:
+                message.next_attempt_at = lease
+            await db.commit()
+
+            # Messages with identical content share SMTP transactions, except that a
+            # recipient queued by several messages gets one delivery per message
+            groups: Dict[Tuple[str, str], List[Tuple[Set[str], List[EmailOutboxMessage]]]] = {}
+            for message in messages:
+                recipients = set(json.loads(message.recipients))
+                batches = groups.setdefault((message.subject, message.body), [])
+                batch = next((batch for batch in batches if not batch[0] & recipients), None)
+                if batch is None:
+                    batch = (set(), [])
+                    batches.append(batch)
+                batch[0].update(recipients)
+                batch[1].append(message)
+            sends = [(subject, body, group) for (subject, body), batches in groups.items() for _, group in batches]
+
+            outcomes = await asyncio.gather(*[self._send(subject, body, group) for subject, body, group in sends])
+
+            for (_, _, group), failed in zip(sends, outcomes):
+                for message in group:
+                    await self._record(db, message, failed)
+
+            await db.commit()
+            return len(messages)
+
+    async def _send(self, subject: str, body: str, group: List[EmailOutboxMessage]) -> Dict[str, str]:
+        recipients = list(dict.fromkeys(r for message in group for r in json.loads(message.recipients)))
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, send_email, recipients, subject, body)
+        except Exception as e:
+            return {recipient: str(e) for recipient in recipients}
+
+    async def _record(self, db, message: EmailOutboxMessage, failed: Dict[str, str]):
+        remaining = [r for r in json.loads(message.recipients) if r in failed]
+        if not remaining:
+            await db.delete(message)
+            return
+
+        error = failed[remaining[0]]
+        message.recipients = json.dumps(remaining)
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxStatus.DEAD
+            logger.error("Email %s dead-lettered after %s attempts: %s", message.id, message.attempts, error)
+        else:
+            delay = min(
+                settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1),
+                settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS
+            )
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning("Email %s failed (attempt %s), retrying in %ss: %s", message.id, message.attempts, delay, error)
+
+
+email_dispatcher = EmailDispatcher()
@@ -1,34 +1,45 @@
-from typing import List
+from typing import Dict, List, Tuple
+from datetime import datetime
+import json
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.models.email_outbox import EmailOutboxMessage
+from app.services.smtp_pool import smtp_pool
 
 
 class EmailService:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=2)
+    """Queues notification emails in the outbox table.
 
-    async def send_approval_request_notification(self, to_email: str, from_user: str, file_names: List[str]):
+    Messages are added to the caller's session and become visible to the
+    dispatcher only when the caller commits, so a notification is never sent
+    for a change that was rolled back. One row is written per notification
+    regardless of how many recipients it has.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def send_approval_request_notification(self, to_emails: List[str], from_user: str, file_names: List[str]):
         if not settings.EMAIL_SERVICE_ENABLED:
             return
 
         subject = "You have a new approval request"
         body = f"We would like to inform you that {from_user} submitted an approval request containing {', '.join(file_names)}. Please visit {settings.UI_BASE_URL}/inbox to check it."
-        
-        await self._send_email_async(to_email, subject, body)
 
-    async def send_approval_request_deleted_notification(self, to_email: str, from_user: str, file_names: List[str]):
+        await self._enqueue(to_emails, subject, body)
+
+    async def send_approval_request_deleted_notification(self, to_emails: List[str], from_user: str, file_names: List[str]):
         if not settings.EMAIL_SERVICE_ENABLED:
             return
 
         subject = "An approval request was deleted"
         body = f"We would like to inform you that {from_user} deleted the approval request containing {', '.join(file_names)}."
-        
-        await self._send_email_async(to_email, subject, body)
+
+        await self._enqueue(to_emails, subject, body)
 
     async def send_approval_request_reviewed_notification(self, to_email: str, reviewer: str, file_names: List[str]):
         if not settings.EMAIL_SERVICE_ENABLED:
@@ -36,8 +47,40 @@ class EmailService:
 
         subject = "Your approval request was reviewed"
         body = f"We would like to inform you that {reviewer} reviewed the approval request containing {', '.join(file_names)}. Please visit {settings.UI_BASE_URL}/sent to check it."
-        
-        await self._send_email_async(to_email, subject, body)
+
+        await self._enqueue([to_email], subject, body)
+
+    async def send_approval_requests_reviewed_digest(self, to_email: str, reviewer: str, file_names: List[List[str]]):
+        if not settings.EMAIL_SERVICE_ENABLED:
+            return
+        subject = "Your approval requests were reviewed"
+        requests = "\n".join(f"- {', '.join(names)}" for names in file_names)
+        body = f"We would like to inform you that {reviewer} reviewed {len(file_names)} of your approval requests, containing:\n{requests}\nPlease visit {settings.UI_BASE_URL}/sent to check them."
+        await self._enqueue([to_email], subject, body)
+
+    async def send_approval_requests_expired_notification(self, to_email: str, file_names: List[List[str]]):
+        if not settings.EMAIL_SERVICE_ENABLED:
+            return
+        if len(file_names) == 1:
+            subject = "Your approval request expired"
+            body = f"We would like to inform you that your approval request containing {', '.join(file_names[0])} was not reviewed by its deadline and has been rejected. Please visit {settings.UI_BASE_URL}/sent to check it."
+        else:
+            subject = "Your approval requests expired"
+            requests = "\n".join(f"- {', '.join(names)}" for names in file_names)
+            body = f"We would like to inform you that {len(file_names)} of your approval requests were not reviewed by their deadline and have been rejected, containing:\n{requests}\nPlease visit {settings.UI_BASE_URL}/sent to check them."
+        await self._enqueue([to_email], subject, body)
+
+    async def send_overdue_tasks_digest(self, to_email: str, tasks: List[Tuple[str, List[str], datetime]]):
+        """One reminder for all of an approver's overdue tasks, given as (author, file names, deadline)."""
+        if not settings.EMAIL_SERVICE_ENABLED:
+            return
+        subject = "You have overdue approval requests"
+        lines = "\n".join(
+            f"- {', '.join(names)} from {author}, due {approve_by:%Y-%m-%d %H:%M} UTC" for author, names, approve_by in tasks
+        )
+        waiting = "1 approval request waiting for you is" if len(tasks) == 1 else f"{len(tasks)} approval requests waiting for you are"
+        body = f"We would like to remind you that {waiting} past the deadline:\n{lines}\nPlease visit {settings.UI_BASE_URL}/inbox to review them."
+        await self._enqueue([to_email], subject, body)
 
     async def send_confirmation_email(self, to_email: str, confirmation_link: str):
         if not settings.EMAIL_SERVICE_ENABLED:
@@ -45,8 +88,8 @@ class EmailService:
 
         subject = "Confirm your email address to get started on click2approve"
         body = f"Please click the following link to confirm your email: {confirmation_link}"
-        
-        await self._send_email_async(to_email, subject, body)
+
+        await self._enqueue([to_email], subject, body)
 
     async def send_password_reset_email(self, to_email: str, reset_link: str):
         if not settings.EMAIL_SERVICE_ENABLED:
@@ -54,31 +97,89 @@ class EmailService:
 
         subject = "Reset your password on click2approve"
         body = f"Please click the following link to reset your password: {reset_link}"
-        
-        await self._send_email_async(to_email, subject, body)
 
-    async def _send_email_async(self, to_email: str, subject: str, body: str):
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(self.executor, self._send_email, to_email, subject, body)
+        await self._enqueue([to_email], subject, body)
 
-    def _send_email(self, to_email: str, subject: str, body: str):
-        if not all([settings.EMAIL_HOST, settings.EMAIL_PORT, settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD]):
-            print(f"Email would be sent to {to_email}: {subject}")
+    async def _enqueue(self, to_emails: List[str], subject: str, body: str):
+        if not to_emails:
             return
-
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = settings.EMAIL_DEFAULT_FROM or settings.EMAIL_USERNAME
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
-            server.starttls()
-            server.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(settings.EMAIL_USERNAME, to_email, text)
-            server.quit()
-        except Exception as e:
-            print(f"Failed to send email to {to_email}: {e}")
\ No newline at end of file
+        self.db.add(EmailOutboxMessage(
+            recipients=json.dumps(list(to_emails)),
+            subject=subject,
+            body=body
+        ))
+
+
+def send_email(to_emails: List[str], subject: str, body: str) -> Dict[str, str]:
+    """Deliver one message body to many recipients over a pooled SMTP session.
+
+    When ``EMAIL_SMTP_MULTI_RCPT`` is on, recipients are grouped into
+    multi-RCPT transactions of up to ``EMAIL_SMTP_MAX_RCPT`` addresses with an
+    undisclosed ``To`` header; otherwise each recipient gets its own
+    transaction on the same session. Returns the recipients that could not be
+    delivered, mapped to the reason.
+    """
+    if not all([settings.EMAIL_HOST, settings.EMAIL_PORT, settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD]):
+        for to_email in to_emails:
+            print(f"Email would be sent to {to_email}: {subject}")
+        return {}
+
+    if not to_emails:
+        return {}
+
+    if settings.EMAIL_SMTP_MULTI_RCPT and settings.EMAIL_SMTP_MAX_RCPT > 1:
+        size = settings.EMAIL_SMTP_MAX_RCPT
+        batches = [to_emails[i:i + size] for i in range(0, len(to_emails), size)]
+    else:
+        batches = [[to_email] for to_email in to_emails]
+
+    failed: Dict[str, str] = {}
+    conn, reused = smtp_pool.acquire()
+    discard = False
+    index = 0
+    try:
+        for index, batch in enumerate(batches):
+            text = _build_message(batch, subject, body)
+            try:
+                refused = _send_batch(conn, batch, text)
+            except smtplib.SMTPServerDisconnected:
+                if not reused:
+                    raise
+                # The server dropped an idle pooled session; retry once on a fresh one
+                smtp_pool.release(conn, discard=True)
+                conn = None
+                conn, reused = smtp_pool.acquire()
+                refused = _send_batch(conn, batch, text)
+            reused = True
+            for to_email, reason in refused.items():
+                failed[to_email] = str(reason)
+    except (smtplib.SMTPException, OSError) as e:
+        # The session is unusable; nothing from this batch onwards was delivered
+        discard = True
+        for batch in batches[index:]:
+            for to_email in batch:
+                failed.setdefault(to_email, str(e))
+    finally:
+        if conn is not None:
+            smtp_pool.release(conn, discard=discard)
+    return failed
+
+
+def _send_batch(conn: smtplib.SMTP, batch: List[str], text: str) -> Dict[str, str]:
+    """Send one message to ``batch``, returning the recipients the server refused."""
+    try:
+        return conn.sendmail(settings.EMAIL_USERNAME, batch, text)
+    except smtplib.SMTPRecipientsRefused as e:
+        return e.recipients
+    except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+        return {to_email: str(e) for to_email in batch}
+
+
+def _build_message(to_emails: List[str], subject: str, body: str) -> str:
+    msg = MIMEMultipart()
+    msg['From'] = settings.EMAIL_DEFAULT_FROM or settings.EMAIL_USERNAME
+    msg['To'] = to_emails[0] if len(to_emails) == 1 else "undisclosed-recipients:;"
+    msg['Subject'] = subject
+
+    msg.attach(MIMEText(body, 'plain'))
+    return msg.as_string()
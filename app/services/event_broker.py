@@ -0,0 +1,173 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {"type": "resync"}
+REDIS_CHANNEL_PREFIX = "click2approve:events:"
+
+
+def user_channel(normalized_email: str) -> str:
+    return f"user:{normalized_email}"
+
+
+def pending_task_events(approvers: Iterable[str], event_type: str, sign: int, **fields: Any) -> List[Tuple[str, dict]]:
+    """One event per approver carrying the change to their pending task count."""
+    return [
+        (user_channel(approver), {"type": event_type, "pending_delta": count * sign, **fields})
+        for approver, count in Counter(approvers).items()
+    ]
+
+
+class Subscription:
+    """A bounded queue of events for one connection.
+
+    A subscriber that falls behind loses its backlog and receives a single
+    ``resync`` event instead, telling the client to refetch its counts.
+    """
+
+    def __init__(self, broker: "EventBroker", channel: str):
+        self.channel = channel
+        self._broker = broker
+        self._queue: asyncio.Queue = asyncio.Queue(settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, event: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next event, or None when nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class EventBroker:
+    """In-process broker: events reach subscribers connected to this worker only.
+
+    Subscriptions are plain queues registered per channel, so an idle
+    connection costs one queue and no database session or extra task.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.channel)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.channel]
+
+    async def publish(self, events: List[Tuple[str, Dict[str, Any]]]):
+        """Deliver ``(channel, event)`` pairs. Services call this after committing the
+        change the events describe, so failures are logged rather than raised."""
+        for channel, event in events:
+            self.deliver(channel, event)
+
+    def deliver(self, channel: str, event: Dict[str, Any]):
+        for subscription in self._subscriptions.get(channel, ()):
+            subscription.push(event)
+
+    def deliver_all(self, event: Dict[str, Any]):
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.push(event)
+
+
+class RedisEventBroker(EventBroker):
+    """Fans events out to every worker through Redis pub/sub.
+
+    Each worker keeps one pattern subscription on ``EVENTS_REDIS_URL`` and
+    hands incoming messages to its local subscriptions, so the number of
+    Redis connections does not grow with the number of clients. After the
+    subscription is lost, local subscribers are told to resync since
+    events may have been missed.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        self._url = url
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        import redis.asyncio as redis
+
+        if self._task is None:
+            self._redis = redis.from_url(self._url)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def publish(self, events: List[Tuple[str, Dict[str, Any]]]):
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for channel, event in events:
+                    pipe.publish(REDIS_CHANNEL_PREFIX + channel, json.dumps(event))
+                await pipe.execute()
+        except Exception:
+            logger.exception("Failed to publish %s events", len(events))
+
+    async def _run(self):
+        connected_before = False
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+                    if connected_before:
+                        self.deliver_all(RESYNC)
+                    connected_before = True
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        channel = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                        self.deliver(channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event subscription lost, reconnecting")
+                await asyncio.sleep(1)
+
+
+def create_event_broker() -> EventBroker:
+    if settings.EVENTS_BROKER == "redis":
+        return RedisEventBroker(settings.EVENTS_REDIS_URL)
+    return EventBroker()
+
+
+event_broker = create_event_broker()
@@ -0,0 +1,63 @@
+from typing import Dict, Iterable, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, exists, or_
+
+from app.core.config import settings
+from app.core.exceptions import NotFoundException, ValidationException
+from app.core.file_access_cache import file_access_cache
+from app.models.user import User
+from app.models.user_file import UserFile, approval_request_files
+from app.models.approval_request_task import ApprovalRequestTask
+
+
+class FileAccessService:
+    """Decides which files a user may read: their own, and the files of any request they were asked to approve.
+
+    Uncached ids are resolved in one query. The approver check is an
+    ``EXISTS`` that goes from the file to its requests through
+    ``ix_approval_request_files_user_file_id`` and on to their tasks by
+    ``approval_request_id``.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def readable_files(self, user: User, file_ids: Iterable[int]) -> Dict[int, UserFile]:
+        """Return the files among ``file_ids`` the user may read, by id. Missing and forbidden ids are left out."""
+        files: Dict[int, UserFile] = {}
+        missing = []
+        for file_id in set(file_ids):
+            cached = file_access_cache.get(user.normalized_email, file_id)
+            if cached is not None:
+                files[file_id] = cached
+            else:
+                missing.append(file_id)
+        if not missing:
+            return files
+
+        is_approver = exists().where(
+            approval_request_files.c.user_file_id == UserFile.id,
+            ApprovalRequestTask.approval_request_id == approval_request_files.c.approval_request_id,
+            ApprovalRequestTask.approver == user.normalized_email,
+        )
+        result = await self.db.execute(
+            select(UserFile).where(UserFile.id.in_(missing), or_(UserFile.owner_id == user.id, is_approver))
+        )
+        for user_file in result.scalars().all():
+            file_access_cache.set(user.normalized_email, user_file)
+            files[user_file.id] = user_file
+        return files
+
+    async def check_access(self, user: User, file_ids: List[int]) -> Dict[int, bool]:
+        """Batch check for pages listing attachments, one query for up to ``MAX_FILE_ACCESS_CHECK_IDS`` ids."""
+        if len(file_ids) > settings.MAX_FILE_ACCESS_CHECK_IDS:
+            raise ValidationException(f"Maximum number of files per check ({settings.MAX_FILE_ACCESS_CHECK_IDS}) exceeded")
+        readable = await self.readable_files(user, file_ids)
+        return {file_id: file_id in readable for file_id in file_ids}
+
+    async def get_readable_file(self, user: User, file_id: int) -> UserFile:
+        """Return the file, raising ``NotFoundException`` when it does not exist or the user may not read it."""
+        user_file = (await self.readable_files(user, [file_id])).get(file_id)
+        if user_file is None:
+            raise NotFoundException("File not found")
+        return user_file
@@ -0,0 +1,204 @@
+from abc import ABC, abstractmethod
+from typing import Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import logging
+import os
+
+from app.models.file_blob import FileBlob
+from app.models.user_file import UserFile
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PENDING_REMOVALS_KEY = "file_storage_removals"
+PENDING_STORES_KEY = "file_storage_stores"
+
+
+class FileStorage(ABC):
+    """Maps ``UserFile`` rows to content on disk.
+
+    ``store`` moves a staged upload into place after its row has been
+    flushed; what a rolled back upload leaves on disk is up to the backend.
+    ``release`` is called before the row is deleted, but content
+    only leaves the disk once that deletion has committed: callers run
+    ``collect_garbage`` after their commit, so a rolled back delete never
+    leaves a row without its file.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @abstractmethod
+    def get_path(self, user_file: UserFile) -> str:
+        pass
+
+    @abstractmethod
+    async def store(self, user_file: UserFile, temp_path: str):
+        pass
+
+    @abstractmethod
+    async def release(self, user_file: UserFile):
+        pass
+
+    async def collect_garbage(self):
+        pass
+
+
+class LegacyFileStorage(FileStorage):
+    """One copy per upload at ``<root>/<owner_id>/<file_id>/<filename>``.
+
+    A file stored by an upload that rolls back is removed again.
+    """
+
+    def get_path(self, user_file: UserFile) -> str:
+        return legacy_path(user_file)
+
+    async def store(self, user_file: UserFile, temp_path: str):
+        file_path = self.get_path(user_file)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.replace(temp_path, file_path)
+        # Removed by the session's after_rollback hook if the row never commits
+        self.db.sync_session.info.setdefault(PENDING_STORES_KEY, []).append(file_path)
+
+    async def release(self, user_file: UserFile):
+        # Removed by the session's after_commit hook, and forgotten on rollback
+        self.db.sync_session.info.setdefault(PENDING_REMOVALS_KEY, []).append(legacy_path(user_file))
+
+
+class ContentAddressedFileStorage(LegacyFileStorage):
+    """Deduplicating store keyed by SHA-256 under ``<root>/blobs/ab/cd/<digest>``.
+
+    ``file_blobs`` holds a reference count per digest. It is updated under a
+    row lock in the same transaction as the ``UserFile`` insert or delete.
+    A blob whose last reference went away keeps its row at zero until
+    ``collect_garbage`` removes the file and the row together under the row
+    lock, so an upload of the same content either re-references the row
+    first or waits and writes the file again. A blob written by an upload
+    that rolls back stays on disk without a row, because a concurrent
+    upload of the same content may already rely on it; the next upload of
+    that content reuses it. Rows
+    without a digest fall back to the legacy layout; existing storage roots
+    should be converted with ``python -m app.tools.migrate_file_storage``
+    before switching ``FILE_STORAGE_BACKEND`` to ``cas``.
+    """
+
+    def __init__(self, db: AsyncSession):
+        super().__init__(db)
+        self._released: Set[str] = set()
+
+    def get_path(self, user_file: UserFile) -> str:
+        if not user_file.sha256:
+            return super().get_path(user_file)
+        return blob_path(user_file.sha256)
+
+    async def store(self, user_file: UserFile, temp_path: str):
+        if not user_file.sha256:
+            return await super().store(user_file, temp_path)
+
+        blob = await self._lock_blob(user_file.sha256)
+        if blob is None:
+            try:
+                async with self.db.begin_nested():
+                    self.db.add(FileBlob(sha256=user_file.sha256, size=user_file.size, ref_count=1))
+            except IntegrityError:
+                # A concurrent upload created the blob first
+                blob = await self._lock_blob(user_file.sha256)
+                blob.ref_count += 1
+        else:
+            blob.ref_count += 1
+
+        file_path = blob_path(user_file.sha256)
+        if os.path.exists(file_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(temp_path, file_path)
+
+    async def release(self, user_file: UserFile):
+        if not user_file.sha256:
+            return await super().release(user_file)
+
+        blob = await self._lock_blob(user_file.sha256)
+        if blob is None:
+            # Not tracked as a blob, e.g. storage that was never migrated
+            return await super().release(user_file)
+
+        blob.ref_count -= 1
+        if blob.ref_count <= 0:
+            self._released.add(user_file.sha256)
+
+    async def collect_garbage(self):
+        """Remove released blobs that are still unreferenced. Called after commit, so failures are only logged."""
+        digests, self._released = sorted(self._released), set()
+        if not digests:
+            return
+        try:
+            result = await self.db.execute(
+                select(FileBlob)
+                .where(FileBlob.sha256.in_(digests), FileBlob.ref_count <= 0)
+                .with_for_update()
+            )
+            for blob in result.scalars().all():
+                # If the commit below fails, store() finds the zero row without a file and writes it again
+                _remove(blob_path(blob.sha256))
+                await self.db.delete(blob)
+            await self.db.commit()
+        except Exception:
+            logger.exception("Failed to collect released blobs %s", digests)
+            await self.db.rollback()
+
+    async def _lock_blob(self, sha256: str) -> FileBlob:
+        result = await self.db.execute(
+            select(FileBlob).where(FileBlob.sha256 == sha256).with_for_update()
+        )
+        return result.scalar_one_or_none()
+
+
+def legacy_path(user_file: UserFile) -> str:
+    return os.path.join(settings.FILE_STORAGE_ROOT_PATH, user_file.owner_id, str(user_file.id), user_file.name)
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.FILE_STORAGE_ROOT_PATH, "blobs", sha256[:2], sha256[2:4], sha256)
+
+
+def _remove(file_path: str):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass  # File already deleted
+
+
+def get_file_storage(db: AsyncSession) -> FileStorage:
+    if settings.FILE_STORAGE_BACKEND == "cas":
+        return ContentAddressedFileStorage(db)
+    return LegacyFileStorage(db)
+
+
+def _remove_with_directory(file_path: str):
+    _remove(file_path)
+    # Remove directory if empty
+    dir_path = os.path.dirname(file_path)
+    if os.path.exists(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_files(session: Session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop(PENDING_STORES_KEY, None)
+    for file_path in session.info.pop(PENDING_REMOVALS_KEY, []):
+        _remove_with_directory(file_path)
+
+
+@event.listens_for(Session, "after_rollback")
+def _remove_stored_files(session: Session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop(PENDING_REMOVALS_KEY, None)
+    for file_path in session.info.pop(PENDING_STORES_KEY, []):
+        _remove_with_directory(file_path)
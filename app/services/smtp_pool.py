@@ -0,0 +1,83 @@
+from typing import List, Tuple
+import smtplib
+import threading
+import time
+
+from app.core.config import settings
+
+
+class SmtpConnectionPool:
+    """Process-wide pool of authenticated SMTP sessions.
+
+    Connections pay for STARTTLS and AUTH once and are then reused for many
+    messages. Idle sessions older than ``idle_timeout`` are closed instead of
+    reused, and a session that raised is dropped rather than returned. The
+    pool is thread-safe because delivery runs on executor threads.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    def acquire(self) -> Tuple[smtplib.SMTP, bool]:
+        """Return a session and whether it was reused from the pool."""
+        self._slots.acquire()
+        try:
+            now = time.monotonic()
+            with self._lock:
+                while self._idle:
+                    conn, idle_since = self._idle.pop()
+                    if now - idle_since < self.idle_timeout:
+                        self.connections_reused += 1
+                        return conn, True
+                    self._close(conn)
+            conn = self._connect()
+            self.connections_opened += 1
+            return conn, False
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn: smtplib.SMTP, discard: bool = False):
+        try:
+            if discard:
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=settings.EMAIL_SMTP_TIMEOUT_SECONDS)
+        try:
+            conn.starttls()
+            conn.login(settings.EMAIL_USERNAME, settings.EMAIL_PASSWORD)
+        except Exception:
+            self._close(conn)
+            raise
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+
+smtp_pool = SmtpConnectionPool(
+    max_size=settings.EMAIL_SMTP_POOL_SIZE,
+    idle_timeout=settings.EMAIL_SMTP_IDLE_TIMEOUT_SECONDS,
+)
@@ -1,31 +1,53 @@
-from typing import List, Tuple, Optional
+from typing import AsyncIterator, List, Tuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from fastapi import UploadFile
+from datetime import datetime
+import asyncio
+import base64
+import hashlib
 import os
+import uuid
+import zipfile
 import aiofiles
+import aiofiles.os
 
 from app.models.user import User
-from app.models.user_file import UserFile
-from app.models.approval_request_task import ApprovalRequestTask
+from app.models.user_file import UserFile, approval_request_files
 from app.core.config import settings
 from app.core.exceptions import ValidationException, NotFoundException
+from app.core.file_access_cache import file_access_cache
+from app.core.pagination import decode_cursor, keyset_after, split_page
+from app.core.replicas import replica_router
+from app.core.response_cache import response_cache, FILES, REQUESTS
+from app.core.instrumentation import file_io
 from app.services.audit_log_service import AuditLogService
+from app.services.file_storage import get_file_storage
+from app.services.counter_service import CounterService
+from app.services.file_access_service import FileAccessService
+
+BASE64_CHUNK_SIZE = 48 * 1024  # multiple of 3
+ZIP_CHUNK_SIZE = 64 * 1024
+# Formats that are compressed already, deflating them again only costs CPU
+ZIP_STORED_TYPES = {
+    ".7z", ".avi", ".docx", ".gif", ".gz", ".heic", ".jpeg", ".jpg", ".mov", ".mp3", ".mp4", ".odp", ".ods",
+    ".odt", ".pdf", ".png", ".pptx", ".rar", ".webm", ".webp", ".xlsx", ".zip",
+}
 
 
 class UserFileService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.audit_service = AuditLogService(db)
+        self.storage = get_file_storage(db)
+        self.counters = CounterService(db)
+        self.access = FileAccessService(db)
 
     async def check_limitations(self, user: User, files: List[UploadFile]):
         # Check file count limit
         if settings.MAX_FILE_COUNT > 0:
-            result = await self.db.execute(
-                select(UserFile).where(UserFile.owner_id == user.id)
-            )
-            current_count = len(result.scalars().all())
-            if current_count + len(files) > settings.MAX_FILE_COUNT:
+            stats = await self.counters.get(user.normalized_email)
+            if stats.file_count + len(files) > settings.MAX_FILE_COUNT:
                 raise ValidationException(f"Maximum file count ({settings.MAX_FILE_COUNT}) exceeded")
 
         # Check file size limit
@@ -36,79 +58,187 @@ class UserFileService:
     async def upload_files(self, user: User, files: List[UploadFile]) -> List[UserFile]:
         await self.check_limitations(user, files)
         
+        # Stream every upload to a temp file in parallel
+        results = await asyncio.gather(*[self._stage_file(file) for file in files], return_exceptions=True)
+        staged = [r for r in results if not isinstance(r, BaseException)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            self._discard_staged(staged)
+            raise errors[0]
+        
         uploaded_files = []
-        for file in files:
-            # Create user file record
-            user_file = UserFile(
-                name=file.filename,
-                type=os.path.splitext(file.filename)[1] if file.filename else "",
-                size=file.size or 0,
-                owner_id=user.id
-            )
-            
-            self.db.add(user_file)
-            await self.db.flush()  # Get the ID
+        try:
+            for file, (temp_path, size, digest) in zip(files, staged):
+                # Create user file record
+                user_file = UserFile(
+                    name=file.filename,
+                    type=os.path.splitext(file.filename)[1] if file.filename else "",
+                    size=size,
+                    sha256=digest,
+                    owner_id=user.id
+                )
+                self.db.add(user_file)
+                uploaded_files.append(user_file)
             
-            # Save physical file
-            file_path = self._get_file_path(user.id, str(user_file.id), file.filename)
-            await self._save_file(file, file_path)
+            await self.db.flush()  # Get the IDs
             
-            uploaded_files.append(user_file)
+            # Move staged files into place only once their rows exist
+            for user_file, (temp_path, _, _) in zip(uploaded_files, staged):
+                await self.storage.store(user_file, temp_path)
             
-            # Audit log
-            await self.audit_service.log(
+            await self.counters.add(
                 user.normalized_email,
-                "Uploaded user file",
-                f"File: {user_file.name}, Size: {user_file.size}"
+                file_count=len(uploaded_files),
+                total_bytes=sum(user_file.size for user_file in uploaded_files)
             )
+            
+            for user_file in uploaded_files:
+                # Audit log
+                await self.audit_service.log(
+                    user.normalized_email,
+                    "Uploaded user file",
+                    f"File: {user_file.name}, Size: {user_file.size}"
+                )
+            
+            await self.db.commit()
+        except BaseException:
+            # Files already moved into place are removed by the rollback
+            self._discard_staged(staged)
+            await self.db.rollback()
+            raise
         
-        await self.db.commit()
+        await replica_router.pin([user.normalized_email])
+        await response_cache.invalidate(FILES, [user.normalized_email])
         return uploaded_files
 
-    async def list_files(self, user: User) -> List[UserFile]:
-        result = await self.db.execute(
-            select(UserFile).where(UserFile.owner_id == user.id).order_by(UserFile.created.desc())
-        )
-        return result.scalars().all()
+    async def list_files(
+        self,
+        user: User,
+        name: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[UserFile], Optional[str]]:
+        """Return one page of the user's files, newest first, and the cursor for the next page.
 
-    async def download_file(self, user: User, file_id: int) -> Tuple[str, bytes]:
-        # Check if user owns the file or is an approver
-        result = await self.db.execute(
-            select(UserFile).where(UserFile.id == file_id)
-        )
-        user_file = result.scalar_one_or_none()
-        
-        if not user_file:
-            raise NotFoundException("File not found")
-        
-        # Check permissions
-        can_access = user_file.owner_id == user.id
-        
-        if not can_access:
-            # Check if user is an approver for this file
-            result = await self.db.execute(
-                select(ApprovalRequestTask).where(
-                    and_(
-                        ApprovalRequestTask.approver == user.normalized_email,
-                        ApprovalRequestTask.approval_request.has(
-                            user_files=user_file
-                        )
-                    )
-                )
-            )
-            can_access = result.scalar_one_or_none() is not None
-        
-        if not can_access:
-            raise NotFoundException("File not found")
+        Without ``limit`` every matching file is returned.
+        """
+        query = select(UserFile).where(UserFile.owner_id == user.id)
+        if name:
+            query = query.where(UserFile.name.icontains(name, autoescape=True))
+        if created_from:
+            query = query.where(UserFile.created >= created_from)
+        if created_to:
+            query = query.where(UserFile.created < created_to)
+        if cursor:
+            query = query.where(keyset_after([UserFile.created, UserFile.id], decode_cursor(cursor, datetime, int)))
+        query = query.order_by(UserFile.created.desc(), UserFile.id.desc())
+
+        if limit is None:
+            result = await self.db.execute(query)
+            return result.scalars().all(), None
+        result = await self.db.execute(query.limit(limit + 1))
+        return split_page(result.scalars().all(), limit, lambda f: (f.created, f.id))
+
+    async def get_download(self, user: User, file_id: int) -> Tuple[UserFile, str, os.stat_result]:
+        """Resolve a file the user may read to its row, path on disk and stat result."""
+        user_file = await self.access.get_readable_file(user, file_id)
         
-        # Read file
-        file_path = self._get_file_path(user_file.owner_id, str(user_file.id), user_file.name)
+        file_path = self.storage.get_path(user_file)
         try:
-            async with aiofiles.open(file_path, 'rb') as f:
-                content = await f.read()
-            return user_file.name, content
+            stat_result = await aiofiles.os.stat(file_path)
         except FileNotFoundError:
             raise NotFoundException("File not found on disk")
+        return user_file, file_path, stat_result
+
+    async def get_bundle(self, user: User, request_id: int) -> List[Tuple[UserFile, str]]:
+        """Resolve the files of an approval request the user may read to their rows and paths on disk.
+
+        Access is decided per file as for single downloads, so only the
+        author and the request's approvers get anything back.
+        """
+        result = await self.db.execute(
+            select(approval_request_files.c.user_file_id)
+            .where(approval_request_files.c.approval_request_id == request_id)
+        )
+        readable = await self.access.readable_files(user, result.scalars().all())
+        if not readable:
+            raise NotFoundException("Approval request not found")
+
+        bundle = []
+        for file_id in sorted(readable):
+            user_file = readable[file_id]
+            file_path = self.storage.get_path(user_file)
+            # Checked up front, a file missing halfway through would truncate the archive
+            if not await aiofiles.os.path.isfile(file_path):
+                raise NotFoundException("File not found on disk")
+            bundle.append((user_file, file_path))
+        return bundle
+
+    async def iter_zip(self, bundle: List[Tuple[UserFile, str]]) -> AsyncIterator[bytes]:
+        """Yield a ZIP archive of the bundle as it is written.
+
+        The archive goes to a non-seekable sink, so ``zipfile`` writes each
+        entry's sizes and CRC in a data descriptor after its data and never
+        seeks back. Every chunk read is compressed and passed on before the
+        next one, which bounds memory by ``ZIP_CHUNK_SIZE`` whatever the
+        bundle size. Deflating runs in the executor so large bundles do not
+        stall the event loop; stored entries only copy and checksum, so they
+        are written inline.
+        """
+        loop = asyncio.get_running_loop()
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, mode="w") as archive:
+            for (user_file, file_path), name in zip(bundle, _archive_names([f for f, _ in bundle])):
+                info = zipfile.ZipInfo(name, date_time=user_file.created.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED if user_file.type.lower() in ZIP_STORED_TYPES else zipfile.ZIP_DEFLATED
+                # Size hint, lets zipfile decide on ZIP64 up front
+                info.file_size = user_file.size
+                with archive.open(info, mode="w") as entry:
+                    async with aiofiles.open(file_path, 'rb') as f:
+                        while True:
+                            with file_io():
+                                data = await f.read(ZIP_CHUNK_SIZE)
+                            if not data:
+                                break
+                            if info.compress_type == zipfile.ZIP_DEFLATED:
+                                await loop.run_in_executor(None, entry.write, data)
+                            else:
+                                entry.write(data)
+                            chunk = sink.drain()
+                            # Deflate may hold a whole chunk back
+                            if chunk:
+                                yield chunk
+                # The compressor's last block and the data descriptor
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        # Central directory
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+
+    async def iter_base64(self, file_path: str) -> AsyncIterator[bytes]:
+        """Yield the base64 encoding of a file chunk by chunk.
+
+        Reads are kept 3-byte aligned so every chunk encodes without padding
+        except the last, and the concatenated chunks equal a one-shot encode.
+        """
+        carry = b""
+        async with aiofiles.open(file_path, 'rb') as f:
+            while True:
+                with file_io():
+                    data = await f.read(BASE64_CHUNK_SIZE)
+                if not data:
+                    break
+                data = carry + data
+                aligned = len(data) - len(data) % 3
+                carry = data[aligned:]
+                if aligned:
+                    yield base64.b64encode(data[:aligned])
+        if carry:
+            yield base64.b64encode(carry)
 
     async def delete_file(self, user: User, file_id: int):
         result = await self.db.execute(
@@ -119,19 +249,12 @@ class UserFileService:
         if not user_file:
             raise NotFoundException("File not found")
         
-        # Delete physical file
-        file_path = self._get_file_path(user.id, str(file_id), user_file.name)
-        try:
-            os.remove(file_path)
-            # Remove directory if empty
-            dir_path = os.path.dirname(file_path)
-            if os.path.exists(dir_path) and not os.listdir(dir_path):
-                os.rmdir(dir_path)
-        except FileNotFoundError:
-            pass  # File already deleted
+        # Release the physical file, it is removed once the delete commits
+        await self.storage.release(user_file)
         
         # Delete from database
         await self.db.delete(user_file)
+        await self.counters.add(user.normalized_email, file_count=-1, total_bytes=-user_file.size)
         
         # Audit log
         await self.audit_service.log(
@@ -141,14 +264,84 @@ class UserFileService:
         )
         
         await self.db.commit()
+        await self.storage.collect_garbage()
+        file_access_cache.invalidate_file(file_id)
+        await replica_router.pin([user.normalized_email])
+        # Requests list their files, so they change too
+        await response_cache.invalidate(FILES, [user.normalized_email])
+        await response_cache.invalidate(REQUESTS, [user.normalized_email])
 
-    def _get_file_path(self, user_id: str, file_id: str, filename: str) -> str:
-        return os.path.join(settings.FILE_STORAGE_ROOT_PATH, user_id, file_id, filename)
-
-    async def _save_file(self, upload_file: UploadFile, file_path: str):
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    async def _stage_file(self, upload_file: UploadFile) -> Tuple[str, int, str]:
+        """Copy an upload to a temp file in chunks, enforcing the size limit and hashing on the way."""
+        temp_dir = os.path.join(settings.FILE_STORAGE_ROOT_PATH, ".tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        temp_path = os.path.join(temp_dir, uuid.uuid4().hex)
+        
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while True:
+                    chunk = await upload_file.read(settings.FILE_UPLOAD_CHUNK_SIZE_BYTES)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if settings.MAX_FILE_SIZE_BYTES > 0 and size > settings.MAX_FILE_SIZE_BYTES:
+                        raise ValidationException(f"File {upload_file.filename} exceeds maximum size ({settings.MAX_FILE_SIZE_BYTES} bytes)")
+                    digest.update(chunk)
+                    with file_io():
+                        await f.write(chunk)
+        except BaseException:
+            self._remove_quietly(temp_path)
+            raise
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await upload_file.read()
-            await f.write(content)
\ No newline at end of file
+        return temp_path, size, digest.hexdigest()
+
+    def _discard_staged(self, staged: List[Tuple[str, int, str]]):
+        for temp_path, _, _ in staged:
+            self._remove_quietly(temp_path)
+
+    @staticmethod
+    def _remove_quietly(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class _ZipSink:
+    """Write-only target for ``zipfile`` that hands its output on in pieces.
+
+    It has no ``tell`` or ``seek``, which makes ``zipfile`` stream.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _archive_names(files: List[UserFile]) -> List[str]:
+    """Entry names for the files, without directories and made unique case-insensitively."""
+    names = []
+    taken = set()
+    for user_file in files:
+        name = user_file.name.replace("\\", "/").rsplit("/", 1)[-1] or f"file-{user_file.id}"
+        stem, extension = os.path.splitext(name)
+        candidate, n = name, 2
+        while candidate.lower() in taken:
+            candidate = f"{stem} ({n}){extension}"
+            n += 1
+        taken.add(candidate.lower())
+        names.append(candidate)
+    return names
@@ -5,8 +5,10 @@ from datetime import datetime, timedelta
 import uuid
 
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password
+from app.core.passwords import password_hasher
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
+from app.core.response_cache import response_cache, ACCOUNT
 from app.core.exceptions import ValidationException, AuthenticationException
 
 
@@ -38,7 +40,7 @@ class UserService:
             id=str(uuid.uuid4()),
             email=email,
             normalized_email=email.upper(),
-            password_hash=get_password_hash(password),
+            password_hash=await password_hasher.hash(password),
             email_confirmed=not settings.EMAIL_SERVICE_ENABLED,  # Auto-confirm if email service disabled
             lockout_enabled=settings.LOCKOUT_ENABLED
         )
@@ -57,12 +59,14 @@ class UserService:
         if user.lockout_enabled and user.lockout_end and user.lockout_end > datetime.utcnow():
             raise AuthenticationException("Account is locked")
 
-        if not verify_password(password, user.password_hash):
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+        if not valid:
             # Increment failed attempts
             user.access_failed_count += 1
             if user.access_failed_count >= settings.LOCKOUT_MAX_ATTEMPTS:
                 user.lockout_end = datetime.utcnow() + timedelta(minutes=settings.LOCKOUT_TIME_MINUTES)
             await self.db.commit()
+            principal_cache.invalidate_user(user.normalized_email)
             return None
 
         # Reset failed attempts on successful login
@@ -70,6 +74,13 @@ class UserService:
             user.access_failed_count = 0
             user.lockout_end = None
             await self.db.commit()
+            principal_cache.invalidate_user(user.normalized_email)
+
+        # Upgrade hashes created with an outdated cost factor
+        if new_hash:
+            user.password_hash = new_hash
+            await self.db.commit()
+            principal_cache.invalidate_user(user.normalized_email)
 
         return user
 
@@ -80,6 +91,8 @@ class UserService:
         
         user.email_confirmed = True
         await self.db.commit()
+        principal_cache.invalidate_user(user.normalized_email)
+        await response_cache.invalidate(ACCOUNT, [user.normalized_email])
         return True
 
     async def reset_password(self, email: str, new_password: str) -> bool:
@@ -87,8 +100,9 @@ class UserService:
         if not user:
             return False
         
-        user.password_hash = get_password_hash(new_password)
+        user.password_hash = await password_hasher.hash(new_password)
         user.access_failed_count = 0
         user.lockout_end = None
         await self.db.commit()
+        principal_cache.invalidate_user(user.normalized_email)
         return True
\ No newline at end of file
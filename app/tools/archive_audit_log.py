@@ -0,0 +1,29 @@
+"""Archive audit log months older than ``AUDIT_LOG_LIVE_MONTHS`` and drop them from the database.
+
+Usage:
+    python -m app.tools.archive_audit_log
+
+The API runs the same job every ``AUDIT_LOG_ARCHIVE_INTERVAL_SECONDS``; use
+this entry point from cron when the periodic job is disabled. Archives are
+written to ``<FILE_STORAGE_ROOT_PATH>/audit``.
+"""
+import asyncio
+
+import app.models  # registers every model on Base.metadata
+from app.services.audit_log_archive import audit_log_archiver
+
+
+async def archive():
+    months = await audit_log_archiver.run_once()
+    if months is None:
+        print("Another process is archiving the audit log")
+    else:
+        print(f"Archived {len(months)} months: {', '.join(f'{month:%Y-%m}' for month in months) or '-'}")
+
+
+def main():
+    asyncio.run(archive())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,560 @@
+"""Benchmark the API's hot paths through the real ASGI app.
+
+Usage:
+    python -m app.tools.benchmark_api [--database-url URL] [--users N] [--files-per-user N]
+        [--requests-per-user N] [--approvers-per-request N] [--iterations N] [--concurrency N]
+        [--storm-concurrency N] [--inline-password-hashing] [--no-principal-cache] [--download-concurrency N]
+        [--scenarios a,b] [--output FILE]
+        [--baseline FILE] [--save-baseline] [--tolerance 0.25]
+
+The tool seeds a scratch database, starts the app with its lifespan and
+drives it in-process through ``httpx``: login, the list endpoints, badge
+polling, uploads and downloads of several sizes, and task completion. Each
+scenario runs ``--iterations`` requests from ``--concurrency`` concurrent
+clients, each acting as a random seeded user. Results, with throughput,
+p50/p95/p99 latency and the process's peak RSS after each scenario, are
+printed as JSON and written to ``--output`` when given.
+
+``login_storm`` measures badge polling while ``--storm-concurrency`` clients
+log in back to back, and also reports the logins' p99, the password
+hasher's peak queue and the pool checkouts that timed out. Compare it with a
+run using ``--inline-password-hashing``, which runs bcrypt on the event loop
+as before the hasher pool existed.
+
+``download_concurrent`` downloads 1MB files from ``--download-concurrency``
+clients at once (default 100) and reports how far the process's resident
+memory rose above where it started, sampled while the downloads run. Its
+requests go straight to the ASGI app and each body chunk is dropped on
+arrival, because ``httpx``'s ASGI transport buffers whole responses and
+would hide what the app itself holds per download. Memory freed by earlier
+scenarios is reused, so run it alone for a clean figure.
+
+``--no-principal-cache`` turns off the cache of decoded tokens and users
+that ``get_current_user`` consults, so every authenticated request decodes
+its JWT and loads its user again. Run the badge and list scenarios with and
+without it to measure what the cache saves; the results include the
+cache's hit and miss counts.
+
+With ``--baseline`` the results are compared with a stored run and the tool
+exits with status 1 when a scenario's p95 grew, or its throughput dropped,
+by more than ``--tolerance``. ``--save-baseline`` writes the results to the
+baseline file instead. Baselines are only comparable between runs on the
+same machine with the same options.
+
+Without ``--database-url`` a temporary SQLite file is used (requires
+``aiosqlite``), with files stored in a temporary directory. Limits on file
+and request counts are lifted so repeated uploads do not fail, and the
+response cache is turned off so the list scenarios measure their queries
+rather than cache hits. Never point the tool at a database that holds real
+data.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+PASSWORD = "benchmark-password-1"
+PAYLOAD_SIZES = {"1k": 1024, "100k": 100 * 1024, "1m": 1024 * 1024}
+SCENARIOS = [
+    "login",
+    "list_files",
+    "list_requests",
+    "list_uncompleted",
+    "list_completed",
+    "badge",
+    *[f"upload_{size}" for size in PAYLOAD_SIZES],
+    *[f"download_{size}" for size in PAYLOAD_SIZES],
+    "complete_task",
+    "login_storm",
+    "download_concurrent",
+]
+
+
+def _seed_rows(args, password_hash: str):
+    from app.models.approval_request import ApprovalStatus
+
+    now = datetime.utcnow()
+    emails = [f"user{i}@example.com" for i in range(args.users)]
+    rows: Dict[str, List[Dict[str, Any]]] = {"users": [], "files": [], "requests": [], "links": [], "tasks": []}
+    for i, email in enumerate(emails):
+        rows["users"].append({
+            "id": f"user-{i}", "email": email, "normalized_email": email.upper(), "password_hash": password_hash,
+            "email_confirmed": True, "lockout_enabled": False, "access_failed_count": 0, "created_at": now,
+        })
+    for i in range(args.users):
+        first_file = len(rows["files"]) + 1
+        for j in range(args.files_per_user):
+            rows["files"].append({
+                "id": len(rows["files"]) + 1, "name": f"document-{i}-{j}.pdf", "type": ".pdf", "size": 1000 + j,
+                "created": now - timedelta(minutes=j), "owner_id": f"user-{i}",
+            })
+        for j in range(args.requests_per_user):
+            request_id = len(rows["requests"]) + 1
+            done = j % 2 == 0
+            rows["requests"].append({
+                "id": request_id, "submitted": now - timedelta(hours=j), "author": emails[i].upper(),
+                "author_id": f"user-{i}",
+                "status": ApprovalStatus.APPROVED if done else ApprovalStatus.SUBMITTED,
+            })
+            if args.files_per_user:
+                rows["links"].append({"approval_request_id": request_id, "user_file_id": first_file + j % args.files_per_user})
+            for k in range(1, args.approvers_per_request + 1):
+                approver = (i + k) % args.users
+                rows["tasks"].append({
+                    "id": len(rows["tasks"]) + 1, "approval_request_id": request_id,
+                    "approver": emails[approver].upper(), "approver_id": f"user-{approver}",
+                    "status": ApprovalStatus.APPROVED if done else ApprovalStatus.SUBMITTED, "completed": now if done else None,
+                })
+    return emails, rows
+
+
+async def _seed(args) -> Optional[List[str]]:
+    from sqlalchemy import func, insert, select
+
+    from app.core.database import engine, Base
+    from app.core.passwords import password_hasher
+    import app.models  # registers every model on Base.metadata
+    from app.models.approval_request import ApprovalRequest
+    from app.models.approval_request_task import ApprovalRequestTask
+    from app.models.user import User
+    from app.models.user_file import UserFile, approval_request_files
+
+    emails, rows = _seed_rows(args, await password_hasher.hash(PASSWORD))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if await conn.scalar(select(func.count()).select_from(User)):
+            print("Refusing to seed a database that already has users; point --database-url at an empty one")
+            return None
+        for model, key in [
+            (User, "users"), (UserFile, "files"), (ApprovalRequest, "requests"),
+            (approval_request_files, "links"), (ApprovalRequestTask, "tasks"),
+        ]:
+            for start in range(0, len(rows[key]), 5000):
+                await conn.execute(insert(model), rows[key][start:start + 5000])
+    return emails
+
+
+class Clients:
+    """Per-user state shared by the scenarios: tokens, uploaded files and pending tasks."""
+
+    def __init__(self, client, emails: List[str]):
+        self.client = client
+        self.emails = emails
+        self.tokens: Dict[str, str] = {}
+        self.uploads: Dict[str, List[tuple]] = {}
+        self.pending: Dict[str, List[int]] = {}
+
+    def random_user(self) -> str:
+        return random.choice(self.emails)
+
+    def headers(self, email: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    async def login(self, email: str):
+        response = await self.client.post("/api/account/login", json={"email": email, "password": PASSWORD})
+        if response.status_code == 200:
+            self.tokens[email] = response.json()["access_token"]
+        return response
+
+
+def _scenario(name: str, clients: Clients) -> Callable[[], Awaitable[Any]]:
+    client = clients.client
+
+    if name == "login":
+        return lambda: clients.login(clients.random_user())
+
+    list_paths = {
+        "list_files": "/api/file/list",
+        "list_requests": "/api/request/list",
+        "list_uncompleted": "/api/task/listUncompleted",
+        "list_completed": "/api/task/listCompleted",
+        "badge": "/api/task/countUncompleted",
+    }
+    if name in list_paths:
+        async def get():
+            email = clients.random_user()
+            params = {"limit": 50} if name != "badge" else None
+            return await client.get(list_paths[name], headers=clients.headers(email), params=params)
+        return get
+
+    kind, _, size = name.partition("_")
+    if kind == "upload":
+        payload = os.urandom(PAYLOAD_SIZES[size])
+
+        async def upload():
+            email = clients.random_user()
+            files = [("files", (f"upload-{size}.bin", payload, "application/octet-stream"))]
+            return await client.post("/api/file/upload", headers=clients.headers(email), files=files)
+        return upload
+
+    if kind == "download":
+        async def download():
+            email = clients.random_user()
+            file_id = random.choice([file_id for file_size, file_id in clients.uploads[email] if file_size == size])
+            return await client.get("/api/file/download", headers=clients.headers(email), params={"id": file_id})
+        return download
+
+    if name == "complete_task":
+        async def complete():
+            email = random.choice([email for email, tasks in clients.pending.items() if tasks] or [None])
+            if email is None:
+                raise RuntimeError("No pending tasks left, seed more requests or run fewer iterations")
+            task_id = clients.pending[email].pop()
+            return await client.post(
+                "/api/task/complete", headers=clients.headers(email), json={"id": task_id, "status": 1}
+            )
+        return complete
+
+    raise ValueError(f"Unknown scenario {name}")
+
+
+async def _prepare(clients: Clients, scenarios: List[str]):
+    """Log everyone in, upload download fixtures and collect pending tasks."""
+    for email in clients.emails:
+        response = await clients.login(email)
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed for {email}: {response.status_code} {response.text}")
+
+    sizes = [name.partition("_")[2] for name in scenarios if name.startswith("download_") and name != "download_concurrent"]
+    if "download_concurrent" in scenarios and "1m" not in sizes:
+        sizes.append("1m")
+    for email in clients.emails:
+        clients.uploads[email] = []
+        for size in sizes:
+            response = await clients.client.post(
+                "/api/file/upload",
+                headers=clients.headers(email),
+                files=[("files", (f"fixture-{size}.bin", os.urandom(PAYLOAD_SIZES[size]), "application/octet-stream"))],
+            )
+            response.raise_for_status()
+            clients.uploads[email].append((size, response.json()[0]["id"]))
+
+    if "complete_task" in scenarios:
+        for email in clients.emails:
+            response = await clients.client.get("/api/task/listUncompleted", headers=clients.headers(email))
+            response.raise_for_status()
+            clients.pending[email] = [task["id"] for task in response.json()]
+
+
+async def _run_scenario(run: Callable[[], Awaitable[Any]], iterations: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await run()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+async def _run_login_storm(clients: Clients, iterations: int, concurrency: int, storm_concurrency: int) -> Dict[str, Any]:
+    from app.core.instrumentation import POOL_CHECKOUT_TIMEOUTS
+    from app.core.passwords import password_hasher
+
+    stop = asyncio.Event()
+    login_latencies: List[float] = []
+    login_errors = 0
+
+    async def storm():
+        nonlocal login_errors
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = await clients.login(clients.random_user())
+            login_latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                login_errors += 1
+
+    password_hasher.peak_queued = 0
+    timeouts = POOL_CHECKOUT_TIMEOUTS.total()
+    storms = [asyncio.create_task(storm()) for _ in range(storm_concurrency)]
+    try:
+        # Let the storm fill the hasher queue before measuring
+        await asyncio.sleep(0.5)
+        result = await _run_scenario(_scenario("badge", clients), iterations, concurrency)
+    finally:
+        stop.set()
+        await asyncio.gather(*storms)
+
+    login_latencies.sort()
+    result.update({
+        "login_requests": len(login_latencies),
+        "login_errors": login_errors,
+        "login_p99_ms": round(_percentile(login_latencies, 99) * 1000, 3),
+        "hasher_peak_queued": password_hasher.peak_queued,
+        "pool_checkout_timeouts": POOL_CHECKOUT_TIMEOUTS.total() - timeouts,
+    })
+    return result
+
+
+class _DrainedResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+async def _asgi_get(app, path: str, headers: Dict[str, str], params: Dict[str, Any]) -> _DrainedResponse:
+    """GET through the ASGI app, dropping body chunks as they arrive."""
+    from urllib.parse import urlencode
+
+    done = asyncio.Event()
+    requested = False
+    status_code = 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"benchmark"), *[(k.lower().encode(), v.encode()) for k, v in headers.items()]],
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        status_code = 500
+    done.set()
+    return _DrainedResponse(status_code)
+
+
+async def _run_concurrent_downloads(app, clients: Clients, iterations: int, concurrency: int) -> Dict[str, Any]:
+    async def download():
+        email = clients.random_user()
+        file_id = random.choice([file_id for file_size, file_id in clients.uploads[email] if file_size == "1m"])
+        return await _asgi_get(app, "/api/file/download", clients.headers(email), {"id": file_id})
+
+    stop = asyncio.Event()
+    baseline = peak = _current_rss_mb()
+
+    async def sample():
+        nonlocal peak
+        while not stop.is_set():
+            peak = max(peak, _current_rss_mb())
+            await asyncio.sleep(0.005)
+
+    sampler = asyncio.create_task(sample())
+    try:
+        result = await _run_scenario(download, max(iterations, concurrency), concurrency)
+    finally:
+        stop.set()
+        await sampler
+    result["rss_growth_mb"] = round(max(peak, _current_rss_mb()) - baseline, 1)
+    return result
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(percentile / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        # No procfs, fall back to the high-water mark
+        return _peak_rss_mb()
+
+
+async def benchmark(args) -> Optional[Dict[str, Any]]:
+    import httpx
+
+    from app.core.database import engine
+    from app.core.principal_cache import principal_cache
+    from app.main import app, lifespan
+
+    emails = await _seed(args)
+    if emails is None:
+        return None
+
+    if args.inline_password_hashing:
+        from app.core.passwords import password_hasher
+
+        async def inline(func, *func_args):
+            return func(*func_args)
+        password_hasher._run = inline
+
+    scenarios = args.scenarios.split(",") if args.scenarios else SCENARIOS
+    results: Dict[str, Any] = {}
+    async with lifespan(app):
+        # Count unhandled app errors as 500s instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            clients = Clients(client, emails)
+            await _prepare(clients, scenarios)
+            for name in scenarios:
+                if name == "login_storm":
+                    results[name] = await _run_login_storm(clients, args.iterations, args.concurrency, args.storm_concurrency)
+                    print(f"{name:18} {json.dumps(results[name])}", file=sys.stderr)
+                    continue
+                if name == "download_concurrent":
+                    results[name] = await _run_concurrent_downloads(
+                        app, clients, args.iterations, args.download_concurrency
+                    )
+                    print(f"{name:18} {json.dumps(results[name])}", file=sys.stderr)
+                    continue
+                run = _scenario(name, clients)
+                # Warm up caches and connection pools before measuring
+                for _ in range(min(args.concurrency, 5)):
+                    if name != "complete_task":
+                        await run()
+                results[name] = await _run_scenario(run, args.iterations, args.concurrency)
+                print(f"{name:18} {json.dumps(results[name])}", file=sys.stderr)
+    await engine.dispose()
+
+    return {
+        "created": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+        },
+        "options": {
+            key: getattr(args, key)
+            for key in [
+                "users", "files_per_user", "requests_per_user", "approvers_per_request", "iterations", "concurrency",
+                "storm_concurrency", "inline_password_hashing", "no_principal_cache",
+                "download_concurrency",
+            ]
+        },
+        "principal_cache": principal_cache.stats(),
+        "scenarios": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every scenario that regressed beyond ``tolerance``."""
+    regressions = []
+    if baseline.get("options") != results["options"]:
+        print("Warning: baseline was recorded with different options", file=sys.stderr)
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+        if current.get("pool_checkout_timeouts", 0) > previous.get("pool_checkout_timeouts", 0):
+            regressions.append(
+                f"{name}: pool checkout timeouts {previous.get('pool_checkout_timeouts', 0)} -> {current['pool_checkout_timeouts']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process against a seeded scratch database")
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--files-per-user", type=int, default=20)
+    parser.add_argument("--requests-per-user", type=int, default=20)
+    parser.add_argument("--approvers-per-request", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--storm-concurrency", type=int, default=50)
+    parser.add_argument("--inline-password-hashing", action="store_true")
+    parser.add_argument("--no-principal-cache", action="store_true")
+    parser.add_argument("--download-concurrency", type=int, default=100)
+    parser.add_argument("--scenarios", help=f"comma separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    scratch_dir = tempfile.mkdtemp(prefix="click2approve-benchmark-")
+    if args.database_url is None:
+        args.database_url = f"sqlite+aiosqlite:///{os.path.join(scratch_dir, 'benchmark.db')}"
+        # SQLite only autoincrements INTEGER primary keys, not BIGINT ones
+        from sqlalchemy import BigInteger
+        from sqlalchemy.ext.compiler import compiles
+
+        compiles(BigInteger, "sqlite")(lambda element, compiler, **kw: "INTEGER")
+    # Settings are read at import time, so configure them before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("FILE_STORAGE_ROOT_PATH", os.path.join(scratch_dir, "files"))
+    for limit in ["MAX_FILE_COUNT", "MAX_APPROVAL_REQUEST_COUNT"]:
+        os.environ[limit] = "0"
+    os.environ["EMAIL_SERVICE_ENABLED"] = "false"
+    # Repeated list requests would otherwise be served by the response cache and never reach SQL
+    os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+    os.environ["PRINCIPAL_CACHE_ENABLED"] = "false" if args.no_principal_cache else "true"
+
+    try:
+        results = asyncio.run(benchmark(args))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    if results is None:
+        sys.exit(2)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(output + "\n")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
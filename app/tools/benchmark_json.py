@@ -0,0 +1,131 @@
+"""Microbenchmark of the JSON response renderers on ApprovalRequestResponse lists.
+
+Usage:
+    python -m app.tools.benchmark_json [--sizes 10,100,1000,10000] [--repeat N]
+
+Lists of requests, each with two files and three tasks, go through the
+steps FastAPI takes for an endpoint with a ``response_model``: validating
+the returned value, from plain dicts as the read model builds them or from
+objects through ``from_attributes``, then converting it to JSON-compatible
+data, then rendering. The ``encoder`` row converts with
+``jsonable_encoder`` as routes without a response model do. Every
+renderer is checked to produce the same bytes as ``JSONResponse``. Times
+are microseconds per list, best of ``--repeat``.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+import argparse
+import sys
+import timeit
+
+
+def _requests(count: int) -> List[Dict[str, Any]]:
+    from app.models.approval_request import ApprovalStatus
+
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    return [
+        {
+            "id": i,
+            "submitted": now - timedelta(minutes=i),
+            "author": "AUTHOR@EXAMPLE.COM",
+            "status": ApprovalStatus(i % 3),
+            "user_files": [
+                {"id": i * 2 + k, "name": f"Contract ü {i}-{k}.pdf", "type": ".pdf", "size": 1000 + k,
+                 "created": now - timedelta(minutes=i, seconds=k)}
+                for k in range(2)
+            ],
+            "approvers": [f"APPROVER{k}@EXAMPLE.COM" for k in range(3)],
+            "approve_by": now + timedelta(days=7) if i % 2 else None,
+            "comment": "Please review \"section 4\"" if i % 2 else None,
+            "tasks": [
+                {"id": i * 3 + k, "approver": f"APPROVER{k}@EXAMPLE.COM", "status": ApprovalStatus(k % 3),
+                 "completed": now if k else None, "comment": None}
+                for k in range(3)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def _as_objects(request: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(**{
+        **request,
+        "user_files": [SimpleNamespace(**f) for f in request["user_files"]],
+        "tasks": [SimpleNamespace(**t) for t in request["tasks"]],
+    })
+
+
+def _best(function: Callable[[], Any], repeat: int) -> float:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def benchmark(sizes: List[int], repeat: int) -> int:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from starlette.responses import JSONResponse
+
+    from app.core.responses import ORJSONResponse
+    from app.schemas.approval_request import ApprovalRequestResponse
+
+    adapter = TypeAdapter(List[ApprovalRequestResponse])
+    renderers = [("json", JSONResponse), ("orjson", ORJSONResponse)]
+    mismatches = 0
+
+    print(f"{'size':>6} {'step':28} " + " ".join(f"{name:>12}" for name, _ in renderers))
+    for size in sizes:
+        dicts = _requests(size)
+        objects = [_as_objects(request) for request in dicts]
+        models = adapter.validate_python(dicts)
+        content = adapter.dump_python(models, mode="json")
+        encoded = jsonable_encoder(models)
+
+        expected = JSONResponse.render(None, content)
+        for name, response_class in renderers:
+            for data in (content, encoded):
+                if response_class.render(None, data) != expected:
+                    print(f"{name} output differs from JSONResponse at size {size}")
+                    mismatches += 1
+
+        rows = [
+            ("validate dicts", lambda: adapter.validate_python(dicts), None),
+            ("validate from_attributes", lambda: adapter.validate_python(objects, from_attributes=True), None),
+            ("dump_python(mode=json)", lambda: adapter.dump_python(models, mode="json"), None),
+            ("jsonable_encoder", lambda: jsonable_encoder(models), None),
+            ("render", None, content),
+            ("end to end: dicts", None, "dicts"),
+        ]
+        for step, function, data in rows:
+            if function is not None:
+                timing = f"{_best(function, repeat):12.0f}"
+                print(f"{size:>6} {step:28} {timing}")
+                continue
+            timings = []
+            for _, response_class in renderers:
+                if data == "dicts":
+                    def run(response_class=response_class):
+                        return response_class.render(
+                            None, adapter.dump_python(adapter.validate_python(dicts), mode="json")
+                        )
+                else:
+                    def run(response_class=response_class):
+                        return response_class.render(None, content)
+                timings.append(_best(run, repeat))
+            print(f"{size:>6} {step:28} " + " ".join(f"{timing:12.0f}" for timing in timings))
+
+    print("outputs identical" if not mismatches else f"{mismatches} mismatching outputs")
+    return 1 if mismatches else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON rendering of ApprovalRequestResponse lists")
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(benchmark([int(size) for size in args.sizes.split(",")], args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Compare the ORM and projection read paths of the list endpoints.
+
+Usage:
+    python -m app.tools.benchmark_read_models [--database-url URL] [--rows 1000,10000,100000] [--repeat N]
+
+The tool seeds a scratch database with one author whose requests each have a
+file and two tasks, then lists N requests and N tasks both ways: hydrating
+ORM objects with ``selectinload`` as the endpoints used to, and through
+``ApprovalRequestReadModel``. Each run includes building and serializing the
+response. It reports milliseconds per request (best of ``--repeat``), the
+GC-tracked objects alive once the response is built, and peak traced memory.
+Without ``--database-url`` it uses a temporary SQLite file (requires
+``aiosqlite``). Never point it at a database that holds real data.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Tuple
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+AUTHOR = "AUTHOR@EXAMPLE.COM"
+APPROVERS = ["APPROVER1@EXAMPLE.COM", "APPROVER2@EXAMPLE.COM"]
+INSERT_BATCH_SIZE = 10000
+
+
+async def _seed(conn, rows: int):
+    from sqlalchemy import insert
+
+    from app.models.approval_request import ApprovalRequest, ApprovalStatus
+    from app.models.approval_request_task import ApprovalRequestTask
+    from app.models.user import User
+    from app.models.user_file import UserFile, approval_request_files
+
+    now = datetime.utcnow()
+    await conn.execute(insert(User), [
+        {"id": f"user-{i}", "email": email.lower(), "normalized_email": email, "password_hash": "x",
+         "email_confirmed": True, "lockout_enabled": True, "access_failed_count": 0, "created_at": now}
+        for i, email in enumerate([AUTHOR] + APPROVERS)
+    ])
+    for start in range(1, rows + 1, INSERT_BATCH_SIZE):
+        ids = range(start, min(start + INSERT_BATCH_SIZE, rows + 1))
+        await conn.execute(insert(UserFile), [
+            {"id": i, "name": f"document-{i}.pdf", "type": ".pdf", "size": 1000 + i,
+             "created": now - timedelta(seconds=i), "owner_id": "user-0"}
+            for i in ids
+        ])
+        await conn.execute(insert(ApprovalRequest), [
+            {"id": i, "submitted": now - timedelta(seconds=i), "author": AUTHOR, "author_id": "user-0",
+             "status": ApprovalStatus.SUBMITTED, "comment": f"Request {i}"}
+            for i in ids
+        ])
+        await conn.execute(insert(approval_request_files), [
+            {"approval_request_id": i, "user_file_id": i} for i in ids
+        ])
+        await conn.execute(insert(ApprovalRequestTask), [
+            {"id": i * len(APPROVERS) + k, "approval_request_id": i, "approver": approver,
+             "approver_id": f"user-{k + 1}", "status": ApprovalStatus.SUBMITTED}
+            for i in ids for k, approver in enumerate(APPROVERS)
+        ])
+
+
+def _orm_paths(db, limit: int):
+    """The list endpoints as they were before the read model."""
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+
+    from app.models.approval_request import ApprovalRequest, ApprovalStatus
+    from app.models.approval_request_task import ApprovalRequestTask
+    from app.schemas.approval_request import ApprovalRequestResponse, ApprovalRequestTaskResponse
+
+    requests_adapter = TypeAdapter(List[ApprovalRequestResponse])
+    tasks_adapter = TypeAdapter(List[ApprovalRequestTaskResponse])
+
+    async def list_requests():
+        result = await db.execute(
+            select(ApprovalRequest)
+            .options(selectinload(ApprovalRequest.user_files), selectinload(ApprovalRequest.tasks))
+            .where(ApprovalRequest.author == AUTHOR)
+            .order_by(ApprovalRequest.id.desc())
+            .limit(limit + 1)
+        )
+        requests = result.scalars().all()[:limit]
+        response = [
+            ApprovalRequestResponse(
+                id=req.id, submitted=req.submitted, author=req.author, status=req.status,
+                user_files=req.user_files, approvers=[task.approver for task in req.tasks],
+                approve_by=req.approve_by, comment=req.comment, tasks=req.tasks
+            )
+            for req in requests
+        ]
+        return (requests, response), requests_adapter.dump_json(response)
+
+    async def list_tasks():
+        result = await db.execute(
+            select(ApprovalRequestTask)
+            .where(ApprovalRequestTask.approver == APPROVERS[0])
+            .where(ApprovalRequestTask.status.in_([ApprovalStatus.SUBMITTED]))
+            .order_by(ApprovalRequestTask.id.desc())
+            .limit(limit + 1)
+        )
+        tasks = result.scalars().all()[:limit]
+        return tasks, tasks_adapter.dump_json(tasks)
+
+    return list_requests, list_tasks
+
+
+def _projection_paths(db, limit: int):
+    from pydantic import TypeAdapter
+
+    from app.models.approval_request import ApprovalStatus
+    from app.models.user import User
+    from app.schemas.approval_request import ApprovalRequestResponse, ApprovalRequestTaskResponse
+    from app.services.approval_request_read_model import ApprovalRequestReadModel
+
+    requests_adapter = TypeAdapter(List[ApprovalRequestResponse])
+    tasks_adapter = TypeAdapter(List[ApprovalRequestTaskResponse])
+    read_model = ApprovalRequestReadModel(db)
+
+    async def list_requests():
+        requests, _ = await read_model.list_approval_requests(User(normalized_email=AUTHOR), limit=limit)
+        response = requests_adapter.validate_python(requests)
+        return (requests, response), requests_adapter.dump_json(response)
+
+    async def list_tasks():
+        tasks, _ = await read_model.list_tasks(User(normalized_email=APPROVERS[0]), [ApprovalStatus.SUBMITTED], limit=limit)
+        return tasks, tasks_adapter.dump_json(tasks_adapter.validate_python(tasks))
+
+    return list_requests, list_tasks
+
+
+async def _measure(session_factory, build_path: Callable, limit: int, index: int, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            path: Callable[[], Awaitable[Tuple[Any, bytes]]] = build_path(db, limit)[index]
+            gc.collect()
+            started = time.perf_counter()
+            await path()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    # Memory is measured on a separate run so tracing does not skew the timings
+    async with session_factory() as db:
+        path = build_path(db, limit)[index]
+        gc.collect()
+        objects_before = len(gc.get_objects())
+        tracemalloc.start()
+        # The rows and response objects are still referenced while counting
+        built, body = await path()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        objects = len(gc.get_objects()) - objects_before
+        del built
+    return min(timings), objects, peak, len(body)
+
+
+async def benchmark(sizes: List[int], repeat: int) -> int:
+    from sqlalchemy import func, select
+
+    from app.core.database import AsyncSessionLocal, engine, Base
+    import app.models  # registers every model on Base.metadata
+    from app.models.user import User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if await conn.scalar(select(func.count()).select_from(User)):
+            print("Refusing to seed a database that already has users; point --database-url at an empty one")
+            return 2
+        print(f"Seeding {max(sizes)} requests...")
+        await _seed(conn, max(sizes))
+
+    print(f"{'endpoint':10} {'rows':>7} {'path':11} {'ms':>9} {'objects':>9} {'peak KiB':>9} {'bytes':>10}")
+    for size in sizes:
+        for index, endpoint in enumerate(["requests", "tasks"]):
+            for name, build_path in [("orm", _orm_paths), ("projection", _projection_paths)]:
+                ms, objects, peak, length = await _measure(AsyncSessionLocal, build_path, size, index, repeat)
+                print(f"{endpoint:10} {size:>7} {name:11} {ms:>9.1f} {objects:>9} {peak // 1024:>9} {length:>10}")
+    await engine.dispose()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM and projection list queries on a seeded scratch database")
+    parser.add_argument("--database-url")
+    parser.add_argument("--rows", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(",")]
+
+    scratch = None
+    if args.database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.database_url = f"sqlite+aiosqlite:///{scratch.name}"
+    # Settings are read at import time, so point them at the scratch database first
+    os.environ["DATABASE_URL"] = args.database_url
+    try:
+        status = asyncio.run(benchmark(sizes, args.repeat))
+    finally:
+        if scratch is not None:
+            os.remove(scratch.name)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
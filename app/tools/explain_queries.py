@@ -0,0 +1,235 @@
+"""EXPLAIN every query the services issue and fail if any of them scans a whole table.
+
+Usage:
+    python -m app.tools.explain_queries [--database-url URL] [--users N]
+
+The tool seeds a scratch database, drives the read paths of the services and
+the deadline scans (with expiry enabled) while recording the SQL they emit,
+and runs EXPLAIN on each statement. It exits with
+status 1 when a plan reads every row of a table: ``type`` ALL/index on MySQL,
+``SCAN`` on SQLite. Without ``--database-url`` it uses a temporary SQLite file
+(requires ``aiosqlite``); pass the URL of an empty MySQL schema to check the
+production planner. Never point it at a database that holds real data.
+"""
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+SEED_FILES_PER_USER = 20
+SEED_REQUESTS_PER_USER = 10
+SEED_APPROVERS_PER_REQUEST = 3
+# Deadlines of pending requests by index: one per user is due for a reminder, one for expiry
+SEED_DEADLINE_HOURS = {1: 48, 3: 24, 5: 2, 7: -0.5, 9: -3}
+
+
+def _seed_rows(users: int):
+    now = datetime.utcnow()
+    emails = [f"USER{i}@EXAMPLE.COM" for i in range(users)]
+    user_rows = [
+        {"id": f"user-{i}", "email": emails[i].lower(), "normalized_email": emails[i], "password_hash": "x",
+         "email_confirmed": True, "lockout_enabled": True, "access_failed_count": 0, "created_at": now}
+        for i in range(users)
+    ]
+    file_rows, request_rows, task_rows, link_rows, audit_rows = [], [], [], [], []
+    for i in range(users):
+        for j in range(SEED_FILES_PER_USER):
+            file_rows.append({
+                "id": len(file_rows) + 1, "name": f"document-{i}-{j}.pdf", "type": ".pdf", "size": 1000 + j,
+                "created": now - timedelta(minutes=j), "owner_id": f"user-{i}",
+            })
+        for j in range(SEED_REQUESTS_PER_USER):
+            request_id = len(request_rows) + 1
+            request_rows.append({
+                "id": request_id, "submitted": now - timedelta(hours=j), "author": emails[i],
+                "author_id": f"user-{i}", "status": "SUBMITTED" if j % 2 else "APPROVED",
+                "approve_by": now + timedelta(hours=SEED_DEADLINE_HOURS[j]) if j in SEED_DEADLINE_HOURS else None,
+            })
+            file_id = i * SEED_FILES_PER_USER + j + 1
+            link_rows.append({"approval_request_id": request_id, "user_file_id": file_id})
+            for k in range(1, SEED_APPROVERS_PER_REQUEST + 1):
+                approver = (i + k) % users
+                done = j % 2 == 0
+                task_rows.append({
+                    "id": len(task_rows) + 1, "approval_request_id": request_id, "approver": emails[approver],
+                    "approver_id": f"user-{approver}", "status": "APPROVED" if done else "SUBMITTED",
+                    "completed": now if done else None,
+                })
+    for row in file_rows + request_rows:
+        audit_rows.append({
+            "id": len(audit_rows) + 1, "who": emails[len(audit_rows) % users],
+            "when": now - timedelta(minutes=len(audit_rows)), "what": "Seeded", "data": "",
+        })
+    return user_rows, file_rows, request_rows, task_rows, link_rows, audit_rows
+
+
+async def _drive_services(db, email: str):
+    """Run the read paths whose SQL should be checked."""
+    from app.core.exceptions import AppException
+    from app.models.approval_request import ApprovalStatus
+    from app.services.approval_request_read_model import ApprovalRequestReadModel
+    from app.services.approval_request_service import ApprovalRequestService
+    from app.services.audit_log_archive import AuditLogArchiveService
+    from app.services.counter_service import CounterService
+    from app.services.deadline_service import DeadlineService
+    from app.services.email_dispatcher import EmailDispatcher
+    from app.services.user_file_service import UserFileService
+    from app.services.user_service import UserService
+
+    users = UserService(db)
+    user = await users.get_by_email(email)
+    await users.get_by_id(user.id)
+
+    since = datetime.utcnow() - timedelta(days=1)
+    files = UserFileService(db)
+    _, cursor = await files.list_files(user, limit=5)
+    await files.list_files(user, cursor=cursor, limit=5)
+    await files.list_files(user, name="document", created_from=since, limit=5)
+    await files.list_files(user)
+    try:
+        first_file = (await files.list_files(user, limit=1))[0][0]
+        await files.get_download(user, first_file.id)
+    except AppException:
+        pass  # Nothing is on disk, only the lookups matter
+
+    requests = ApprovalRequestReadModel(db)
+    _, cursor = await requests.list_approval_requests(user, limit=3)
+    await requests.list_approval_requests(user, cursor=cursor, limit=3)
+    await requests.list_approval_requests(
+        user, statuses=[ApprovalStatus.SUBMITTED], submitted_from=since, file_name="document", limit=3
+    )
+    await requests.list_approval_requests(user)
+
+    pending = [ApprovalStatus.SUBMITTED]
+    completed = [ApprovalStatus.APPROVED, ApprovalStatus.REJECTED]
+    _, cursor = await requests.list_tasks(user, pending, limit=3)
+    await requests.list_tasks(user, pending, cursor=cursor, limit=3)
+    await requests.list_tasks(user, pending, author="user0@example.com", date_from=since, limit=3)
+    await requests.list_tasks(user, completed, date_from=since, limit=3)
+    await requests.list_tasks(user, completed)
+
+    # First read seeds the counters row through the COUNT(*) fallback, the second hits it
+    await CounterService(db)._count(email)
+    await ApprovalRequestService(db).count_uncompleted_tasks(user)
+
+    audit = AuditLogArchiveService(db)
+    _, cursor = await audit.query(email, limit=5)
+    await audit.query(email, since=since, cursor=cursor, limit=5)
+
+    await EmailDispatcher().dispatch_batch()
+
+    deadlines = DeadlineService(db)
+    now = datetime.utcnow()
+    await deadlines.expire_overdue(now)
+    await deadlines.send_reminders(now)
+
+
+def _full_scans(dialect: str, plan: List[Tuple], tables: set) -> List[str]:
+    scans = []
+    for row in plan:
+        if dialect == "sqlite":
+            detail = row[-1]
+            words = detail.split()
+            if words[0] == "SCAN" and words[1] in tables:
+                scans.append(detail)
+        else:
+            row = row._mapping
+            if row["table"] in tables and row["type"] in ("ALL", "index"):
+                scans.append(f"{row['table']}: type={row['type']} key={row['key']}")
+    return scans
+
+
+async def explain(users: int) -> int:
+    from sqlalchemy import event, func, insert, select, text
+
+    from app.core.database import AsyncSessionLocal, engine, Base
+    import app.models  # registers every model on Base.metadata
+    from app.models.approval_request import ApprovalRequest
+    from app.models.approval_request_task import ApprovalRequestTask
+    from app.models.audit_log import AuditLogEntry
+    from app.models.user import User
+    from app.models.user_file import UserFile, approval_request_files
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if await conn.scalar(select(func.count()).select_from(User)):
+            print("Refusing to seed a database that already has users; point --database-url at an empty one")
+            return 2
+
+        user_rows, file_rows, request_rows, task_rows, link_rows, audit_rows = _seed_rows(users)
+        await conn.execute(insert(User), user_rows)
+        await conn.execute(insert(UserFile), file_rows)
+        await conn.execute(insert(ApprovalRequest), request_rows)
+        await conn.execute(insert(ApprovalRequestTask), task_rows)
+        await conn.execute(insert(approval_request_files), link_rows)
+        await conn.execute(insert(AuditLogEntry), audit_rows)
+
+    dialect = engine.dialect.name
+    tables = set(Base.metadata.tables)
+    async with engine.begin() as conn:
+        if dialect == "sqlite":
+            await conn.execute(text("ANALYZE"))
+        elif dialect == "mysql":
+            await conn.execute(text(f"ANALYZE TABLE {', '.join(tables)}"))
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and (statement, parameters) not in statements:
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with AsyncSessionLocal() as db:
+            await _drive_services(db, user_rows[len(user_rows) // 2]["normalized_email"])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    failures = 0
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(prefix + statement, parameters)
+            scans = _full_scans(dialect, result.all(), tables)
+            summary = " ".join(statement.split())
+            print(f"{'FULL SCAN' if scans else 'ok':9}  {summary[:150]}")
+            for scan in scans:
+                print(f"           {scan}")
+            failures += bool(scans)
+
+    print(f"{len(statements)} queries explained on {dialect}, {failures} with full scans")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN service queries against a seeded scratch database")
+    parser.add_argument("--database-url")
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url is None:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.database_url = f"sqlite+aiosqlite:///{scratch.name}"
+        # SQLite only autoincrements INTEGER primary keys, not BIGINT ones
+        from sqlalchemy import BigInteger
+        from sqlalchemy.ext.compiler import compiles
+
+        compiles(BigInteger, "sqlite")(lambda element, compiler, **kw: "INTEGER")
+    # Settings are read at import time, so point them at the scratch database first
+    os.environ["DATABASE_URL"] = args.database_url
+    # Expiry is off by default, enable it so its queries are checked too
+    os.environ["DEADLINE_AUTO_EXPIRE_AFTER_MINUTES"] = "60"
+    try:
+        status = asyncio.run(explain(args.users))
+    finally:
+        if scratch is not None:
+            os.remove(scratch.name)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
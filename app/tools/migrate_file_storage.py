@@ -0,0 +1,127 @@
+"""Convert an existing legacy storage root to the content-addressed layout in place.
+
+Usage:
+    python -m app.tools.migrate_file_storage [--dry-run] [--batch-size N]
+
+Run it with the API stopped, then set ``FILE_STORAGE_BACKEND=cas``. The tool
+is safe to re-run after an interruption: digests are committed before any
+file is moved, and blob reference counts are rebuilt from ``user_files`` at
+the end.
+"""
+from typing import Optional
+import argparse
+import asyncio
+import hashlib
+import os
+
+from sqlalchemy import select, delete, func
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine, Base
+import app.models  # registers every model on Base.metadata
+from app.models.file_blob import FileBlob
+from app.models.user_file import UserFile
+from app.services.file_storage import blob_path, legacy_path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _hash_file(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _move_to_blob(user_file: UserFile, dry_run: bool, seen: set) -> int:
+    """Move one legacy file into its blob; return the bytes reclaimed by deduplication."""
+    source = legacy_path(user_file)
+    if not os.path.exists(source):
+        return 0
+    target = blob_path(user_file.sha256)
+    if dry_run:
+        duplicate = user_file.sha256 in seen or os.path.exists(target)
+        seen.add(user_file.sha256)
+        return user_file.size if duplicate else 0
+    if os.path.exists(target):
+        os.remove(source)
+        reclaimed = user_file.size
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        reclaimed = 0
+    for directory in (os.path.dirname(source), os.path.dirname(os.path.dirname(source))):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+    return reclaimed
+
+
+async def migrate(batch_size: int, dry_run: bool):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    migrated = missing = reclaimed = 0
+    last_id = 0
+    seen = set()
+    loop = asyncio.get_running_loop()
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(UserFile).where(UserFile.id > last_id).order_by(UserFile.id).limit(batch_size)
+            )
+            user_files = result.scalars().all()
+            if not user_files:
+                break
+            last_id = user_files[-1].id
+
+            # Record digests first so an interrupted run never loses track of a moved file
+            for user_file in user_files:
+                if not user_file.sha256:
+                    user_file.sha256 = await loop.run_in_executor(None, _hash_file, legacy_path(user_file))
+                    if user_file.sha256 is None:
+                        missing += 1
+                        print(f"Missing on disk: file {user_file.id} ({legacy_path(user_file)})")
+            if not dry_run:
+                await db.commit()
+
+            for user_file in user_files:
+                if user_file.sha256:
+                    reclaimed += await loop.run_in_executor(None, _move_to_blob, user_file, dry_run, seen)
+                    migrated += 1
+
+    if not dry_run:
+        async with AsyncSessionLocal() as db:
+            # Rebuild reference counts from scratch so re-runs stay consistent
+            await db.execute(delete(FileBlob))
+            result = await db.execute(
+                select(UserFile.sha256, func.max(UserFile.size), func.count())
+                .where(UserFile.sha256.isnot(None))
+                .group_by(UserFile.sha256)
+            )
+            for sha256, size, ref_count in result.all():
+                if os.path.exists(blob_path(sha256)):
+                    db.add(FileBlob(sha256=sha256, size=size, ref_count=ref_count))
+            await db.commit()
+
+    print(
+        f"{'Would migrate' if dry_run else 'Migrated'} {migrated} files under {settings.FILE_STORAGE_ROOT_PATH}, "
+        f"{missing} missing on disk, {reclaimed} bytes reclaimed by deduplication"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy file storage to content-addressed blobs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
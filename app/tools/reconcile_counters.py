@@ -0,0 +1,30 @@
+"""Recompute the per-user counters in ``user_stats`` and fix any that drifted.
+
+Usage:
+    python -m app.tools.reconcile_counters
+
+The API runs the same job every ``COUNTERS_RECONCILE_INTERVAL_SECONDS``; this
+entry point is for one-off repairs, e.g. after editing rows by hand.
+"""
+import asyncio
+
+from app.core.database import AsyncSessionLocal, engine, Base
+import app.models  # registers every model on Base.metadata
+from app.services.counter_service import CounterService
+
+
+async def reconcile():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        corrected = await CounterService(db).reconcile()
+    print(f"Reconciled counters, {corrected} users corrected")
+
+
+def main():
+    asyncio.run(reconcile())
+
+
+if __name__ == "__main__":
+    main()
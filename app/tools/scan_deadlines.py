@@ -0,0 +1,32 @@
+"""Expire overdue approval requests and queue reminder digests once.
+
+Usage:
+    python -m app.tools.scan_deadlines
+
+The API runs the same scan every ``DEADLINE_SCAN_INTERVAL_SECONDS`` when
+``DEADLINE_SCHEDULER=asyncio``; this entry point suits cron, or a one-off run
+after changing deadlines by hand.
+"""
+import asyncio
+
+from app.core.database import AsyncSessionLocal, engine, Base
+import app.models  # registers every model on Base.metadata
+from app.services.deadline_service import DeadlineService
+
+
+async def scan():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        counts = await DeadlineService(db).run()
+    await engine.dispose()
+    print(f"Scanned deadlines, {counts['expired']} requests expired, {counts['reminded']} reminder digests queued")
+
+
+def main():
+    asyncio.run(scan())
+
+
+if __name__ == "__main__":
+    main()
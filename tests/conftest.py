@@ -0,0 +1,36 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so point them at scratch storage before the app is imported
+_scratch = tempfile.mkdtemp(prefix="click2approve-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_scratch, 'app.db')}"
+os.environ["FILE_STORAGE_ROOT_PATH"] = os.path.join(_scratch, "files")
+os.environ["AUDIT_LOG_MODE"] = "transactional"
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+
+# SQLite only autoincrements INTEGER primary keys, not BIGINT ones
+@compiles(BigInteger, "sqlite")
+def _bigint_as_integer(element, compiler, **kw):
+    return "INTEGER"
+
+
+@pytest.fixture
+def database():
+    """Fresh tables in the scratch SQLite database for each test."""
+    from app.core.database import Base, engine
+    import app.models  # registers every model on Base.metadata
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(reset())
+    return os.path.join(_scratch, "app.db")
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.audit_log import AuditLogEntry
+from app.services.audit_log_archive import AuditLogArchiveService, archived_months
+
+ACTOR = "AUTHOR@EXAMPLE.COM"
+
+
+@pytest.fixture
+def archive_root(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_STORAGE_ROOT_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "AUDIT_LOG_LIVE_MONTHS", 3)
+    return tmp_path / "audit"
+
+
+async def _seed():
+    """Entries every 5 days over the last 8 months for two actors; return the actor's (when, id), newest first."""
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = [
+        {"who": who, "when": now - timedelta(days=days, minutes=i), "what": "Uploaded user file", "data": f"#{days}"}
+        for days in range(0, 240, 5) for i, who in enumerate([ACTOR, "APPROVER@EXAMPLE.COM"])
+    ]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(AuditLogEntry).values(rows))
+        await db.commit()
+        result = await db.execute(
+            select(AuditLogEntry.when, AuditLogEntry.id)
+            .where(AuditLogEntry.who == ACTOR)
+            .order_by(AuditLogEntry.when.desc(), AuditLogEntry.id.desc())
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def _pages(who, limit, **filters):
+    keys, cursor = [], None
+    async with AsyncSessionLocal() as db:
+        service = AuditLogArchiveService(db)
+        while True:
+            entries, cursor = await service.query(who, cursor=cursor, limit=limit, **filters)
+            assert len(entries) <= limit
+            keys.extend((entry.when, entry.id) for entry in entries)
+            if cursor is None:
+                return keys
+
+
+def test_archived_months_are_paged_together_with_live_entries(archive_root):
+    async def scenario():
+        expected = await _seed()
+        async with AsyncSessionLocal() as db:
+            months = await AuditLogArchiveService(db).archive()
+            live = await db.scalar(select(func.count()).select_from(AuditLogEntry))
+        pages = await _pages(ACTOR, 7)
+        since = expected[len(expected) // 2][0]
+        since_pages = await _pages(ACTOR, 4, since=since)
+        await engine.dispose()
+        return expected, months, live, pages, since, since_pages
+
+    expected, months, live, pages, since, since_pages = asyncio.run(scenario())
+    assert len(months) >= 5
+    assert months == archived_months()
+    assert not [name for name in os.listdir(archive_root) if name.endswith(".tmp")]
+    assert live < 2 * len(expected)
+    assert pages == expected
+    assert since_pages == [key for key in expected if key[0] >= since]
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+import asyncio
+import uuid
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.exceptions import AppException
+from app.models.approval_request import ApprovalRequest, ApprovalStatus
+from app.models.approval_request_task import ApprovalRequestTask
+from app.models.user import User
+from app.models.user_stats import UserStats
+from app.schemas.approval_request import ApprovalRequestTaskComplete
+from app.services.approval_request_service import ApprovalRequestService
+from app.services.counter_service import CounterService
+
+
+async def _user(db, name: str) -> User:
+    email = f"{name}-{uuid.uuid4().hex[:8]}@example.com"
+    user = User(id=str(uuid.uuid4()), email=email, normalized_email=email.upper(), password_hash="x")
+    db.add(user)
+    return user
+
+
+async def _seed(approvers: int = 2):
+    """One pending request with a task per approver, and seeded counter rows for everyone."""
+    async with AsyncSessionLocal() as db:
+        author = await _user(db, "author")
+        users = [await _user(db, f"approver{i}") for i in range(approvers)]
+        approval_request = ApprovalRequest(
+            author=author.normalized_email, author_id=author.id, approve_by=datetime.utcnow() - timedelta(days=1)
+        )
+        approval_request.tasks = [
+            ApprovalRequestTask(approver=user.normalized_email, approver_id=user.id, status=ApprovalStatus.SUBMITTED)
+            for user in users
+        ]
+        db.add(approval_request)
+        await db.commit()
+        for user in [author, *users]:
+            await CounterService(db).get(user.normalized_email)
+        await db.commit()
+        return author, users, approval_request.id, [task.id for task in approval_request.tasks]
+
+
+async def _drift():
+    """Counter rows that disagree with a fresh count."""
+    async with AsyncSessionLocal() as db:
+        counters = CounterService(db)
+        rows = (await db.execute(select(UserStats))).scalars().all()
+        drift = {}
+        for stats in rows:
+            expected = await counters._count(stats.normalized_email)
+            actual = {field: getattr(stats, field) for field in expected}
+            if actual != expected:
+                drift[stats.normalized_email] = (actual, expected)
+        return drift
+
+
+async def _attempt(call) -> bool:
+    async with AsyncSessionLocal() as db:
+        try:
+            await call(ApprovalRequestService(db))
+        except AppException:
+            return False
+        return True
+
+
+def test_concurrent_completions_of_a_task_apply_once(database):
+    async def scenario():
+        _, (approver, _), _, (task_id, _) = await _seed()
+        payload = ApprovalRequestTaskComplete(id=task_id, status=ApprovalStatus.APPROVED)
+        outcomes = await asyncio.gather(*[
+            _attempt(lambda service: service.complete_task(approver, payload)) for _ in range(2)
+        ])
+        drift = await _drift()
+        await engine.dispose()
+        return outcomes, drift
+
+    outcomes, drift = asyncio.run(scenario())
+    assert sorted(outcomes) == [False, True]
+    assert drift == {}
+
+
+def test_expiry_keeps_an_approval_committed_after_its_scan_started(database):
+    from sqlalchemy.orm import selectinload
+
+    from app.services.deadline_service import DeadlineService
+
+    async def scenario():
+        _, (first, second), request_id, (first_task, second_task) = await _seed()
+        async with AsyncSessionLocal() as scan:
+            # The scan's session already holds the request and its tasks, both pending
+            held = (await scan.execute(
+                select(ApprovalRequest).options(selectinload(ApprovalRequest.tasks)).where(ApprovalRequest.id == request_id)
+            )).scalar_one()
+            payload = ApprovalRequestTaskComplete(id=first_task, status=ApprovalStatus.APPROVED)
+            assert await _attempt(lambda service: service.complete_task(first, payload))
+
+            now = datetime.utcnow()
+            expired = await DeadlineService(scan)._expire({request_id: now - timedelta(days=1)}, now, timedelta(0))
+            assert {task.id: task.status for task in held.tasks}[first_task] == ApprovalStatus.APPROVED
+
+        async with AsyncSessionLocal() as db:
+            statuses = dict((await db.execute(
+                select(ApprovalRequestTask.id, ApprovalRequestTask.status)
+                .where(ApprovalRequestTask.approval_request_id == request_id)
+            )).all())
+        drift = await _drift()
+        await engine.dispose()
+        return expired, statuses, drift
+
+    expired, statuses, drift = asyncio.run(scenario())
+    first_task, second_task = sorted(statuses)
+    assert expired == 1
+    assert statuses == {first_task: ApprovalStatus.APPROVED, second_task: ApprovalStatus.REJECTED}
+    assert drift == {}
+
+
+def test_concurrent_deletions_of_a_request_apply_once(database):
+    async def scenario():
+        author, _, request_id, _ = await _seed()
+        outcomes = await asyncio.gather(*[
+            _attempt(lambda service: service.delete_approval_request(author, request_id)) for _ in range(2)
+        ])
+        drift = await _drift()
+        await engine.dispose()
+        return outcomes, drift
+
+    outcomes, drift = asyncio.run(scenario())
+    assert sorted(outcomes) == [False, True]
+    assert drift == {}
+
+
+def test_deletion_racing_a_completion_keeps_counters_exact(database):
+    async def scenario():
+        author, (approver, _), request_id, (task_id, _) = await _seed()
+        payload = ApprovalRequestTaskComplete(id=task_id, status=ApprovalStatus.APPROVED)
+        await asyncio.gather(
+            _attempt(lambda service: service.complete_task(approver, payload)),
+            _attempt(lambda service: service.delete_approval_request(author, request_id))
+        )
+        async with AsyncSessionLocal() as db:
+            remaining = (await db.execute(
+                select(ApprovalRequest.id).where(ApprovalRequest.id == request_id)
+            )).scalar_one_or_none()
+        drift = await _drift()
+        await engine.dispose()
+        return remaining, drift
+
+    remaining, drift = asyncio.run(scenario())
+    assert remaining is None
+    assert drift == {}
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+import asyncio
+import json
+import socket
+import sqlite3
+import ssl
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.email_outbox import EmailOutboxMessage
+from app.services.email_dispatcher import EmailDispatcher
+from app.services.email_service import EmailService
+from app.services.smtp_pool import smtp_pool
+
+
+class Mailbox:
+    """aiosmtpd handler that records deliveries and refuses recipients listed in ``refuse``."""
+
+    def __init__(self, database: str):
+        self.database = database
+        self.delivered = []
+        self.refuse = set()
+        self.leased_during_send = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refuse:
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        # The claim must be committed before SMTP starts, so another connection sees the lease
+        with sqlite3.connect(self.database) as conn:
+            due = [row[0] for row in conn.execute("SELECT next_attempt_at FROM email_outbox")]
+        self.leased_during_send.extend(datetime.fromisoformat(value) > datetime.utcnow() for value in due)
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _self_signed_context(tmp_path) -> ssl.SSLContext:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_file, key_file = tmp_path / "cert.pem", tmp_path / "key.pem"
+    cert_file.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_file.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()
+    ))
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(str(cert_file), str(key_file))
+    return context
+
+
+@pytest.fixture
+def mailbox(database, tmp_path, monkeypatch):
+    handler = Mailbox(database)
+    port = _free_port()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=port, tls_context=_self_signed_context(tmp_path),
+        require_starttls=True, authenticator=lambda *args: AuthResult(success=True),
+    )
+    controller.start()
+    for name, value in [
+        ("EMAIL_SERVICE_ENABLED", True), ("EMAIL_HOST", "127.0.0.1"), ("EMAIL_PORT", port),
+        ("EMAIL_USERNAME", "dispatcher"), ("EMAIL_PASSWORD", "secret"),
+    ]:
+        monkeypatch.setattr(settings, name, value)
+    yield handler
+    smtp_pool.close_all()
+    controller.stop()
+
+
+async def _outbox():
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(EmailOutboxMessage))).scalars().all()
+
+
+def test_outbox_is_delivered_and_failed_recipients_are_retried(mailbox):
+    async def scenario():
+        mailbox.refuse.add("later@example.com")
+        async with AsyncSessionLocal() as db:
+            await EmailService(db).send_approval_request_notification(
+                ["now@example.com", "later@example.com"], "author@example.com", ["contract.pdf"]
+            )
+            await db.commit()
+
+        assert await EmailDispatcher().dispatch_batch() == 1
+        assert mailbox.delivered == ["now@example.com"]
+        assert mailbox.leased_during_send == [True]
+        (message,) = await _outbox()
+        assert json.loads(message.recipients) == ["later@example.com"]
+        assert message.attempts == 1
+        assert message.next_attempt_at > datetime.utcnow()
+        assert "550" in message.last_error
+
+        # Not due yet, so nothing is sent
+        assert await EmailDispatcher().dispatch_batch() == 0
+
+        mailbox.refuse.clear()
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(EmailOutboxMessage).values(next_attempt_at=datetime.utcnow()))
+            await db.commit()
+        assert await EmailDispatcher().dispatch_batch() == 1
+        assert mailbox.delivered == ["now@example.com", "later@example.com"]
+        # Fully delivered rows are removed from the outbox
+        assert await _outbox() == []
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_message_is_dead_lettered_after_max_attempts(mailbox, monkeypatch):
+    from app.models.email_outbox import OutboxStatus
+
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+
+    async def scenario():
+        mailbox.refuse.add("gone@example.com")
+        async with AsyncSessionLocal() as db:
+            await EmailService(db).send_password_reset_email("gone@example.com", "https://example.com/reset")
+            await db.commit()
+
+        for _ in range(2):
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(EmailOutboxMessage).values(next_attempt_at=datetime.utcnow()))
+                await db.commit()
+            await EmailDispatcher().dispatch_batch()
+
+        (message,) = await _outbox()
+        assert message.status == OutboxStatus.DEAD
+        assert message.attempts == 2
+        assert mailbox.delivered == []
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_identical_messages_to_one_recipient_are_each_delivered(mailbox):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            for _ in range(2):
+                await EmailService(db).send_approval_request_notification(
+                    ["approver@example.com"], "author@example.com", ["contract.pdf"]
+                )
+            await db.commit()
+
+        assert await EmailDispatcher().dispatch_batch() == 2
+        assert mailbox.delivered == ["approver@example.com", "approver@example.com"]
+        assert await _outbox() == []
+        await engine.dispose()
+
+    asyncio.run(scenario())
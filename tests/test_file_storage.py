@@ -0,0 +1,133 @@
+import asyncio
+import io
+import os
+import uuid
+
+import pytest
+from sqlalchemy import select
+from starlette.datastructures import UploadFile
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.file_blob import FileBlob
+from app.models.user import User
+from app.models.user_file import UserFile
+from app.services.user_file_service import UserFileService
+
+
+@pytest.fixture
+def storage_root(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_STORAGE_ROOT_PATH", str(tmp_path / "files"))
+    return tmp_path / "files"
+
+
+async def _user(db) -> User:
+    email = f"{uuid.uuid4().hex}@example.com"
+    user = User(id=str(uuid.uuid4()), email=email, normalized_email=email.upper(), password_hash="x")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def _upload(user: User, content: bytes) -> UserFile:
+    async with AsyncSessionLocal() as db:
+        upload = UploadFile(io.BytesIO(content), size=len(content), filename="contract.pdf")
+        (user_file,) = await UserFileService(db).upload_files(user, [upload])
+        return user_file
+
+
+async def _delete_and_roll_back(user: User, file_id: int):
+    async with AsyncSessionLocal() as db:
+        service = UserFileService(db)
+        user_file = await db.get(UserFile, file_id)
+        await service.storage.release(user_file)
+        await db.delete(user_file)
+        await db.rollback()
+        await service.storage.collect_garbage()
+
+
+async def _delete(user: User, file_id: int):
+    async with AsyncSessionLocal() as db:
+        await UserFileService(db).delete_file(user, file_id)
+
+
+async def _blobs():
+    async with AsyncSessionLocal() as db:
+        return {blob.sha256: blob.ref_count for blob in (await db.execute(select(FileBlob))).scalars()}
+
+
+def test_legacy_file_is_removed_only_when_the_delete_commits(storage_root):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user = await _user(db)
+            user_file = await _upload(user, b"signed")
+            path = UserFileService(db).storage.get_path(user_file)
+        assert os.path.exists(path)
+
+        await _delete_and_roll_back(user, user_file.id)
+        assert os.path.exists(path)
+
+        await _delete(user, user_file.id)
+        assert not os.path.exists(path)
+        assert not os.path.exists(os.path.dirname(path))
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_shared_blob_is_removed_with_its_last_reference(storage_root, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_STORAGE_BACKEND", "cas")
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            author, approver = await _user(db), await _user(db)
+        first = await _upload(author, b"same content")
+        second = await _upload(approver, b"same content")
+        path = os.path.join(storage_root, "blobs", first.sha256[:2], first.sha256[2:4], first.sha256)
+        assert await _blobs() == {first.sha256: 2}
+
+        await _delete(author, first.id)
+        assert os.path.exists(path)
+        assert await _blobs() == {first.sha256: 1}
+
+        await _delete_and_roll_back(approver, second.id)
+        assert os.path.exists(path)
+        assert await _blobs() == {first.sha256: 1}
+
+        await _delete(approver, second.id)
+        assert not os.path.exists(path)
+        assert await _blobs() == {}
+
+        # Uploading the content again writes a fresh blob
+        third = await _upload(author, b"same content")
+        assert os.path.exists(path)
+        assert await _blobs() == {third.sha256: 1}
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_failed_upload_commit_removes_the_stored_file(storage_root, monkeypatch):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user = await _user(db)
+
+        async def fail_commit():
+            raise RuntimeError("commit failed")
+
+        async with AsyncSessionLocal() as db:
+            service = UserFileService(db)
+            monkeypatch.setattr(db, "commit", fail_commit)
+            upload = UploadFile(io.BytesIO(b"signed"), size=6, filename="contract.pdf")
+            with pytest.raises(RuntimeError):
+                await service.upload_files(user, [upload])
+
+        leftovers = [os.path.join(root, name) for root, _, names in os.walk(storage_root) for name in names]
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(UserFile))).scalars().all()
+        await engine.dispose()
+        return leftovers, rows
+
+    leftovers, rows = asyncio.run(scenario())
+    assert leftovers == []
+    assert rows == []
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import exc, text
+
+from app.core.config import settings
+from app.core.replicas import ReplicaRouter
+
+
+def _label(path: str, name: str):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS node (name TEXT)")
+        conn.execute("DELETE FROM node")
+        conn.execute("INSERT INTO node VALUES (?)", (name,))
+
+
+@pytest.fixture
+def replica_dirs(database, tmp_path):
+    """Two replicas, each a SQLite file in its own directory, and a labelled primary."""
+    _label(database, "primary")
+    dirs = []
+    for name in ["replica1", "replica2"]:
+        directory = tmp_path / name
+        directory.mkdir()
+        _label(str(directory / "db.sqlite"), name)
+        dirs.append(directory)
+    return dirs
+
+
+async def _read(router: ReplicaRouter, email=None) -> str:
+    async with router.session(email) as session:
+        return (await session.execute(text("SELECT name FROM node"))).scalar_one()
+
+
+def _router(dirs) -> ReplicaRouter:
+    return ReplicaRouter([f"sqlite+aiosqlite:///{directory / 'db.sqlite'}" for directory in dirs])
+
+
+def test_reads_are_balanced_round_robin(replica_dirs):
+    async def scenario():
+        router = _router(replica_dirs)
+        names = [await _read(router) for _ in range(4)]
+        await router.stop()
+        return names, router.reads
+
+    names, reads = asyncio.run(scenario())
+    assert names == ["replica1", "replica2", "replica1", "replica2"]
+    assert reads == {"replica1": 2, "replica2": 2}
+
+
+def test_pinned_user_reads_the_primary_until_the_pin_expires(replica_dirs, monkeypatch):
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 0.2)
+
+    async def scenario():
+        router = _router(replica_dirs)
+        await router.pin(["AUTHOR@EXAMPLE.COM"])
+        pinned = await _read(router, "AUTHOR@EXAMPLE.COM")
+        other = await _read(router, "APPROVER@EXAMPLE.COM")
+        await asyncio.sleep(0.3)
+        expired = await _read(router, "AUTHOR@EXAMPLE.COM")
+        await router.stop()
+        return pinned, other, expired, router.pinned_reads
+
+    pinned, other, expired, pinned_reads = asyncio.run(scenario())
+    assert pinned == "primary"
+    assert other.startswith("replica")
+    assert expired.startswith("replica")
+    assert pinned_reads == 1
+
+
+def test_failed_replica_leaves_rotation_and_returns_after_a_health_check(replica_dirs):
+    async def scenario():
+        router = _router(replica_dirs)
+        assert await _read(router) == "replica1"
+
+        # New connections to replica2 now fail, as with a replica that went away
+        offline = replica_dirs[1].with_name("replica2-offline")
+        os.rename(replica_dirs[1], offline)
+        with pytest.raises(exc.OperationalError):
+            await _read(router)
+        assert not router.replicas[1].healthy
+        during_outage = [await _read(router) for _ in range(3)]
+
+        await router.check()
+        assert not router.replicas[1].healthy
+
+        os.rename(offline, replica_dirs[1])
+        await router.check()
+        assert router.replicas[1].healthy
+        after_recovery = {await _read(router) for _ in range(2)}
+        await router.stop()
+        return during_outage, after_recovery
+
+    during_outage, after_recovery = asyncio.run(scenario())
+    assert during_outage == ["replica1"] * 3
+    assert after_recovery == {"replica1", "replica2"}
+
+
+def test_all_replicas_down_falls_back_to_the_primary(replica_dirs):
+    async def scenario():
+        router = _router(replica_dirs)
+        for replica in router.replicas:
+            replica.mark_unhealthy("test")
+        name = await _read(router)
+        await router.stop()
+        return name, router.reads
+
+    name, reads = asyncio.run(scenario())
+    assert name == "primary"
+    assert reads == {"primary": 1}
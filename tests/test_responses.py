@@ -0,0 +1,130 @@
+from email.utils import formatdate
+import asyncio
+import os
+
+import pytest
+from starlette.datastructures import Headers
+
+from app.core.responses import MAX_RANGES, RangeFileResponse, _not_modified, _requested_ranges
+
+ETAG = '"10-abc"'
+MTIME = 1_700_000_000
+LAST_MODIFIED = formatdate(MTIME, usegmt=True)
+
+
+def _ranges(range_header, size=10, **headers):
+    return _requested_ranges(Headers({"range": range_header, **headers}), ETAG, LAST_MODIFIED, size)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-3", [(0, 3)]),
+    ("bytes=7-", [(7, 9)]),
+    ("bytes=5-100", [(5, 9)]),
+    ("bytes=-3", [(7, 9)]),
+    ("bytes=-100", [(0, 9)]),
+    ("bytes=0-0,-1", [(0, 0), (9, 9)]),
+    ("bytes=-0", []),
+    ("bytes=10-", []),
+    ("bytes=10-20,-0", []),
+    ("bytes=20-,2-3", [(2, 3)]),
+])
+def test_satisfiable_and_unsatisfiable_ranges(header, expected):
+    assert _ranges(header) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=5-2", "bytes=x-3", "bytes=3", "items=0-3", "bytes=0-1,4-3"])
+def test_reversed_or_malformed_ranges_send_the_whole_file(header):
+    assert _ranges(header) is None
+
+
+def test_if_range_must_match_the_validator():
+    assert _ranges("bytes=0-3", **{"if-range": ETAG}) == [(0, 3)]
+    assert _ranges("bytes=0-3", **{"if-range": LAST_MODIFIED}) == [(0, 3)]
+    assert _ranges("bytes=0-3", **{"if-range": '"10-other"'}) is None
+    assert _ranges("bytes=0-3", **{"if-range": f"W/{ETAG}"}) is None
+
+
+def test_too_many_ranges_send_the_whole_file():
+    specs = ",".join(f"{i}-{i}" for i in range(MAX_RANGES))
+    assert len(_ranges(f"bytes={specs}", size=MAX_RANGES)) == MAX_RANGES
+    assert _ranges(f"bytes={specs},0-0", size=MAX_RANGES) is None
+
+
+def test_zero_length_files_satisfy_no_range():
+    assert _ranges("bytes=0-", size=0) == []
+    assert _ranges("bytes=-5", size=0) == []
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, False),
+    ({"if-none-match": ETAG}, True),
+    ({"if-none-match": f'"other", W/{ETAG}'}, True),
+    ({"if-none-match": "*"}, True),
+    ({"if-none-match": '"other"'}, False),
+    # If-None-Match takes precedence over If-Modified-Since
+    ({"if-none-match": '"other"', "if-modified-since": LAST_MODIFIED}, False),
+    ({"if-modified-since": LAST_MODIFIED}, True),
+    ({"if-modified-since": formatdate(MTIME - 1, usegmt=True)}, False),
+    ({"if-modified-since": "yesterday"}, False),
+])
+def test_not_modified(headers, expected):
+    assert _not_modified(Headers(headers), ETAG, MTIME + 0.5) is expected
+
+
+def _respond(tmp_path, content, **headers):
+    path = tmp_path / "file.txt"
+    path.write_bytes(content)
+    os.utime(path, (MTIME, MTIME))
+    response = RangeFileResponse(
+        str(path), Headers(headers), ETAG, os.stat(path), filename="file.txt", media_type="text/plain"
+    )
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(
+        {"type": "http", "method": "GET", "headers": [], "extensions": {}}, None, send
+    ))
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], Headers(raw=start["headers"]), body
+
+
+def test_not_modified_response_carries_validators_only(tmp_path):
+    status, headers, body = _respond(tmp_path, b"0123456789", **{"if-none-match": ETAG})
+    assert status == 304
+    assert body == b""
+    assert headers["etag"] == ETAG
+    assert headers["last-modified"] == LAST_MODIFIED
+    for name in ["content-type", "content-disposition", "content-range", "content-length"]:
+        assert name not in headers
+
+
+def test_unsatisfiable_range_response(tmp_path):
+    status, headers, body = _respond(tmp_path, b"0123456789", range="bytes=10-")
+    assert status == 416
+    assert body == b""
+    assert headers["content-range"] == "bytes */10"
+    assert headers["content-length"] == "0"
+    assert headers["accept-ranges"] == "bytes"
+
+
+def test_zero_length_file_answers_ranges_with_416_and_plain_requests_with_200(tmp_path):
+    status, headers, body = _respond(tmp_path, b"", range="bytes=0-")
+    assert (status, headers["content-range"], body) == (416, "bytes */0", b"")
+
+    status, headers, body = _respond(tmp_path, b"")
+    assert (status, headers["content-length"], body) == (200, "0", b"")
+
+
+def test_single_and_multiple_range_responses(tmp_path):
+    status, headers, body = _respond(tmp_path, b"0123456789", range="bytes=-3")
+    assert (status, headers["content-range"], headers["content-length"], body) == (206, "bytes 7-9/10", "3", b"789")
+
+    status, headers, body = _respond(tmp_path, b"0123456789", range="bytes=0-1,8-")
+    assert status == 206
+    assert headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert int(headers["content-length"]) == len(body)
+    assert b"Content-Range: bytes 0-1/10\r\n\r\n01\r\n" in body
+    assert b"Content-Range: bytes 8-9/10\r\n\r\n89\r\n" in body
@@ -0,0 +1,53 @@
+import asyncio
+import io
+import os
+import uuid
+import zipfile
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.user import User
+from app.services.user_file_service import ZIP_CHUNK_SIZE, UserFileService
+
+FILES = {
+    "notes.txt": b"approve me\n" * 50000,
+    "scan.pdf": os.urandom(3 * ZIP_CHUNK_SIZE + 17),
+    "empty.txt": b"",
+    "NOTES.txt": b"same name, other case",
+}
+
+
+@pytest.fixture
+def storage_root(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_STORAGE_ROOT_PATH", str(tmp_path / "files"))
+
+
+def test_zip_stream_round_trips_without_empty_chunks(storage_root):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            email = f"{uuid.uuid4().hex}@example.com"
+            user = User(id=str(uuid.uuid4()), email=email, normalized_email=email.upper(), password_hash="x")
+            db.add(user)
+            await db.commit()
+
+            service = UserFileService(db)
+            uploads = [UploadFile(io.BytesIO(data), size=len(data), filename=name) for name, data in FILES.items()]
+            user_files = await service.upload_files(user, uploads)
+            bundle = [(user_file, service.storage.get_path(user_file)) for user_file in user_files]
+            chunks = [chunk async for chunk in service.iter_zip(bundle)]
+        await engine.dispose()
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert all(chunks)
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        contents = {info.filename: archive.read(info) for info in archive.infolist()}
+        types = {info.filename: info.compress_type for info in archive.infolist()}
+    assert contents == {"notes.txt": FILES["notes.txt"], "scan.pdf": FILES["scan.pdf"], "empty.txt": b"",
+                        "NOTES (2).txt": FILES["NOTES.txt"]}
+    assert types["notes.txt"] == zipfile.ZIP_DEFLATED
+    assert types["scan.pdf"] == zipfile.ZIP_STORED